@@ -0,0 +1,173 @@
+# asset_cache.py - the OBJ models of the 3D scenes, parsed once and shared by every cell
+#
+# creating Entity(model='...obj') per reward cell re-read the bird OBJ (~70k lines) on
+# every refresh. AssetManager parses each OBJ once, optionally in a background thread
+# started at startup, and keeps the parsed arrays as <name>.npz in cache_dir so later
+# runs skip the text parsing. the first spawn of an asset builds its mesh and texture
+# (in the main thread, as ursina requires), every spawn after that instances the same
+# geometry under a new, empty Entity.
+#
+#   assets = AssetManager('assets/', {'bird': dict(model='12212_Bird_v1_l2.obj', ...)})
+#   assets.preload()                  background parsing, returns at once
+#   bird = assets.spawn('bird', (x, y, z))
+#   assets.report()                   load times of everything loaded so far
+#
+# a missing OBJ falls back to a coloured sphere, like the editor did before.
+
+import os
+import threading
+import time
+
+import numpy as np
+from ursina import Entity, Mesh, Texture, Vec3
+
+CACHE_VERSION = 1
+
+
+def parse_obj(path):
+    # vertices, triangles, uvs and normals of an OBJ as arrays, one vertex per distinct
+    # v/vt/vn corner, polygons fanned into triangles. materials and groups are ignored
+    positions, uvs, normals, corners, counts = [], [], [], [], []
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            tag = parts[0]
+            if tag == "v":
+                positions.append(parts[1:4])
+            elif tag == "vt":
+                uvs.append(parts[1:3])
+            elif tag == "vn":
+                normals.append(parts[1:4])
+            elif tag == "f":
+                counts.append(len(parts) - 1)
+                for corner in parts[1:]:
+                    v, _, rest = corner.partition("/")
+                    t, _, n = rest.partition("/")
+                    corners.append((int(v), int(t) if t else 0, int(n) if n else 0))
+
+    positions = np.array(positions, dtype=np.float32).reshape(-1, 3)
+    uvs = np.array(uvs, dtype=np.float32).reshape(-1, 2)
+    normals = np.array(normals, dtype=np.float32).reshape(-1, 3)
+    corners = np.array(corners, dtype=np.int64).reshape(-1, 3)
+    # 1-based indices, negative ones count from the end, 0 marks a missing vt / vn
+    for col, n in enumerate((len(positions), len(uvs), len(normals))):
+        idx = corners[:, col]
+        corners[:, col] = np.where(idx > 0, idx - 1, np.where(idx < 0, idx + n, -1))
+
+    unique, inverse = np.unique(corners, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # fan triangulation: polygon with k corners ==> (c0, c1, c2), (c0, c2, c3), ...
+    counts = np.array(counts, dtype=np.int64)
+    first = np.repeat(np.cumsum(counts) - counts, counts - 2)
+    offset = np.arange(len(first)) - np.repeat(np.cumsum(counts - 2) - (counts - 2), counts - 2)
+    triangles = np.stack([inverse[first], inverse[first + offset + 1], inverse[first + offset + 2]], axis=1)
+
+    arrays = {"vertices": positions[unique[:, 0]], "triangles": triangles.astype(np.int32).reshape(-1)}
+    if len(uvs) and (unique[:, 1] >= 0).all():
+        arrays["uvs"] = uvs[unique[:, 1]]
+    if len(normals) and (unique[:, 2] >= 0).all():
+        arrays["normals"] = normals[unique[:, 2]]
+    return arrays
+
+
+def load_geometry(path, cache_dir=None):
+    # parsed arrays of the OBJ at path, from cache_dir when the cached copy is newer
+    # than the OBJ ==> (arrays, cached)
+    cache = os.path.join(cache_dir, os.path.basename(path) + ".npz") if cache_dir else None
+    stat = os.stat(path)
+    stamp = np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    if cache and os.path.exists(cache):
+        with np.load(cache) as f:
+            if np.array_equal(f["stamp"], stamp):
+                return {k: f[k] for k in f.files if k != "stamp"}, True
+    arrays = parse_obj(path)
+    if cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache, "wb") as f:
+            np.savez(f, stamp=stamp, **arrays)
+    return arrays, False
+
+
+class AssetManager:
+    def __init__(self, directory, specs, cache_dir="asset_cache"):
+        # specs: name ==> dict(model, texture, offset, scale, rotation, fallback), where
+        # fallback is the colour of the sphere used when the model cannot be loaded
+        self.directory = directory
+        self.specs = specs
+        self.cache_dir = cache_dir
+        self.geometry = {}   # name ==> parsed arrays, None when the OBJ is missing
+        self.templates = {}  # name ==> hidden Entity holding the shared mesh, or None
+        self.times = {}      # name ==> {"geometry": s, "cached": bool, "mesh": s, ...}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def load_geometry(self, name):
+        with self.lock:
+            if name in self.geometry:
+                return self.geometry[name]
+            path = os.path.join(self.directory, self.specs[name]["model"])
+            t0 = time.perf_counter()
+            try:
+                arrays, cached = load_geometry(path, self.cache_dir)
+            except (OSError, ValueError) as e:
+                print(f"Asset load error: {e}")
+                arrays, cached = None, False
+            self.geometry[name] = arrays
+            self.times[name] = {"geometry": time.perf_counter() - t0, "cached": cached}
+            return arrays
+
+    def preload(self, background=True):
+        # parse every OBJ now, in a daemon thread unless background=False
+        def work():
+            for name in self.specs:
+                self.load_geometry(name)
+        if background:
+            self.thread = threading.Thread(target=work, daemon=True)
+            self.thread.start()
+        else:
+            work()
+
+    def template(self, name):
+        if name in self.templates:
+            return self.templates[name]
+        arrays = self.load_geometry(name)
+        template = None
+        if arrays is not None:
+            spec = self.specs[name]
+            t0 = time.perf_counter()
+            mesh = Mesh(vertices=arrays["vertices"].tolist(), triangles=arrays["triangles"].tolist(),
+                        uvs=arrays["uvs"].tolist() if "uvs" in arrays else None,
+                        normals=arrays["normals"].tolist() if "normals" in arrays else None)
+            template = Entity(model=mesh, enabled=False)
+            if spec.get("texture"):
+                template.texture = Texture(os.path.join(self.directory, spec["texture"]))
+            template.model.set_two_sided(True)
+            self.times[name]["mesh"] = time.perf_counter() - t0
+            self.times[name]["vertices"] = len(arrays["vertices"])
+        self.templates[name] = template
+        return template
+
+    def spawn(self, name, position):
+        # new Entity at cell `position` showing asset `name`
+        spec = self.specs[name]
+        template = self.template(name)
+        if template is None:
+            return Entity(model='sphere', color=spec["fallback"], position=Vec3(*position) + Vec3(0, 0.4, 0),
+                          scale=0.4)
+        entity = Entity(position=Vec3(*position) + Vec3(*spec.get("offset", (0, 0, 0))),
+                        scale=spec.get("scale", 1), rotation=spec.get("rotation", (0, 0, 0)))
+        template.model.instance_to(entity)
+        return entity
+
+    def report(self):
+        for name, t in self.times.items():
+            if self.geometry.get(name) is None:
+                print(f"{name}: missing ({t['geometry'] * 1000:.1f} ms)")
+                continue
+            source = "cache" if t["cached"] else "OBJ"
+            line = f"{name}: {source} {t['geometry'] * 1000:.1f} ms"
+            if "mesh" in t:
+                line += f", mesh {t['mesh'] * 1000:.1f} ms, {t['vertices']} vertices"
+            print(line)
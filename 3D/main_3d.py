@@ -1,47 +1,96 @@
 # main_3d.py
 
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repository root, for rlgrid
 import numpy as np
-from grid_3d import GridWorld3D, WALL, REWARD, PENALTY, ACTIONS_3D
-from value_iteration_3d import value_iteration
+from rlgrid.grid_3d import GridWorld3D, WALL, REWARD, PENALTY, ACTIONS_3D
+from rlgrid.state_index import as_state_view
+from rlgrid.value_iteration_3d import value_iteration
 
-def visualize_3d(env: GridWorld3D, V=None, policy=None):
-    fig = plt.figure(figsize=(10, 8))
+def plot_arrays(env: GridWorld3D, V=None, policy=None, layers=None, step=1):
+    # point and arrow arrays of visualize_3d, for the cells in `layers` (y indices,
+    # default all) on every step-th x / y / z. rewards are always kept.
+    # V / policy: the views value_iteration returns, read through their arrays. plain
+    # {state: value} / {state: action name} dicts are copied into such views first
+    shape = (env.depth, env.height, env.width)
+    keep = np.zeros(shape, dtype=bool)
+    keep[::step, ::step, ::step] = True
+    if layers is not None:
+        in_layers = np.zeros(env.height, dtype=bool)
+        in_layers[list(layers)] = True
+        keep &= in_layers[None, :, None]
+
+    wall = env.wall
+    reward = env.reward
+    is_reward = env.terminal & ~wall
+    if layers is not None:
+        is_reward &= in_layers[None, :, None]
+
+    out = {"walls": np.argwhere(wall & keep), "rewards": np.argwhere(is_reward)}
+    out["reward_values"] = reward[tuple(out["rewards"].T)]
+
+    if V:
+        V = as_state_view(V, shape)
+        values = np.full(shape, np.nan)
+        values.flat[V.index.cells] = V.data
+        vmin, vmax = np.nanmin(values), np.nanmax(values)  # once, over every cell
+        cells = np.argwhere(~np.isnan(values) & ~wall & ~is_reward & keep)
+        out["values"] = cells
+        out["norm"] = (values[tuple(cells.T)] - vmin) / (vmax - vmin + 1e-8)
+
+    if policy:
+        policy = as_state_view(policy, shape, list(ACTIONS_3D).index)
+        ids = policy.ids()
+        cells = policy.index.coords()[ids]
+        moves = np.array(list(ACTIONS_3D.values()), dtype=float)[policy.data[ids]]
+        mask = ~(wall | env.terminal)[tuple(cells.T)] & keep[tuple(cells.T)]
+        out["arrows"] = cells[mask]
+        out["moves"] = moves[mask] * 0.4
+    return out
+
+
+def visualize_3d(env: GridWorld3D, V=None, policy=None, layers=None, step=1, out=None):
+    # one scatter per kind of cell and one quiver for the policy. layers / step thin out
+    # large volumes (see plot_arrays). out: write the figure to this file without
+    # opening a window (no display needed), otherwise show it
+    # matplotlib is only imported when something is drawn, solving stays headless
+    from mpl_toolkits.mplot3d import Axes3D
+    if out:
+        from matplotlib.figure import Figure
+        import matplotlib.cm as cm
+        fig = Figure(figsize=(10, 8))
+    else:
+        import matplotlib.pyplot as plt
+        cm = plt.cm
+        fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
 
-    # Draw all cells
-    for x in range(env.depth):
-        for y in range(env.height):
-            for z in range(env.width):
-                if (x, y, z) in env.walls:
-                    ax.scatter(x, y, z, color='black', s=200, alpha=0.8, marker='s')
-                elif (x, y, z) in env.rewards:
-                    val = env.rewards[(x, y, z)]
-                    color = 'red' if val > 0 else 'blue'
-                    ax.scatter(x, y, z, color=color, s=200, alpha=0.9, marker='o')
-                else:
-                    if V and (x, y, z) in V:
-                        val = V[(x, y, z)]
-                        vmin, vmax = min(V.values()), max(V.values())
-                        norm_val = (val - vmin) / (vmax - vmin + 1e-8)
-                        color = plt.cm.viridis(norm_val)
-                        ax.scatter(x, y, z, color=color, s=100, alpha=0.6)
+    arrays = plot_arrays(env, V, policy, layers, step)
+    walls = arrays["walls"]
+    if len(walls):
+        ax.scatter(walls[:, 0], walls[:, 1], walls[:, 2], color='black', s=200, alpha=0.8, marker='s')
+    rewards = arrays["rewards"]
+    if len(rewards):
+        colors = np.where(arrays["reward_values"] > 0, 'red', 'blue')
+        ax.scatter(rewards[:, 0], rewards[:, 1], rewards[:, 2], c=colors, s=200, alpha=0.9, marker='o')
+    if "values" in arrays and len(arrays["values"]):
+        cells = arrays["values"]
+        ax.scatter(cells[:, 0], cells[:, 1], cells[:, 2], c=cm.viridis(arrays["norm"]), s=100, alpha=0.6)
 
     # Draw policy arrows (optional)
-    if policy:
-        for (x, y, z), action in policy.items():
-            if (x, y, z) in env.walls or env.is_terminal((x, y, z)):
-                continue
-            dx, dy, dz = ACTIONS_3D[action]
-            ax.quiver(x, y, z, dx*0.4, dy*0.4, dz*0.4, color='green', arrow_length_ratio=0.3)
+    if "arrows" in arrays and len(arrays["arrows"]):
+        (x, y, z), (dx, dy, dz) = arrays["arrows"].T, arrays["moves"].T
+        ax.quiver(x, y, z, dx, dy, dz, color='green', arrow_length_ratio=0.3)
 
     ax.set_xlabel('X (Depth)')
     ax.set_ylabel('Y (Height)')
     ax.set_zlabel('Z (Width)')
     ax.set_title('3D GridWorld with Value Iteration')
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    if out:
+        fig.savefig(out)
+    else:
+        plt.show()
 
 # Example usage
 if __name__ == "__main__":
@@ -57,4 +106,5 @@ if __name__ == "__main__":
     V, policy = value_iteration(env)
 
     print("Optimal policy at start:", policy.get(env.start_pos, "Terminal"))
-    visualize_3d(env, V, policy)
+    # python main_3d.py [out.png]: write the plot to a file instead of opening a window
+    visualize_3d(env, V, policy, out=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,11 +1,18 @@
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
 
+import os, sys
+import numpy as np
+from voxel_view import VoxelMeshes, pick_cell
+from asset_cache import AssetManager
+from value_overlay import ValueOverlay
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repository root, for rlgrid
 try:
-    from core.grid_3d import GridWorld3D, WALL, REWARD, PENALTY
-    from core.value_iteration_3d import value_iteration
+    from rlgrid.grid_3d import GridWorld3D, WALL
+    from rlgrid.value_iteration_3d import SOLVERS, INCREMENTAL, GAMMA, THETA, IncrementalSolver, resolve
+    from rlgrid.solve_cache import SolveCache
 except ImportError:
-    print("Error: core modules not found. Ensure grid_3d.py and value_iteration_3d.py are in 'core' folder.")
+    print("Error: rlgrid package not found. Run from a checkout that contains the rlgrid folder.")
 
 app = Ursina(title="3D RL Editor - Value on Floor")
 window.borderless = False
@@ -13,14 +20,30 @@ window.size = (1100, 700)
 
 env = GridWorld3D(depth=4, height=1, width=4)
 V = {}
-entities = []
-text_labels = []
+floors = walls = None  # VoxelMeshes of the floor slabs and of the walls
+assets = {}  # pos ==> reward / penalty model
+overlay = None  # ValueOverlay, drawn while show_values is on
 agent_model = None
+agent_offset = None
 edit_mode = 'wall'
 show_values = False
+solver_name = 'Value Iteration'
+incremental = IncrementalSolver(GAMMA, THETA)
+cache = SolveCache(directory='solve_cache')
+edited = None  # cells changed since the last incremental solve, None = whole map
 reward_val = 1.0
 penalty_val = -1.0
 ASSETS_DIR = 'assets/'
+# models shared by every reward / penalty cell, parsed once in the background
+asset_manager = AssetManager(ASSETS_DIR, {
+    'bird': dict(model='12212_Bird_v1_l2.obj', texture='12212_Bird_diffuse.jpg',
+                 offset=(0, 0.35, 0), scale=0.08, rotation=(-90, 0, 0), fallback=color.orange),
+    'dog': dict(model='13466_Canaan_Dog_v1_L3.obj', texture='13466_Canaan_Dog_diff.jpg',
+                offset=(0, 0.15, 0), scale=0.03, rotation=(-90, 0, 90), fallback=color.orange),
+    'cat': dict(model='12221_Cat_v1_l3.obj', texture='Cat_diffuse.jpg',
+                scale=0.02, rotation=(-90, 0, 0), fallback=color.cyan),
+})
+asset_manager.preload()
 
 player = FirstPersonController(position=(2, 3, -5), speed=5)
 player.gravity = 0
@@ -33,85 +56,66 @@ def toggle_mouse_lock():
     mouse.locked = not mouse.locked
     player.enabled = mouse.locked
 
+FLOOR_SCALE = (0.95, 0.11, 0.95)
+FLOOR_TOP = 0.055  # floor slabs are picked on their top face
+WALL_SCALE = (1.0, 0.4, 1.0)
+
+def floor_color(pos):
+    return color.azure.tint(0.3) if pos == env.start_pos else color.gray
+
+def make_asset(pos):
+    return asset_manager.spawn('bird' if env.rewards[pos] > 0 else 'dog', pos)
+
+def refresh_values():
+    overlay.set_values(V, env.wall)
+    overlay.show(show_values)
+
+def refresh_cells(cells):
+    # redraw only `cells`: their floor and wall boxes, reward model and value texel
+    for pos in cells:
+        floors.set(pos, floor_color(pos))
+        walls.set(pos, color.red if pos in env.walls else None)
+        if pos in assets:
+            destroy(assets.pop(pos))
+        if pos in env.rewards and pos not in env.walls:
+            assets[pos] = make_asset(pos)
+        overlay.set_cell(pos, float('nan') if pos in env.walls else V.get(pos, 0.0))
+    floors.flush()
+    walls.flush()
+    agent_model.position = Vec3(*env.start_pos) + agent_offset
+
 def refresh_grid():
-    global entities, text_labels, agent_model
+    # the whole map, after loading or resizing it
+    global floors, walls, overlay, agent_model, agent_offset
     
-    for e in entities: destroy(e)
-    for t in text_labels: destroy(t)
-    if agent_model: destroy(agent_model)
+    for m in (floors, walls, overlay):
+        if m: m.destroy()
+    for e in assets.values(): destroy(e)
+    assets.clear()
     
-    entities.clear()
-    text_labels.clear()
+    shape = (env.depth, env.height, env.width)
+    floors = VoxelMeshes(shape, FLOOR_SCALE)
+    walls = VoxelMeshes(shape, WALL_SCALE)
+    floors.fill(np.ones(shape, dtype=bool), color.gray)
+    floors.set(env.start_pos, floor_color(env.start_pos))
+    walls.fill(env.wall, color.red)
+    floors.flush()
+    walls.flush()
     
-    for x in range(env.depth):
-        for y in range(env.height):
-            for z in range(env.width):
-                pos_3d = (x, y, z)
-                
-                base_color = color.gray
-                if pos_3d == env.start_pos:
-                    base_color = color.azure.tint(0.3)
-                
-                floor = Button(parent=scene, model='cube', color=base_color, position=pos_3d,
-                               scale=(0.95, 0.11, 0.95), collider='box')
-                floor.on_click = Func(handle_click, pos_3d)
-                entities.append(floor)
-                
-                if pos_3d in env.walls:
-                    wall = Entity(model='cube', color=color.red, position=pos_3d,
-                                  scale=(1.0, 0.4, 1.0))
-                    entities.append(wall)
-                
-                elif pos_3d in env.rewards:
-                    val = env.rewards[pos_3d]
-                    try:
-                        if val > 0:  
-                            asset = Entity(model=ASSETS_DIR+'12212_Bird_v1_l2.obj',
-                                           texture=ASSETS_DIR+'12212_Bird_diffuse.jpg',
-                                           position=pos_3d + (0, 0.35, 0), scale=0.08,
-                                           rotation=(-90, 0, 0))
-                        else:  
-                            asset = Entity(model=ASSETS_DIR+'13466_Canaan_Dog_v1_L3.obj',
-                                           texture=ASSETS_DIR+'13466_Canaan_Dog_diff.jpg',
-                                           position=pos_3d + (0, 0.15, 0), scale=0.03,
-                                           rotation=(-90, 0, 90))
-                        entities.append(asset)
-                    except Exception as e:
-                        print(f"Asset load error: {e}")
-                        entities.append(Entity(model='sphere', color=color.orange, position=pos_3d + (0, 0.4, 0), scale=0.4))
-                
-                if show_values and pos_3d not in env.walls:
-                    value = V.get(pos_3d, 0.0)
-                    value_text = f"{value:.2f}"
-                    
-                    if value > 0.01:
-                        txt_color = color.lime
-                    elif value < -0.01:
-                        txt_color = color.red
-                    else:
-                        txt_color = color.white
-                    
-                    value_label = Text(
-                        text=value_text,
-                        parent=floor,
-                        position=(0, 0.06, 0),
-                        origin=(0, 0),
-                        scale=4.0,
-                        billboard=True,
-                        color=txt_color,
-                        background=False
-                    )
-                    text_labels.append(value_label)
+    for pos in env.rewards:
+        if pos not in env.walls:
+            assets[pos] = make_asset(pos)
+    overlay = ValueOverlay(shape, FLOOR_TOP)
+    refresh_values()
     
-    try:
-        agent_model = Entity(model=ASSETS_DIR+'12221_Cat_v1_l3.obj',
-                             texture=ASSETS_DIR+'Cat_diffuse.jpg',
-                             position=env.start_pos,
-                             scale=0.02, rotation=(-90, 0, 0))
-    except:
-        agent_model = Entity(model='sphere', color=color.cyan, position=env.start_pos + (0, 0.4, 0), scale=0.4)
+    if agent_model is None:
+        agent_model = asset_manager.spawn('cat', env.start_pos)
+        agent_offset = agent_model.position - Vec3(*env.start_pos)
+    agent_model.position = Vec3(*env.start_pos) + agent_offset
 
 def handle_click(pos):
+    global edited
+    touched = {pos, env.start_pos}
     if edit_mode == 'wall':
         env.set_cell(*pos, WALL)
     elif edit_mode == 'reward':
@@ -123,21 +127,24 @@ def handle_click(pos):
     elif edit_mode == 'delete':
         env.walls.discard(pos)
         env.rewards.pop(pos, None)
-    refresh_grid()
+    if edit_mode != 'start' and edited is not None:
+        edited.add(pos)
+    refresh_cells(touched)
 
 def open_value_settings():
     r_in = InputField(default_value=str(reward_val))
     p_in = InputField(default_value=str(penalty_val))
     win = WindowPanel(title='Value Settings', content=(Text('Reward:'), r_in, Text('Penalty:'), p_in))
     def apply():
-        global reward_val, penalty_val
+        global reward_val, penalty_val, edited
         reward_val = float(r_in.text)
         penalty_val = float(p_in.text)
         for p in list(env.rewards):
             if env.rewards[p] > 0: env.rewards[p] = reward_val
             else: env.rewards[p] = penalty_val
+        edited = None
         destroy(win)
-        refresh_grid()
+        refresh_cells(list(env.rewards))
     Button(parent=win, text='Apply', y=-0.2, on_click=apply)
 
 def open_dim_settings():
@@ -146,15 +153,16 @@ def open_dim_settings():
     w_in = InputField(default_value=str(env.width))
     win = WindowPanel(title='Grid Size', content=(Text('Depth:'), d_in, Text('Height:'), h_in, Text('Width:'), w_in))
     def apply():
-        global env, V
+        global env, V, edited
         env = GridWorld3D(int(d_in.text), int(h_in.text), int(w_in.text))
         V = {}
+        edited = None
         destroy(win)
         refresh_grid()
     Button(parent=win, text='Update', y=-0.25, on_click=apply)
 
 def input(key):
-    global edit_mode, show_values, is_right_mouse_held
+    global edit_mode, show_values, is_right_mouse_held, solver_name, edited
     
     if key == 'right mouse down':
         is_right_mouse_held = True
@@ -172,27 +180,48 @@ def input(key):
         camera.rotation_y += dx
         return
     
-    if key in '12345':
+    if key == 'left mouse down' and mouse.hovered_entity is None:
+        # floors have no colliders, the clicked cell comes from the mouse ray
+        pos = pick_cell(floors.shape, FLOOR_TOP)
+        if pos is not None:
+            handle_click(pos)
+    elif key in '12345':
         edit_mode = ['wall', 'reward', 'penalty', 'start', 'delete'][int(key)-1]
     elif key == 'z': open_value_settings()
     elif key == 'x': open_dim_settings()
     elif key == 'v':
         show_values = not show_values
-        refresh_grid()
+        overlay.show(show_values)
+    elif key == 'p':
+        names = list(SOLVERS) + [INCREMENTAL]
+        solver_name = names[(names.index(solver_name) + 1) % len(names)]
+        print(f"Solver: {solver_name}")
     elif key == 'enter':
-        print("Running Value Iteration...")
+        print(f"Running {solver_name}...")
         global V
-        V, _ = value_iteration(env)
-        refresh_grid()
+        if solver_name == INCREMENTAL:
+            V, _ = resolve(env, incremental, edited)
+            edited = set()
+        else:
+            V, _ = SOLVERS[solver_name](env, cache=cache)
+            print(f"Solve cache: {cache.stats()}")
+        refresh_values()
     elif key == 'e': toggle_mouse_lock()
     elif key == 'scroll up': camera.fov = max(20, camera.fov - 10)
     elif key == 'scroll down': camera.fov = min(120, camera.fov + 10)
 
+def update():
+    # value labels follow the camera and the cell under the cursor
+    if show_values:
+        cursor = None if mouse.hovered_entity else pick_cell(overlay.shape, FLOOR_TOP)
+        overlay.update_labels(camera.world_position, cursor)
+
 DirectionalLight(y=8, rotation=(60, -45, 45))
 AmbientLight(color=color.rgba(100, 100, 120, 255))
 
-Text(text="1:Wall  2:Reward  3:Penalty  4:Start  5:Delete   |   Z:Values  X:Size  V:Show Values  Enter:Run VI  E:Mouse Lock",
+Text(text="1:Wall  2:Reward  3:Penalty  4:Start  5:Delete   |   Z:Values  X:Size  V:Show Values  P:Solver  Enter:Run  E:Mouse Lock",
      position=(-0.85, 0.46), scale=1.5, background=True, color=color.yellow)
 
 refresh_grid()
+asset_manager.report()
 app.run()
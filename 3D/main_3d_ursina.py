@@ -1,8 +1,12 @@
 # main_3d_ursina.py
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
-from grid_3d import GridWorld3D, WALL, REWARD, PENALTY
-from value_iteration_3d import value_iteration
+import os, sys
+import numpy as np
+from voxel_view import VoxelMeshes
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repository root, for rlgrid
+from rlgrid.grid_3d import GridWorld3D, WALL, REWARD, PENALTY
+from rlgrid.value_iteration_3d import value_iteration
 
 # تنظیمات محیط
 app = Ursina()
@@ -28,9 +32,11 @@ V, policy = value_iteration(env)
 print(f"Optimal policy at start: {policy.get(env.start_pos, 'Terminal')}")
 
 # ذخیره سیاست برای نمایش مسیر
+# مسیر حرکت‌های مورد نظر سیاست؛ با slip ممکن است سیاست عمداً به دیوار بزند و
+# سر جایش بماند، پس با تکرار یک خانه مسیر تمام می‌شود
 agent_path = []
 pos = env.start_pos
-while pos in policy and not env.is_terminal(pos):
+while pos in policy and not env.is_terminal(pos) and pos not in agent_path:
     agent_path.append(pos)
     pos = env.get_next_state(pos, policy[pos])
 agent_path.append(pos)  # ترمینال
@@ -43,39 +49,23 @@ COLOR_PENALTY = color.red
 COLOR_AGENT = color.blue
 COLOR_PATH = color.yellow
 
-# ساخت مکعب‌ها
-entities = []
-
-for x in range(depth):
-    for y in range(height):
-        for z in range(width):
-            pos_3d = (x, y, z)
-            if pos_3d in env.walls:
-                c = COLOR_WALL
-            elif pos_3d in env.rewards:
-                c = COLOR_REWARD if env.rewards[pos_3d] > 0 else COLOR_PENALTY
-            else:
-                c = COLOR_EMPTY
-
-            # ایجاد مکعب (scale=0.9 برای فاصله بین مکعب‌ها)
-            cube = Entity(
-                model='cube',
-                color=c,
-                position=pos_3d,
-                scale=0.9,
-                collider='box'
-            )
-            entities.append(cube)
+# ساخت مکعب‌ها: همه در چند مش ترکیبی، نه یک Entity برای هر وکسل
+# (scale=0.9 برای فاصله بین مکعب‌ها)
+cubes = VoxelMeshes((depth, height, width), scale=0.9)
+cubes.fill(np.ones(cubes.shape, dtype=bool), COLOR_EMPTY)
+cubes.fill(env.wall, COLOR_WALL)
+# خانه‌های پاداش و جریمه مستقیم از آرایه‌های محیط
+open_terminal = env.terminal & ~env.wall
+cubes.fill(open_terminal & (env.reward > 0), COLOR_REWARD)
+cubes.fill(open_terminal & (env.reward <= 0), COLOR_PENALTY)
+cubes.flush()
 
 # نمایش مسیر
+path_cubes = VoxelMeshes(cubes.shape, scale=0.7)
 for p in agent_path:
     if p != env.start_pos and not env.is_terminal(p):
-        Entity(
-            model='cube',
-            color=COLOR_PATH,
-            position=p,
-            scale=0.7
-        )
+        path_cubes.set(p, COLOR_PATH)
+path_cubes.flush()
 
 # مکان عامل
 agent_entity = Entity(
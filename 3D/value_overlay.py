@@ -0,0 +1,128 @@
+# value_overlay.py - V of every cell as a texture on the floor, instead of a Text per cell
+#
+# each layer of the map gets one plane just above its floor slabs, textured with one
+# texel per cell: red for negative values, grey around 0, green for positive ones, clear
+# for walls. set_values() / set_cell() rewrite the texels and upload them into the same
+# textures, nothing is created or destroyed. numbers are drawn by a fixed pool of LABELS
+# Text entities that follow the cells nearest the camera and the cell under the cursor.
+#
+#   overlay = ValueOverlay((depth, height, width), top=0.055)
+#   overlay.set_values(V, env.wall)         after each solve
+#   overlay.set_cell(pos, V.get(pos, 0.0))  after an edit, nan for a wall
+#   overlay.update_labels(camera.world_position, cursor_cell)   every frame
+
+import numpy as np
+from panda3d.core import SamplerState, Texture as PandaTexture, TransparencyAttrib
+from ursina import Entity, Mesh, Text, Texture, Vec3, color, destroy, scene
+
+LABELS = 32
+LABEL_RADIUS = 6.0
+
+NEGATIVE = np.array([255, 60, 60, 220], dtype=float)
+NEUTRAL = np.array([128, 128, 128, 220], dtype=float)
+POSITIVE = np.array([60, 255, 60, 220], dtype=float)
+
+
+def value_rgba(values, scale):
+    # (..., 4) uint8 colours of values, scale is the |value| drawn at full colour
+    t = np.clip(np.nan_to_num(values) / scale, -1.0, 1.0)[..., None]
+    rgba = np.where(t < 0, NEUTRAL + (NEUTRAL - NEGATIVE) * t, NEUTRAL + (POSITIVE - NEUTRAL) * t)
+    rgba[np.isnan(values)] = 0
+    return rgba.astype(np.uint8)
+
+
+def label_color(value):
+    if value > 0.01:
+        return color.lime
+    if value < -0.01:
+        return color.red
+    return color.white
+
+
+class ValueOverlay:
+    def __init__(self, shape, top):
+        self.shape = tuple(shape)
+        self.top = top
+        depth, height, width = self.shape
+        self.values = np.zeros(self.shape)
+        self.scale = 1.0
+        self.textures, self.planes = [], []
+        for y in range(height):
+            tex = PandaTexture(f"values_{y}")
+            tex.setup_2d_texture(depth, width, PandaTexture.T_unsigned_byte, PandaTexture.F_rgba8)
+            tex.set_magfilter(SamplerState.FT_nearest)
+            tex.set_minfilter(SamplerState.FT_nearest)
+            # u runs along x, v along z, so texel (z, x) of a layer is cell (x, y, z)
+            x0, x1, z0, z1, h = -0.5, depth - 0.5, -0.5, width - 0.5, y + top + 0.005
+            mesh = Mesh(vertices=[(x0, h, z0), (x1, h, z0), (x1, h, z1), (x0, h, z1)],
+                        triangles=[0, 1, 2, 0, 2, 3], uvs=[(0, 0), (1, 0), (1, 1), (0, 1)])
+            plane = Entity(model=mesh, texture=Texture(tex), double_sided=True)
+            plane.set_transparency(TransparencyAttrib.M_alpha)
+            self.textures.append(tex)
+            self.planes.append(plane)
+        self.labels = [Text(text='', parent=scene, origin=(0, 0), scale=4.0, billboard=True,
+                            background=False, enabled=False) for _ in range(LABELS)]
+        self.label_key = None
+        self.upload(range(height))
+
+    def set_values(self, V, wall=None):
+        # V: the solver's value view or a plain {cell: value} dict (cells without a value
+        # read 0), wall: voxel mask of the cells drawn clear
+        self.values[:] = 0.0
+        if V:
+            from rlgrid.state_index import as_state_view  # the viewer puts rlgrid on sys.path after importing us
+            V = as_state_view(V, self.shape)
+            self.values.flat[V.index.cells] = V.data
+        if wall is not None:
+            self.values[wall] = np.nan
+        finite = np.abs(self.values[~np.isnan(self.values)])
+        self.scale = max(float(finite.max(initial=0.0)), 1e-9)
+        self.label_key = None
+        self.upload(range(self.shape[1]))
+
+    def set_cell(self, pos, value):
+        self.values[pos] = value
+        self.label_key = None
+        self.upload([pos[1]])
+
+    def upload(self, layers):
+        for y in layers:
+            rgba = value_rgba(self.values[:, y, :].T, self.scale)  # (width, depth, 4): rows are z
+            bgra = np.ascontiguousarray(rgba[..., [2, 1, 0, 3]])
+            self.textures[y].set_ram_image(bgra.tobytes())
+
+    def show(self, visible):
+        for plane in self.planes:
+            plane.enabled = visible
+        if not visible:
+            for label in self.labels:
+                label.enabled = False
+        self.label_key = None
+
+    def update_labels(self, eye, cursor=None):
+        # label the cell under the cursor and the cells nearest eye (world position),
+        # recomputed only when the camera moved to another cell or the cursor cell changed
+        eye = np.array([eye[0], eye[1], eye[2]])
+        key = (tuple(np.rint(eye).astype(int).tolist()), cursor)
+        if key == self.label_key:
+            return
+        self.label_key = key
+        cells = np.argwhere(~np.isnan(self.values))
+        dist = np.linalg.norm(cells - eye, axis=1)
+        near = np.argsort(dist)[:LABELS]
+        chosen = [tuple(c) for c in cells[near[dist[near] <= LABEL_RADIUS]].tolist()]
+        if cursor is not None and not np.isnan(self.values[cursor]):
+            chosen = [cursor] + [c for c in chosen if c != cursor]
+        for label, cell in zip(self.labels, chosen[:LABELS]):
+            value = float(self.values[cell])
+            label.text = f"{value:.2f}"
+            label.color = label_color(value)
+            label.position = Vec3(*cell) + Vec3(0, self.top + 0.01, 0)
+            label.enabled = True
+        for label in self.labels[len(chosen):]:
+            label.enabled = False
+
+    def destroy(self):
+        for e in self.planes + self.labels:
+            destroy(e)
+        self.planes, self.labels, self.textures = [], [], []
@@ -0,0 +1,139 @@
+# voxel_view.py - voxel boxes of the 3D viewers drawn as a few combined meshes
+#
+# one Entity (and one box collider) per voxel stops being interactive well before a
+# 40x40x40 world. VoxelMeshes cuts the world into CHUNK^3 blocks and draws each block as
+# one mesh with per-vertex colours, so a frame costs a few hundred draw calls at most and
+# an edit rebuilds only the block holding the touched cell. nothing has a collider:
+# pick_cell() intersects the mouse ray with the floor plane of every layer instead.
+#
+#   floors = VoxelMeshes((depth, height, width), scale=(0.95, 0.11, 0.95))
+#   floors.fill(mask, color.gray)        every cell where mask is True
+#   floors.set(pos, color.azure)         one cell, None removes its box
+#   floors.flush()                       rebuild the blocks changed since the last flush
+#   pos = pick_cell(floors.shape, top=0.055)
+
+import numpy as np
+from ursina import Entity, Mesh, destroy, mouse, scene, window
+
+CHUNK = 8
+
+
+def _box_template():
+    # 24 corners (4 per face) and normals of a unit box centred on the origin
+    corners, normals = [], []
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        for sign in (-1.0, 1.0):
+            normal = np.zeros(3)
+            normal[axis] = sign
+            for du, dv in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                corner = normal.copy()
+                corner[u], corner[v] = du, dv
+                corners.append(corner * 0.5)
+                normals.append(normal)
+    return np.array(corners), np.array(normals)
+
+
+BOX_CORNERS, BOX_NORMALS = _box_template()
+BOX_TRIANGLES = (np.array([0, 1, 2, 0, 2, 3]) + 4 * np.arange(6)[:, None]).ravel()
+
+
+def box_arrays(centers, scale, colors):
+    # vertices, triangles, normals and colours of one box per row of centers
+    n = len(centers)
+    vertices = (centers[:, None, :] + BOX_CORNERS * scale).reshape(-1, 3)
+    triangles = (BOX_TRIANGLES + len(BOX_CORNERS) * np.arange(n)[:, None]).ravel()
+    normals = np.broadcast_to(BOX_NORMALS, (n,) + BOX_NORMALS.shape).reshape(-1, 3)
+    colors = np.repeat(colors, len(BOX_CORNERS), axis=0)
+    return vertices, triangles, normals, colors
+
+
+class VoxelMeshes:
+    def __init__(self, shape, scale, chunk=CHUNK):
+        self.shape = tuple(shape)
+        self.scale = np.asarray(scale, dtype=float)
+        self.chunk = chunk
+        self.filled = np.zeros(self.shape, dtype=bool)
+        self.colors = np.zeros(self.shape + (4,), dtype=np.float32)
+        self.entities = {}  # block ==> Entity holding its mesh
+        self.dirty = set()
+
+    def block_of(self, pos):
+        return tuple(c // self.chunk for c in pos)
+
+    def fill(self, mask, rgba):
+        self.filled[mask] = True
+        self.colors[mask] = tuple(rgba)
+        self.dirty.update(map(tuple, np.unique(np.argwhere(mask) // self.chunk, axis=0).tolist()))
+
+    def set(self, pos, rgba):
+        if rgba is None:
+            if not self.filled[pos]:
+                return
+            self.filled[pos] = False
+        else:
+            rgba = np.asarray(tuple(rgba), dtype=np.float32)
+            if self.filled[pos] and np.array_equal(self.colors[pos], rgba):
+                return
+            self.filled[pos] = True
+            self.colors[pos] = rgba
+        self.dirty.add(self.block_of(pos))
+
+    def flush(self):
+        for block in self.dirty:
+            self.build_block(block)
+        self.dirty.clear()
+
+    def build_block(self, block):
+        lo = [b * self.chunk for b in block]
+        box = tuple(slice(l, l + self.chunk) for l in lo)
+        cells = np.argwhere(self.filled[box])
+        entity = self.entities.pop(block, None)
+        if entity is not None:
+            destroy(entity)
+        if not len(cells):
+            return
+        colors = self.colors[box][tuple(cells.T)]
+        vertices, triangles, normals, colors = box_arrays(cells + lo, self.scale, colors)
+        mesh = Mesh(vertices=vertices.tolist(), triangles=triangles.tolist(),
+                    normals=normals.tolist(), colors=[tuple(c) for c in colors.tolist()])
+        self.entities[block] = Entity(model=mesh, double_sided=True)
+
+    def destroy(self):
+        for entity in self.entities.values():
+            destroy(entity)
+        self.entities.clear()
+        self.dirty.clear()
+
+
+def ray_to_cell(origin, direction, shape, top):
+    # first voxel (x, y, z) whose floor plane y + top the ray crosses inside the grid, or None
+    origin = np.asarray(origin, dtype=float)
+    direction = np.asarray(direction, dtype=float)
+    if abs(direction[1]) < 1e-12:
+        return None
+    layers = np.arange(shape[1])
+    t = (layers + top - origin[1]) / direction[1]
+    x = np.rint(origin[0] + t * direction[0])
+    z = np.rint(origin[2] + t * direction[2])
+    hit = (t > 0) & (x >= 0) & (x < shape[0]) & (z >= 0) & (z < shape[2])
+    if not hit.any():
+        return None
+    i = np.flatnonzero(hit)[t[hit].argmin()]
+    return int(x[i]), int(layers[i]), int(z[i])
+
+
+def mouse_ray():
+    # world origin and direction of the ray through the mouse (the screen centre while
+    # the mouse is locked), the same film coordinates ursina's own picking uses
+    from panda3d.core import Point2, Point3
+    near, far = Point3(), Point3()
+    lens = base.cam.node().get_lens()
+    lens.extrude(Point2(mouse.x * 2 / window.aspect_ratio, mouse.y * 2), near, far)
+    near = scene.get_relative_point(base.cam, near)
+    far = scene.get_relative_point(base.cam, far)
+    return tuple(near), tuple(far - near)
+
+
+def pick_cell(shape, top):
+    return ray_to_cell(*mouse_ray(), shape, top)
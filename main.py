@@ -1,11 +1,27 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, Toplevel
-import os, json
-from grid import GridWorld, ACTION_SPACE
-from value_iteration import value_iteration
+import os
+import numpy as np
+from rlgrid.grid import GridWorld, ACTION_SPACE
+from rlgrid import maps
+from rlgrid.generate import grid_from_mask
+from rlgrid.value_iteration import SOLVERS, INCREMENTAL, resolve
+from rlgrid.solvers import IncrementalSolver
+from rlgrid.solve_cache import SolveCache
 
 CELL_SIZE = 80
+# cell sizes in pixels, images are scaled from CELL_SIZE so every level divides or is a multiple of it
+ZOOM_LEVELS = (160, 80, 40, 20, 10, 5, 2, 1)
+HEATMAP_BELOW = 10  # smaller cells are drawn as one heatmap raster instead of per-cell items
+TEXT_MIN_SIZE = 40  # value / policy text is only shown on cells at least this large
+VIEW_WIDTH, VIEW_HEIGHT = 960, 720
+HEAT_COLORS = {"empty": (235, 235, 235), "wall": (40, 40, 40), "reward": (0, 200, 0),
+               "penalty": (220, 0, 0), "start": (0, 120, 255)}
+# low .. high values
+HEAT_RAMP_STOPS = (0.0, 0.5, 1.0)
+HEAT_RAMP = np.array([(68, 1, 84), (33, 145, 140), (253, 231, 37)], dtype=float)
 SAVE_DIR = "saved_maps"
+SOLVE_CACHE_DIR = "solve_cache"
 
 class GridEditorGUI:
     def __init__(self, root):
@@ -20,12 +36,34 @@ class GridEditorGUI:
         self.start_pos = (0, 0)
         self.edit_mode = "wall"
         self.show_values = False
+        self.solver_name = tk.StringVar(value="Value Iteration")
+        self.incremental = IncrementalSolver()
+        self.cache = SolveCache(directory=SOLVE_CACHE_DIR)
+        self.edited = None  # cells changed since the last incremental solve, None = whole map
         
         self.V = {}
         self.policy = {}
         self.agent_pos = None
         self.visited_cells = set()
         self.start_text_override = None
+
+        # canvas items are created once per cell and only reconfigured when the look of
+        # the cell changes: cell_items[(i, j)] = [image, start text, value text] ids
+        # (texts created on first use), cell_looks[(i, j)] = what the cell shows now
+        self.cell_items = {}
+        self.cell_looks = {}
+        self.drawn_shape = None
+        self.drawn_view = None
+        self.agent_item = None
+        self.show_agent = False
+        # only the visible window of cells is drawn, at cell_size pixels per cell; below
+        # HEATMAP_BELOW the window is one PhotoImage cut from heat_rgb (colour per cell)
+        self.cell_size = CELL_SIZE
+        self.scaled = {}
+        self.heat_rgb = None
+        self.heat_range = None
+        self.heat_item = None
+        self.heat_image = None
         
         self.images = {}
         self.load_images()
@@ -33,10 +71,27 @@ class GridEditorGUI:
 
         self.create_toolbar()
 
-        self.canvas = tk.Canvas(root, bg="white")
-        self.canvas.pack()
+        view = tk.Frame(root)
+        view.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(view, bg="white")
+        xbar = tk.Scrollbar(view, orient=tk.HORIZONTAL, command=self.scroll_x)
+        ybar = tk.Scrollbar(view, orient=tk.VERTICAL, command=self.scroll_y)
+        self.canvas.config(xscrollcommand=xbar.set, yscrollcommand=ybar.set)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        ybar.grid(row=0, column=1, sticky="ns")
+        xbar.grid(row=1, column=0, sticky="ew")
+        view.rowconfigure(0, weight=1)
+        view.columnconfigure(0, weight=1)
         self.update_canvas_size()
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Configure>", lambda e: self.redraw_view())
+        # wheel scrolls, Ctrl+wheel zooms, middle button drags the view
+        for wheel in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(wheel, self.on_mouse_wheel)
+        self.canvas.bind("<ButtonPress-2>", self.on_pan_start)
+        self.canvas.bind("<B2-Motion>", self.on_pan)
+        root.bind("<plus>", lambda e: self.zoom(1))
+        root.bind("<minus>", lambda e: self.zoom(-1))
 
         self.create_menubar()
         self.draw_grid()
@@ -88,8 +143,18 @@ class GridEditorGUI:
 
         view_menu = tk.Menu(menubar, tearoff=0)
         view_menu.add_command(label="Toggle Values/Policy", command=self.toggle_show_values)
+        view_menu.add_command(label="Zoom In (+)", command=lambda: self.zoom(1))
+        view_menu.add_command(label="Zoom Out (-)", command=lambda: self.zoom(-1))
+        view_menu.add_command(label="Solve Cache Stats", command=self.show_cache_stats)
         menubar.add_cascade(label="View", menu=view_menu)
 
+        solver_menu = tk.Menu(menubar, tearoff=0)
+        for name in SOLVERS:
+            solver_menu.add_radiobutton(label=name, variable=self.solver_name, value=name)
+        solver_menu.add_separator()
+        solver_menu.add_radiobutton(label=INCREMENTAL, variable=self.solver_name, value=INCREMENTAL)
+        menubar.add_cascade(label="Solver", menu=solver_menu)
+
         self.root.config(menu=menubar)
 
     def set_edit_mode(self, mode):
@@ -99,83 +164,283 @@ class GridEditorGUI:
         self.show_values = not self.show_values
         self.draw_grid()
 
+    def show_cache_stats(self):
+        stats = self.cache.stats()
+        messagebox.showinfo("Solve Cache", "\n".join(f"{k}: {v}" for k, v in stats.items()))
+
     def make_empty_grid(self):
-        rewards = {}
-        actions = {}
-        probs = {}
-        for i in range(self.rows):
-            for j in range(self.cols):
-                rewards[(i, j)] = self.step_cost
-                actions[(i, j)] = ACTION_SPACE
-                for a in ACTION_SPACE:
-                    ni, nj = i, j
-                    if a == 'U': ni = max(0, i - 1)
-                    if a == 'D': ni = min(self.rows - 1, i + 1)
-                    if a == 'L': nj = max(0, j - 1)
-                    if a == 'R': nj = min(self.cols - 1, j + 1)
-                    probs[((i, j), a)] = {(ni, nj): 1.0}
-
-        self.grid = GridWorld(self.rows, self.cols, self.start_pos)
-        self.grid.set(rewards, actions, probs)
+        # every cell open with step_cost and the four moves, built straight into the grid's arrays
+        self.grid = grid_from_mask(np.zeros((self.rows, self.cols), dtype=bool), self.start_pos, [], [],
+                                   self.step_cost)
 
     def update_canvas_size(self):
-        width = self.cols * CELL_SIZE
-        height = self.rows * CELL_SIZE
-        self.canvas.config(width=width, height=height)
-        self.root.geometry(f"{width+50}x{height+120}")
+        # the canvas is a window onto the grid, at most VIEW_WIDTH x VIEW_HEIGHT pixels
+        width = self.cols * self.cell_size
+        height = self.rows * self.cell_size
+        self.canvas.config(scrollregion=(0, 0, width, height),
+                           width=min(width, VIEW_WIDTH), height=min(height, VIEW_HEIGHT))
+        self.root.geometry(f"{min(width, VIEW_WIDTH)+50}x{min(height, VIEW_HEIGHT)+140}")
+
+    def scroll_x(self, *args):
+        self.canvas.xview(*args)
+        self.redraw_view()
+
+    def scroll_y(self, *args):
+        self.canvas.yview(*args)
+        self.redraw_view()
+
+    def on_mouse_wheel(self, event):
+        # wheel scrolls, Ctrl+wheel zooms (Button-4/5 are the wheel on X11)
+        up = event.num == 4 or event.delta > 0
+        if event.state & 0x4:
+            self.zoom(1 if up else -1)
+        else:
+            self.scroll_y(-3 if up else 3, "units")
+
+    def on_pan_start(self, event):
+        self.canvas.scan_mark(event.x, event.y)
+
+    def on_pan(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.redraw_view()
+
+    def zoom(self, step):
+        # step > 0 zooms in; the cell at the centre of the view stays there
+        level = ZOOM_LEVELS.index(self.cell_size)
+        level = min(max(level - step, 0), len(ZOOM_LEVELS) - 1)
+        if ZOOM_LEVELS[level] == self.cell_size:
+            return
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        cx = (self.canvas.canvasx(0) + w / 2) / self.cell_size
+        cy = (self.canvas.canvasy(0) + h / 2) / self.cell_size
+        self.cell_size = ZOOM_LEVELS[level]
+        self.update_canvas_size()
+        self.canvas.xview_moveto(max(0.0, (cx * self.cell_size - w / 2) / (self.cols * self.cell_size)))
+        self.canvas.yview_moveto(max(0.0, (cy * self.cell_size - h / 2) / (self.rows * self.cell_size)))
+        self.redraw_view()
+
+    def visible_range(self):
+        # (r0, r1, c0, c1): rows r0..r1-1 and cols c0..c1-1 are at least partly visible
+        cs = self.cell_size
+        x0, y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        w = max(self.canvas.winfo_width(), int(self.canvas.cget("width")))
+        h = max(self.canvas.winfo_height(), int(self.canvas.cget("height")))
+        return (max(0, int(y0 // cs)), min(self.rows, int((y0 + h) // cs) + 1),
+                max(0, int(x0 // cs)), min(self.cols, int((x0 + w) // cs) + 1))
+
+    def scaled_images(self):
+        # cell images at the current zoom, the PNGs are CELL_SIZE pixels wide
+        if self.cell_size == CELL_SIZE:
+            return self.images
+        if self.cell_size not in self.scaled:
+            if self.cell_size > CELL_SIZE:
+                k = self.cell_size // CELL_SIZE
+                self.scaled[self.cell_size] = {key: img.zoom(k) for key, img in self.images.items()}
+            else:
+                k = CELL_SIZE // self.cell_size
+                self.scaled[self.cell_size] = {key: img.subsample(k) for key, img in self.images.items()}
+        return self.scaled[self.cell_size]
+
+    def cell_look(self, i, j):
+        # (image key, start label, value text) shown by a cell
+        img_key = "empty"
+        if (i, j) == self.start_pos and self.start_text_override is None:
+            img_key = "start"
+        elif (i, j) in self.visited_cells and (i, j) != self.agent_pos:
+            img_key = "path"
+        elif (i, j) not in self.grid.actions:
+            if (i, j) in self.grid.rewards:
+                if self.grid.rewards[(i, j)] > 0:
+                    img_key = "reward"
+                elif self.grid.rewards[(i, j)] < 0:
+                    img_key = "penalty"
+                else:
+                    img_key = "wall"
+            else:
+                img_key = "wall"
+
+        val_text = ""
+        if self.show_values and (i, j) != self.agent_pos and self.cell_size >= TEXT_MIN_SIZE:
+            if self.V and (i, j) in self.V:
+                val_text = f"{self.V[(i, j)]:.2f}"
+            elif self.policy and (i, j) in self.policy:
+                val_text = list(self.policy[(i, j)].keys())[0]
+        return img_key, self.start_text_override == (i, j), val_text
 
-    def draw_grid(self, show_agent=False):
+    def clear_canvas(self):
         self.canvas.delete("all")
-        for i in range(self.rows):
-            for j in range(self.cols):
-                x = j * CELL_SIZE + CELL_SIZE // 2
-                y = i * CELL_SIZE + CELL_SIZE // 2
-                img_key = "empty"
-                if (i, j) == self.start_pos and self.start_text_override is None:
-                    img_key = "start"
-                elif (i, j) in self.visited_cells and (i, j) != self.agent_pos:
-                    img_key = "path"
-                elif (i, j) not in self.grid.actions:
-                    if (i, j) in self.grid.rewards:
-                        if self.grid.rewards[(i, j)] > 0:
-                            img_key = "reward"
-                        elif self.grid.rewards[(i, j)] < 0:
-                            img_key = "penalty"
-                        else:
-                            img_key = "wall"
-                    else:
-                        img_key = "wall"
-
-                if img_key in self.images:
-                    self.canvas.create_image(x, y, image=self.images[img_key])
-                else:
-                    self.canvas.create_rectangle(j*CELL_SIZE, i*CELL_SIZE,
-                                                 (j+1)*CELL_SIZE, (i+1)*CELL_SIZE,
-                                                 outline="black", fill="white")
-
-                if self.start_text_override == (i, j):
-                    self.canvas.create_text(x, y, text="start", fill="blue", font=("Arial", 14, "bold"))
-
-                if self.show_values and (i, j) != self.agent_pos:
-                    val_text = ""
-                    if self.V and (i, j) in self.V:
-                        val_text = f"{self.V[(i, j)]:.2f}"
-                    elif self.policy and (i, j) in self.policy:
-                        val_text = list(self.policy[(i, j)].keys())[0]
-                    if val_text:
-                        self.canvas.create_text(x, y, text=val_text, fill="black")
-
-        if show_agent and self.agent_pos:
-            ax = self.agent_pos[1] * CELL_SIZE + CELL_SIZE // 2
-            ay = self.agent_pos[0] * CELL_SIZE + CELL_SIZE // 2
-            self.canvas.create_image(ax, ay, image=self.images["agent"])
+        self.cell_items = {}
+        self.cell_looks = {}
+        self.agent_item = self.canvas.create_image(0, 0, state="hidden")
+        self.heat_item = None
+        self.heat_rgb = None
+        self.drawn_view = None
+
+    def create_cell(self, i, j):
+        # items of a cell that scrolled into view, configured by draw_cell
+        cs = self.cell_size
+        if self.images:
+            item = self.canvas.create_image(j * cs + cs // 2, i * cs + cs // 2)
+        else:
+            item = self.canvas.create_rectangle(j*cs, i*cs, (j+1)*cs, (i+1)*cs, outline="black", fill="white")
+        self.cell_items[(i, j)] = [item, None, None]
+
+    def delete_cell(self, cell):
+        self.canvas.delete(*[item for item in self.cell_items.pop(cell) if item is not None])
+        self.cell_looks.pop(cell, None)
+
+    def draw_cell(self, i, j, look):
+        # returns True when a text item had to be created
+        items = self.cell_items[(i, j)]
+        old = self.cell_looks.get((i, j), (None, False, ""))
+        img_key, start_label, val_text = look
+        images = self.scaled_images()
+        x = j * self.cell_size + self.cell_size // 2
+        y = i * self.cell_size + self.cell_size // 2
+        if img_key != old[0] and img_key in images:
+            self.canvas.itemconfig(items[0], image=images[img_key])
+        created = False
+        if start_label != old[1]:
+            if items[1] is None:
+                items[1] = self.canvas.create_text(x, y, text="start", fill="blue", font=("Arial", 14, "bold"))
+                created = True
+            self.canvas.itemconfig(items[1], state="normal" if start_label else "hidden")
+        if val_text != old[2]:
+            if items[2] is None:
+                items[2] = self.canvas.create_text(x, y, fill="black")
+                created = True
+            self.canvas.itemconfig(items[2], text=val_text)
+        self.cell_looks[(i, j)] = look
+        return created
+
+    def heat_colors(self):
+        # (rows, cols, 3) uint8 raster of the whole grid: V as a colour ramp once solved,
+        # otherwise the cell types
+        model = self.grid.compile()
+        rgb = np.empty((self.rows * self.cols, 3), dtype=np.uint8)
+        rgb[:] = HEAT_COLORS["wall"]
+        rgb[model.cells] = HEAT_COLORS["empty"]
+        self.heat_range = None
+        if self.V and self.V.index.shape == (self.rows, self.cols):
+            values = self.V.data  # V is the solver's view, its states index V.data
+            self.heat_range = (values.min(), values.max() - values.min())
+            rgb[self.V.index.cells] = self.value_colors(values)
+        terminal = model.cells[model.terminal]
+        terminal_rewards = model.rewards[model.terminal]
+        rgb[terminal[terminal_rewards > 0]] = HEAT_COLORS["reward"]
+        rgb[terminal[terminal_rewards < 0]] = HEAT_COLORS["penalty"]
+        rgb[terminal[terminal_rewards == 0]] = HEAT_COLORS["wall"]
+        rgb = rgb.reshape(self.rows, self.cols, 3)
+        if 0 <= self.start_pos[0] < self.rows and 0 <= self.start_pos[1] < self.cols:
+            rgb[self.start_pos] = HEAT_COLORS["start"]
+        return rgb
+
+    def value_colors(self, values):
+        low, span = self.heat_range
+        t = (values - low) / span if span > 0 else np.zeros_like(values)
+        return np.stack([np.interp(t, HEAT_RAMP_STOPS, channel) for channel in HEAT_RAMP.T], axis=-1).astype(np.uint8)
+
+    def heat_color(self, i, j):
+        # colour of a single cell, matching heat_colors
+        if (i, j) == self.start_pos:
+            return HEAT_COLORS["start"]
+        if (i, j) not in self.grid.actions:
+            reward = self.grid.rewards.get((i, j), 0)
+            return HEAT_COLORS["reward" if reward > 0 else "penalty" if reward < 0 else "wall"]
+        if self.heat_range is not None and (i, j) in self.V:
+            return self.value_colors(np.array([self.V[(i, j)]]))[0]
+        return HEAT_COLORS["empty"]
+
+    def draw_heatmap(self):
+        # the visible part of the grid as one PhotoImage, cell_size pixels per cell
+        if self.heat_rgb is None:
+            self.heat_rgb = self.heat_colors()
+        r0, r1, c0, c1 = self.visible_range()
+        cs = self.cell_size
+        block = self.heat_rgb[r0:r1, c0:c1]
+        pixels = np.repeat(np.repeat(block, cs, axis=0), cs, axis=1)
+        height, width = pixels.shape[:2]
+        self.heat_image = tk.PhotoImage(width=width, height=height,
+                                        data=b"P6 %d %d 255\n" % (width, height) + pixels.tobytes(), format="PPM")
+        if self.heat_item is None:
+            self.heat_item = self.canvas.create_image(0, 0, anchor="nw")
+        self.canvas.coords(self.heat_item, c0 * cs, r0 * cs)
+        self.canvas.itemconfig(self.heat_item, image=self.heat_image, state="normal")
+
+    def redraw_view(self, cells=None):
+        # bring the canvas in line with the visible window: cells scrolled out of view
+        # lose their items, cells scrolled in get new ones. cells: the cells whose
+        # content may have changed (None: all visible cells)
+        if self.drawn_shape != (self.rows, self.cols):
+            self.draw_grid(self.show_agent)
+            return
+        if self.cell_size < HEATMAP_BELOW:
+            for cell in list(self.cell_items):
+                self.delete_cell(cell)
+            self.drawn_view = None
+            self.draw_heatmap()
+            self.canvas.itemconfig(self.agent_item, state="hidden")
+            return
+        if self.heat_item is not None:
+            self.canvas.itemconfig(self.heat_item, state="hidden")
+
+        view = self.visible_range() + (self.cell_size,)
+        if view != self.drawn_view:
+            r0, r1, c0, c1, cs = view
+            if self.drawn_view is not None and self.drawn_view[4] != cs:
+                for cell in list(self.cell_items):
+                    self.delete_cell(cell)
+            for cell in [c for c in self.cell_items if not (r0 <= c[0] < r1 and c0 <= c[1] < c1)]:
+                self.delete_cell(cell)
+            for i in range(r0, r1):
+                for j in range(c0, c1):
+                    if (i, j) not in self.cell_items:
+                        self.create_cell(i, j)
+            self.drawn_view = view
+            cells = None
+        if cells is None:
+            cells = list(self.cell_items)
+
+        created = False
+        for (i, j) in cells:
+            if (i, j) not in self.cell_items:
+                continue
+            look = self.cell_look(i, j)
+            if look != self.cell_looks.get((i, j)):
+                created |= self.draw_cell(i, j, look)
+        if created:  # keep the agent above new text items
+            self.canvas.tag_raise(self.agent_item)
+
+        if self.show_agent and self.agent_pos:
+            cs = self.cell_size
+            self.canvas.coords(self.agent_item, self.agent_pos[1] * cs + cs // 2, self.agent_pos[0] * cs + cs // 2)
+            self.canvas.itemconfig(self.agent_item, image=self.scaled_images().get("agent"), state="normal")
+            self.canvas.tag_raise(self.agent_item)
+        else:
+            self.canvas.itemconfig(self.agent_item, state="hidden")
+
+    def draw_grid(self, show_agent=False, cells=None):
+        # cells: the cells that may have changed, None when anything may have. only
+        # visible cells whose look differs from what is on the canvas are touched
+        if self.drawn_shape != (self.rows, self.cols):
+            self.clear_canvas()
+            self.drawn_shape = (self.rows, self.cols)
+            cells = None
+        self.show_agent = show_agent
+        if cells is None:
+            self.heat_rgb = None
+        elif self.heat_rgb is not None:
+            for cell in cells:
+                self.heat_rgb[cell] = self.heat_color(*cell)
+        self.redraw_view(cells)
 
     def on_canvas_click(self, event):
-        j = event.x // CELL_SIZE
-        i = event.y // CELL_SIZE
+        j = int(self.canvas.canvasx(event.x) // self.cell_size)
+        i = int(self.canvas.canvasy(event.y) // self.cell_size)
         if not (0 <= i < self.rows and 0 <= j < self.cols):
             return
 
+        changed = {(i, j), self.start_pos}
         if self.edit_mode == "wall":
             if (i, j) in self.grid.actions:
                 del self.grid.actions[(i, j)]
@@ -196,7 +461,9 @@ class GridEditorGUI:
             self.grid.rewards[(i, j)] = self.step_cost
             self.grid.actions[(i, j)] = ACTION_SPACE
 
-        self.draw_grid()
+        if self.edit_mode != "start" and self.edited is not None:
+            self.edited.add((i, j))
+        self.draw_grid(cells=changed)
 
     def change_size(self):
         try:
@@ -206,6 +473,8 @@ class GridEditorGUI:
             return
         self.rows = new_rows
         self.cols = new_cols
+        self.edited = None
+        self.V, self.policy = {}, {}
         self.make_empty_grid()
         self.update_canvas_size()
         self.draw_grid()
@@ -216,6 +485,7 @@ class GridEditorGUI:
         except (ValueError, TypeError):
             return
         self.step_cost = new_cost
+        self.edited = None
         for (i, j) in list(self.grid.rewards.keys()):
             if (i, j) in self.grid.actions and self.grid.rewards[(i, j)] == self.step_cost:
                 self.grid.rewards[(i, j)] = new_cost
@@ -229,6 +499,7 @@ class GridEditorGUI:
         for pos in self.grid.rewards:
             if self.grid.rewards[pos] > 0:
                 self.grid.rewards[pos] = new_reward
+        self.edited = None
         self.draw_grid()
 
     def change_penalty_value(self):
@@ -239,51 +510,46 @@ class GridEditorGUI:
         for pos in self.grid.rewards:
             if self.grid.rewards[pos] < 0:
                 self.grid.rewards[pos] = new_penalty
+        self.edited = None
         self.draw_grid()
 
     def reset_grid(self):
         self.visited_cells.clear()
         self.agent_pos = None
         self.start_text_override = None
+        self.edited = None
         self.make_empty_grid()
         self.draw_grid()
 
 
     def save_map(self):
-        name = simpledialog.askstring("Save Map", "Enter map name:", parent=self.root)
+        name = simpledialog.askstring("Save Map", "Enter map name (end it with .npz for the compact binary format):",
+                                      parent=self.root)
         if not name:
             return
-        data = {
-            "rows": self.rows,
-            "cols": self.cols,
-            "start_pos": self.start_pos,
-            "rewards": {f"{i},{j}": v for (i, j), v in self.grid.rewards.items()},
-            "actions": {f"{i},{j}": v for (i, j), v in self.grid.actions.items()},
-            "probs": {
-                f"{i},{j}|{a}": {f"{ni},{nj}": p for (ni, nj), p in dest.items()}
-                for ((i, j), a), dest in self.grid.probs.items()
-            }
-        }
-        with open(os.path.join(SAVE_DIR, f"{name}.json"), "w") as f:
-            json.dump(data, f)
+        if not name.endswith(maps.BINARY_EXT):
+            name += ".json"
+        maps.save_map(self.grid, os.path.join(SAVE_DIR, name))
         messagebox.showinfo("Saved", f"Map '{name}' saved successfully!")
 
     def load_map(self, path):
         try:
-            with open(path, "r") as f:
-                data = json.load(f)
-            self.rows = data["rows"]
-            self.cols = data["cols"]
-            self.start_pos = tuple(data["start_pos"])
-            self.grid = GridWorld(self.rows, self.cols, self.start_pos)
-
-            self.grid.rewards = {tuple(map(int, k.split(","))): v for k, v in data["rewards"].items()}
-            self.grid.actions = {tuple(map(int, k.split(","))): v for k, v in data["actions"].items()}
-            self.grid.probs = {
-                (tuple(map(int, key.split("|")[0].split(","))), key.split("|")[1]):
-                    {tuple(map(int, dest_key.split(","))): prob for dest_key, prob in dests.items()}
-                for key, dests in data["probs"].items()
-            }
+            grid = maps.load_map(path)
+            if not isinstance(grid, GridWorld):
+                raise ValueError("not a 2D map")
+            self.grid = grid
+            self.rows = grid.rows
+            self.cols = grid.cols
+            self.start_pos = grid.start
+            self.edited = None
+
+            # maps solved before show their values and policy right away
+            self.V, self.policy = {}, {}
+            name = self.solver_name.get()
+            if name in SOLVERS:
+                cached = SOLVERS[name](self.grid, cache=self.cache, cache_only=True)
+                if cached is not None:
+                    self.V, self.policy = cached
 
             self.update_canvas_size()
             self.draw_grid()
@@ -305,11 +571,16 @@ class GridEditorGUI:
 
         tk.Label(win, text="--- Saved Maps ---").pack(pady=5)
         for file in os.listdir(SAVE_DIR):
-            if file.endswith(".json") and not file.startswith("preset"):
-                tk.Button(win, text=file[:-5], command=lambda p=os.path.join(SAVE_DIR, file): (self.load_map(p), win.destroy())).pack(fill="x", pady=1)
+            if file.endswith((".json", maps.BINARY_EXT)) and not file.startswith("preset"):
+                tk.Button(win, text=file, command=lambda p=os.path.join(SAVE_DIR, file): (self.load_map(p), win.destroy())).pack(fill="x", pady=1)
 
     def run_value_iteration(self):
-        self.V, self.policy = value_iteration(self.grid)
+        name = self.solver_name.get()
+        if name == INCREMENTAL:
+            self.V, self.policy = resolve(self.grid, self.incremental, self.edited)
+            self.edited = set()
+        else:
+            self.V, self.policy = SOLVERS[name](self.grid, cache=self.cache)
         self.draw_grid()
         self.simulate_policy(self.policy)
 
@@ -338,10 +609,15 @@ class GridEditorGUI:
                 if self.agent_pos == terminal_state:
                     if terminal_state in self.grid.rewards and self.grid.rewards[terminal_state] > 0:
                         del self.grid.rewards[terminal_state]
-                self.draw_grid(show_agent=True)
+                        if self.edited is not None:
+                            self.edited.add(terminal_state)
+                # first frame clears the previous run, then only the cells the agent
+                # left and entered change
+                changed = None if index == 0 else {path[index - 1], self.agent_pos, start_state}
+                self.draw_grid(show_agent=True, cells=changed)
                 self.root.after(delay, lambda: step_animation(index + 1))
             else:
-                self.draw_grid(show_agent=True)
+                self.draw_grid(show_agent=True, cells=())
         step_animation(0)
 
 if __name__ == "__main__":
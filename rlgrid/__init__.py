@@ -0,0 +1,15 @@
+# rlgrid - GridWorld environments and solvers without any GUI dependency
+#
+# the Tk editor (main.py) and the 3D viewers (3D/) are thin front ends over this
+# package. importing it only pulls in numpy; scipy (exact policy evaluation),
+# multiprocessing (sweep) and plotting are imported when they are used.
+#
+#   python -m rlgrid solve saved_maps/preset1.json
+
+from .grid import GridWorld, CompiledGrid, ACTION_SPACE, grid_from_json
+from .grid_3d import GridWorld3D, CompiledGrid3D, ACTIONS_3D, grid_3d_from_json
+from .maps import load_map, map_from_json
+from .solvers import IncrementalSolver
+from .vec_env import VecEnv, monte_carlo_values
+from .solve_cache import SolveCache
+from .monitor import SolveMonitor
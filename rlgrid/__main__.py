@@ -0,0 +1,197 @@
+# python -m rlgrid - solve saved maps without opening a GUI
+#
+#   python -m rlgrid solve saved_maps/preset1.json
+#   python -m rlgrid solve 3D/saved_maps/custom_3d_map.json --solver policy_iteration --out solution.npz
+#   python -m rlgrid solve saved_maps/preset1.json --log solve.jsonl --profile solve.prof   (see monitor.py)
+#   python -m rlgrid solve saved_maps/preset1.json --mode gauss_seidel              (see solvers.py)
+#   python -m rlgrid sweep saved_maps/preset1.json --gamma 0.9 0.99 --workers 4   (see sweep.py)
+#   python -m rlgrid convert saved_maps/preset1.json preset1.npz                (see maps.py)
+#   python -m rlgrid bench --quick --baseline bench.json                          (see bench.py)
+#   python -m rlgrid generate maze.npz --shape 1001 1001 --layout maze --seed 1   (see generate.py)
+#   python -m rlgrid learn saved_maps/preset1.json --method sarsa --epsilon-final 0   (see td_learning.py)
+#
+# solve prints the values and the greedy policy laid out like the map ('#' walls,
+# '*' terminals; 3D maps one x layer at a time) or writes them to --out:
+#   .json  {"V": {"i,j": v}, "policy": {"i,j": "U"}} with the keys of the map files
+#   .npz   states (S, ndim), V (S,), Q (S, A), policy (S,) action indices, actions, shape
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from .grid_3d import GridWorld3D, SLIP_TARGETS
+from .maps import load_map, save_map, shape_of, action_names
+from .solvers import VI_MODES
+
+WALL_MARK = "#"
+TERMINAL_MARK = "*"
+
+
+def solvers_for(grid):
+    # solver functions keyed by name, the 2D and 3D modules share the same names
+    if isinstance(grid, GridWorld3D):
+        from .value_iteration_3d import SOLVERS
+    else:
+        from .value_iteration import SOLVERS
+    return {f.__name__: f for f in SOLVERS.values()}
+
+
+def solve(grid, solver="value_iteration", gamma=0.9, threshold=None, monitor=None, mode=None):
+    # (V, policy, arrays) of the chosen solver, threshold=None keeps the solver's default.
+    # mode picks the value iteration variant (solvers.VI_MODES)
+    f = solvers_for(grid)[solver]
+    args = (gamma,) if threshold is None else (gamma, threshold)
+    kwargs = {} if mode is None else {"mode": mode}
+    return f(grid, *args, return_arrays=True, monitor=monitor, **kwargs)
+
+
+def layout(grid, policy, arrays):
+    # value and policy tables shaped like the map, walls masked. the policy views of
+    # the solvers leave out terminal states
+    shape = shape_of(grid)
+    states = np.asarray(arrays["states"], dtype=int).reshape(-1, len(shape))
+    where = tuple(states.T)
+
+    values = np.full(shape, WALL_MARK, dtype=object)
+    values[where] = ["%.3f" % v for v in arrays["V"].tolist()]
+
+    names = np.array(action_names(grid), dtype=object)[arrays["policy"]]
+    terminal = ~policy.mask()
+    actions = np.full(shape, WALL_MARK, dtype=object)
+    actions[where] = np.where(terminal, TERMINAL_MARK, names)
+    return values, actions
+
+
+def print_table(table, out):
+    width = max(len(str(v)) for v in table.flat)
+    for row in table:
+        out.write(" ".join(str(v).rjust(width) for v in row) + "\n")
+
+
+def print_solution(grid, policy, arrays, out=None):
+    out = sys.stdout if out is None else out
+    values, actions = layout(grid, policy, arrays)
+    for title, table in (("V", values), ("policy", actions)):
+        if table.ndim == 2:
+            out.write(title + "\n")
+            print_table(table, out)
+        else:
+            for x, layer in enumerate(table):
+                out.write("%s x=%d\n" % (title, x))
+                print_table(layer, out)
+        out.write("\n")
+
+
+def save_solution(grid, policy, arrays, path):
+    names = action_names(grid)
+    if path.endswith(".npz"):
+        np.savez_compressed(path, states=np.asarray(arrays["states"], dtype=np.int32),
+                            V=arrays["V"], Q=arrays["Q"], policy=arrays["policy"],
+                            actions=np.array(names), shape=np.array(shape_of(grid)))
+        return
+    key = lambda s: ",".join(map(str, s))
+    data = {
+        "V": {key(s): v for s, v in zip(arrays["states"], arrays["V"].tolist())},
+        "policy": {key(s): names[a] for s, a, keep in zip(arrays["states"], arrays["policy"].tolist(),
+                                                          policy.mask().tolist()) if keep},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["sweep"]:
+        from .sweep import main as sweep_main
+        return sweep_main(argv[1:], prog="python -m rlgrid sweep")
+    if argv[:1] == ["bench"]:
+        from .bench import main as bench_main
+        return bench_main(argv[1:], prog="python -m rlgrid bench")
+
+    parser = argparse.ArgumentParser(prog="python -m rlgrid", description="Solve and convert saved 2D or 3D maps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sweep", help="parameter sweep, see python -m rlgrid sweep -h")
+    commands.add_parser("bench", help="benchmark ladder, see python -m rlgrid bench -h")
+
+    solve_args = commands.add_parser("solve", help="solve a map and print or save V and the policy")
+    solve_args.add_argument("map", help="2D or 3D map (.json or .npz)")
+    solve_args.add_argument("--solver", default="value_iteration",
+                            choices=["value_iteration", "policy_iteration",
+                                     "modified_policy_iteration", "prioritized_sweeping"])
+    solve_args.add_argument("--gamma", type=float, default=0.9)
+    solve_args.add_argument("--threshold", type=float, default=None, help="stopping threshold (solver default)")
+    solve_args.add_argument("--mode", choices=VI_MODES, default=None,
+                            help="value iteration variant: in-place sweeps, over-relaxed or Anderson-accelerated")
+    solve_args.add_argument("--out", help="write V and the policy to a .json or .npz file instead of printing")
+    solve_args.add_argument("--log", help="append one JSON line per solver iteration and a final report to this file")
+    solve_args.add_argument("--profile", help="write cProfile stats of the solve to this file (pstats format)")
+
+    convert_args = commands.add_parser("convert", help="convert a map between .json and the binary .npz format")
+    convert_args.add_argument("src")
+    convert_args.add_argument("dst")
+
+    generate_args = commands.add_parser("generate", help="write a seeded random, maze or rooms map")
+    generate_args.add_argument("out", help="map file to write (.json or .npz)")
+    generate_args.add_argument("--shape", type=int, nargs="+", required=True, help="rows cols, or depth height width")
+    generate_args.add_argument("--layout", default="random", choices=["random", "maze", "rooms"])
+    generate_args.add_argument("--density", type=float, default=0.2, help="wall density of the random layout")
+    generate_args.add_argument("--cell", type=int, default=None, help="room size (maze: 1, rooms: 8)")
+    generate_args.add_argument("--loops", type=float, default=0.0, help="probability of each extra door")
+    generate_args.add_argument("--goals", type=int, default=1)
+    generate_args.add_argument("--pits", type=int, default=0)
+    generate_args.add_argument("--step-cost", type=float, default=-0.04)
+    generate_args.add_argument("--slip", type=float, default=0.0, help="3D only: probability that a move slips")
+    generate_args.add_argument("--slip-to", default="perpendicular", choices=SLIP_TARGETS,
+                               help="where a slipping move goes")
+    generate_args.add_argument("--seed", type=int, default=None)
+
+    learn_args = commands.add_parser("learn", help="Q-learning / SARSA, reports steps/sec and the error against V*")
+    learn_args.add_argument("map", help="2D or 3D map (.json or .npz)")
+    learn_args.add_argument("--method", default="q_learning", choices=["q_learning", "sarsa"])
+    learn_args.add_argument("--gamma", type=float, default=0.9)
+    learn_args.add_argument("--alpha", type=float, default=0.1)
+    learn_args.add_argument("--alpha-final", type=float, default=None)
+    learn_args.add_argument("--epsilon", type=float, default=0.1)
+    learn_args.add_argument("--epsilon-final", type=float, default=None)
+    learn_args.add_argument("--envs", type=int, default=1000)
+    learn_args.add_argument("--steps", type=int, default=10000, help="steps per agent")
+    learn_args.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        from .generate import generate
+        grid = generate(args.shape, args.layout, args.density, args.cell, args.loops, args.goals, args.pits,
+                        args.seed, step_cost=args.step_cost, slip=args.slip, slip_to=args.slip_to)
+        save_map(grid, args.out)
+        return
+    grid = load_map(args.src if args.command == "convert" else args.map)
+    if args.command == "convert":
+        save_map(grid, args.dst)
+        return
+    if args.command == "learn":
+        from .td_learning import learn
+        _, history = learn(grid, args.method, args.gamma, alpha=args.alpha, alpha_final=args.alpha_final,
+                           epsilon=args.epsilon, epsilon_final=args.epsilon_final, n_envs=args.envs,
+                           n_steps=args.steps, seed=args.seed, report_every=max(1, args.steps // 10))
+        print("steps\tseconds\tsteps_per_sec\tmax_error\tmean_error")
+        for h in history:
+            print("%d\t%.3f\t%.0f\t%.6f\t%.6f" % (h["steps"], h["seconds"], h["steps_per_sec"],
+                                                h["max_error"], h["mean_error"]))
+        return
+    monitor = None
+    if args.log or args.profile:
+        from .monitor import SolveMonitor
+        monitor = SolveMonitor(log=args.log, profile=args.profile or False)
+    if args.mode and args.solver != "value_iteration":
+        parser.error("--mode only applies to --solver value_iteration")
+    V, policy, arrays = solve(grid, args.solver, args.gamma, args.threshold, monitor, args.mode)
+    if args.out:
+        save_solution(grid, policy, arrays, args.out)
+    else:
+        print_solution(grid, policy, arrays)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
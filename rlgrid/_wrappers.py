@@ -0,0 +1,35 @@
+# _wrappers.py - the parts shared by the {state: value} wrappers of value_iteration.py
+# and value_iteration_3d.py: answering from a SolveCache and turning the solver arrays
+# into StateViews. each wrapper module passes the converter pair of its policy values
+# (the 2D editor reads {action: probability}, the 3D code action names)
+
+from .state_index import StateView
+
+
+def results(mdp, V_arr, Q, return_arrays, convert, revert, stats=None):
+    # derive optimal policy (argmax keeps the first best action)
+    policy_arr = Q.argmax(axis=1)
+
+    # V and policy are {state: value} views of the arrays (state_index.py), the policy
+    # only has the states with actions. convert(a) is the policy value of action index
+    # a and revert its inverse for writes. editing them copies the arrays first
+    V = StateView(mdp.state_index, V_arr)
+    policy = StateView(mdp.state_index, policy_arr, keep=~mdp.terminal, convert=convert, revert=revert)
+
+    if return_arrays:
+        # arrays are indexed like mdp.states
+        arrays = {"states": mdp.states, "V": V_arr, "Q": Q, "policy": policy_arr}
+        if stats is not None:
+            arrays["stats"] = stats
+        return V, policy, arrays
+    return V, policy
+
+
+def cached_solve(mdp, cache, params, solver, cache_only=False):
+    # solver() ==> (V, Q), answered from cache when the same grid was solved before.
+    # cache_only returns None instead of solving on a miss
+    if cache is None:
+        return solver()
+    if cache_only:
+        return cache.get(cache.key(mdp, *params))
+    return cache.solve(mdp, params, solver)
@@ -0,0 +1,91 @@
+# batch_3d.py - value iteration over many same-shaped GridWorld3D maps at once
+
+from .grid_3d import GridWorld3D, ACTIONS_3D, _shift_slices
+from .value_iteration_3d import GAMMA, THETA, _action_index, _action_name
+from .state_index import StateIndex, StateView
+from typing import List
+import numpy as np
+
+
+def stack_maps(envs: List[GridWorld3D]):
+    # every map is laid out on the full voxel volume (S = depth*height*width, walls
+    # included as fixed cells) so all maps share one (N, S) value tensor.
+    # next_states[n, a, s] indexes the flattened (N*S) tensor, so one gather serves
+    # every map. returns (next_states, rewards, terminal, wall)
+    if not envs:
+        raise ValueError("no maps to solve")
+    shape = (envs[0].depth, envs[0].height, envs[0].width)
+    for env in envs:
+        if (env.depth, env.height, env.width) != shape:
+            raise ValueError("all maps in a batch must have the same dimensions")
+
+    n_maps, size = len(envs), int(np.prod(shape))
+    wall = np.stack([env.wall for env in envs])
+    terminal = np.stack([env.terminal for env in envs]) & ~wall
+    step_costs = np.array([env.step_cost for env in envs])[:, None, None, None]
+    rewards = np.where(terminal, np.stack([env.reward for env in envs]), step_costs)
+
+    # same shifted-volume construction as GridWorld3D.compile, for all maps at once
+    voxel = np.arange(size).reshape(shape)
+    next_states = np.empty((n_maps, len(ACTIONS_3D), size), dtype=np.intp)
+    for a, offset in enumerate(ACTIONS_3D.values()):
+        dst, src = zip(*(_shift_slices(d) for d in offset))
+        target = np.broadcast_to(voxel, wall.shape).copy()
+        blocked = np.ones(wall.shape, dtype=bool)
+        target[(slice(None),) + dst] = voxel[src]
+        blocked[(slice(None),) + dst] = wall[(slice(None),) + src]
+        next_states[:, a] = np.where(blocked, voxel, target).reshape(n_maps, size)
+    next_states += (np.arange(n_maps) * size)[:, None, None]
+
+    return next_states, rewards.reshape(n_maps, size), terminal.reshape(n_maps, size), wall.reshape(n_maps, size)
+
+
+def batch_value_iteration(envs: List[GridWorld3D], gamma=GAMMA, theta=THETA, max_iterations=1000,
+                          return_dicts=False):
+    # returns (V, policy, iterations): V is (N, S) over the flattened voxels (walls 0),
+    # policy is (N, S) action index in ACTIONS_3D order (-1 on walls and terminals) and
+    # iterations (N,) sweeps per map. each map stops updating once its own delta < theta.
+    # return_dicts=True gives a list of (V, policy) state views per map, like value_iteration.
+    # maps with slip must all share the same slip_kernel()
+    next_states, rewards, terminal, wall = stack_maps(envs)
+    kernel = envs[0].slip_kernel()
+    for env in envs[1:]:
+        other = env.slip_kernel()
+        if (kernel is None) != (other is None) or (kernel is not None and not np.array_equal(kernel, other)):
+            raise ValueError("all maps in a batch must have the same slip")
+    move = (lambda moved: moved) if kernel is None else (lambda moved: kernel @ moved)
+    fixed = terminal | wall
+    V = np.where(terminal, rewards, 0.0)
+    flat_V = V.reshape(-1)
+    iterations = np.zeros(len(envs), dtype=np.int64)
+
+    running = np.arange(len(envs))
+    while running.size:
+        # the batch only shrinks when some map converges, slice its tables then
+        table, r, f = next_states[running], rewards[running], fixed[running]
+        while True:
+            best = move(np.take(flat_V, table)).max(axis=1)
+            old = V[running]
+            new = np.where(f, old, r + gamma * best)
+            delta = np.abs(new - old).max(axis=1)
+            V[running] = new
+            iterations[running] += 1
+            done = (delta < theta) | (iterations[running] >= max_iterations)
+            if done.any():
+                running = running[~done]
+                break
+
+    Q = rewards[:, None, :] + gamma * move(np.take(flat_V, next_states))
+    policy = np.where(fixed, -1, Q.argmax(axis=1))
+
+    if return_dicts:
+        shape = (envs[0].depth, envs[0].height, envs[0].width)
+        results = []
+        for n in range(len(envs)):
+            states = StateIndex(shape, np.flatnonzero(~wall[n]))
+            c = states.cells
+            results.append((StateView(states, V[n, c]),
+                            StateView(states, policy[n, c], keep=~terminal[n, c], convert=_action_name,
+                                      revert=_action_index)))
+        return results, iterations
+    return V, policy, iterations
@@ -0,0 +1,381 @@
+# bench.py - reproducible timings of the solvers, rollouts, map I/O and scene preparation
+#
+#   python -m rlgrid bench --out bench.json                  full ladder
+#   python -m rlgrid bench --quick --baseline bench.json     compare with an earlier run
+#
+# every benchmark runs on seeded random maps (generate.py) over a ladder of sizes and wall
+# densities (2D: size x size cells, 3D: size^3 voxels), --repeat times, and reports the median.
+# results are JSON: {"meta": {...}, "results": [{"bench", "case", "size", "density",
+# "states", "median", "min", "times", ...}, ...]}. rows are matched with a baseline
+# file by (bench, case, size, density); a median more than --max-slowdown times the
+# baseline is a regression.
+#
+# correctness gate: every solver row carries max_error, the largest |V - V*| against
+# value iteration run to 1e-10 on the same map, and fails when it exceeds
+# threshold / (1 - gamma), the error bound of the stopping rules. the exit status is
+# 1 when any gate fails or any row regressed.
+#
+# benchmarks:
+#   solvers_2d, solvers_3d  every entry of SOLVERS, timed through the public wrappers, and
+#                           incremental: resolve() after a one-cell edit, with its speedup
+#                           over value_iteration. 3D adds value_iteration_slip, value
+#                           iteration on the same map with SLIP
+#   vi_modes                every value iteration mode of solvers.VI_MODES to
+#                           MODES_THRESHOLD, and solve_multigrid, with their iterations and
+#                           their speedup over the jacobi mode on the same map
+#   rollout_2d              GridWorld.move
+#   vec_env                 VecEnv.step
+#   map_io                  save_map / load_map, .json and .npz
+#   scene_3d                the array preparation of 3D/main_3d.py and 3D/voxel_view.py,
+#                           skipped when those cannot be imported
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .generate import LAYOUTS, generate
+from .grid import ACTION_SPACE
+from .grid_3d import EMPTY, WALL
+from .maps import save_map, load_map
+from .multigrid import solve_multigrid
+from .solvers import VI_MODES, IncrementalSolver, solve_value_iteration
+from .vec_env import VecEnv
+
+SIZES_2D = (32, 64, 128, 256)
+SIZES_3D = (8, 16, 24, 32)
+DENSITIES = (0.0, 0.1, 0.3)
+QUICK_SIZES_2D = (16, 32)
+QUICK_SIZES_3D = (6, 10)
+QUICK_DENSITIES = (0.0, 0.2)
+
+GAMMA = 0.9
+MODES_THRESHOLD = 1.0e-6
+SLIP = 0.2
+ROLLOUT_STEPS = 20000
+VEC_ENVS, VEC_STEPS = 1000, 200
+BENCHES = ("solvers_2d", "solvers_3d", "vi_modes", "rollout_2d", "vec_env", "map_io", "scene_3d")
+
+
+def random_grid(size, density, seed=0, layout="random"):
+    # size x size GridWorld from generate.py: start top-left, +1 on the farthest open
+    # cell, one -1 pit
+    return generate((size, size), layout, density, goals=1, pits=1, seed=seed, start=(0, 0))
+
+
+def random_grid_3d(size, density, seed=0, layout="random"):
+    return generate((size, size, size), layout, density, goals=1, pits=1, seed=seed, start=(0, 0, 0))
+
+
+def env_shape(env):
+    return env.depth, env.height, env.width
+
+
+def timed(f, repeat):
+    # (last result, seconds of each call)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = f()
+        times.append(time.perf_counter() - t0)
+    return out, times
+
+
+def row(bench, case, size, density, states, times, **extra):
+    return dict(bench=bench, case=case, size=size, density=density, states=int(states),
+                median=statistics.median(times), min=min(times), times=times, **extra)
+
+
+def bench_solvers(dim, size, density, seed, repeat, layout="random"):
+    if dim == 2:
+        from .value_iteration import SOLVERS
+        grid, threshold = random_grid(size, density, seed, layout), 1.0e-3
+    else:
+        from .value_iteration_3d import SOLVERS, THETA
+        grid, threshold = random_grid_3d(size, density, seed, layout), THETA
+    model = grid.compile()
+    V_star = solve_value_iteration(model, GAMMA, 1.0e-10)[0]
+    tolerance = threshold / (1 - GAMMA)
+
+    rows = []
+    _, times = timed(grid.compile, repeat)
+    rows.append(row(f"solvers_{dim}d", "compile", size, density, model.n_states, times))
+    for f in SOLVERS.values():
+        (_, _, arrays), times = timed(lambda: f(grid, GAMMA, threshold, return_arrays=True), repeat)
+        error = float(np.abs(arrays["V"] - V_star).max(initial=0.0))
+        rows.append(row(f"solvers_{dim}d", f.__name__, size, density, model.n_states, times,
+                        max_error=error, tolerance=tolerance, ok=error <= tolerance))
+    rows.append(bench_incremental(dim, grid, threshold, seed, repeat, size, density, rows))
+    if dim == 3:
+        grid.slip = SLIP
+        f = SOLVERS["Value Iteration"]
+        V_star = solve_value_iteration(grid.compile(), GAMMA, 1.0e-10)[0]
+        (_, _, arrays), times = timed(lambda: f(grid, GAMMA, threshold, return_arrays=True), repeat)
+        error = float(np.abs(arrays["V"] - V_star).max(initial=0.0))
+        rows.append(row("solvers_3d", "value_iteration_slip", size, density, model.n_states, times,
+                        max_error=error, tolerance=tolerance, ok=error <= tolerance))
+    return rows
+
+
+def bench_incremental(dim, grid, threshold, seed, repeat, size, density, rows):
+    # resolve() after walling one open cell (the editor's wall tool), timed like the
+    # SOLVERS rows and checked against value iteration to 1e-10 on the edited map. the
+    # cell is opened again (untimed) before the next edit
+    if dim == 2:
+        from .value_iteration import resolve
+        open_cells = [tuple(c) for c in np.argwhere(grid.active).tolist()]
+    else:
+        from .value_iteration_3d import resolve
+        open_cells = [tuple(c) for c in np.argwhere(~grid.wall & ~grid.terminal).tolist()]
+    incremental = IncrementalSolver(GAMMA, threshold)
+    resolve(grid, incremental)
+    rng = np.random.default_rng(seed)
+    times, rounds, error = [], [], 0.0
+    for _ in range(repeat):
+        cell = open_cells[rng.integers(len(open_cells))]
+        if dim == 2:
+            reward = grid.rewards.pop(cell, None)
+            del grid.actions[cell]
+        else:
+            grid.set_cell(*cell, WALL)
+        t0 = time.perf_counter()
+        _, _, arrays = resolve(grid, incremental, [cell], return_arrays=True)
+        times.append(time.perf_counter() - t0)
+        rounds.append(arrays["stats"].get("rounds", 0))
+        V_star = solve_value_iteration(grid.compile(), GAMMA, 1.0e-10)[0]
+        error = max(error, float(np.abs(arrays["V"] - V_star).max(initial=0.0)))
+        if dim == 2:
+            grid.actions[cell] = ACTION_SPACE
+            if reward is not None:
+                grid.rewards[cell] = reward
+        else:
+            grid.set_cell(*cell, EMPTY)
+        resolve(grid, incremental, [cell])
+    tolerance = threshold / (1 - GAMMA)
+    full = next(r["median"] for r in rows if r["case"] == "value_iteration")
+    return row(f"solvers_{dim}d", "incremental", size, density, rows[0]["states"], times,
+               iterations=int(statistics.median(rounds)), speedup=full / statistics.median(times),
+               max_error=error, tolerance=tolerance, ok=error <= tolerance)
+
+
+def bench_vi_modes(dim, size, density, seed, repeat, layout="random"):
+    grid = random_grid(size, density, seed, layout) if dim == 2 else random_grid_3d(size, density, seed, layout)
+    model = grid.compile()
+    V_star = solve_value_iteration(model, GAMMA, 1.0e-10)[0]
+    tolerance = MODES_THRESHOLD / (1 - GAMMA)
+
+    rows = []
+    for mode in VI_MODES:
+        (V, _, iterations), times = timed(lambda: solve_value_iteration(model, GAMMA, MODES_THRESHOLD, mode=mode),
+                                          repeat)
+        error = float(np.abs(V - V_star).max(initial=0.0))
+        rows.append(row("vi_modes", f"{dim}d_{mode}", size, density, model.n_states, times,
+                        iterations=iterations, max_error=error, tolerance=tolerance, ok=error <= tolerance))
+    (V, _, stats), times = timed(lambda: solve_multigrid(model, GAMMA, MODES_THRESHOLD), repeat)
+    error = float(np.abs(V - V_star).max(initial=0.0))
+    rows.append(row("vi_modes", f"{dim}d_multigrid", size, density, model.n_states, times,
+                    iterations=stats["sweeps"], max_error=error, tolerance=tolerance, ok=error <= tolerance))
+    for r in rows:
+        r["speedup"] = rows[0]["median"] / r["median"] if r["median"] > 0 else None
+    return rows
+
+
+def bench_rollout_2d(size, density, seed, repeat, layout="random"):
+    grid = random_grid(size, density, seed, layout)
+    rng = np.random.default_rng(seed)
+    actions = [ACTION_SPACE[a] for a in rng.integers(4, size=ROLLOUT_STEPS).tolist()]
+
+    def run():
+        grid.set_state(grid.start)
+        for a in actions:
+            grid.move(a)
+            if grid.game_over():
+                grid.set_state(grid.start)
+    _, times = timed(run, repeat)
+    return [row("rollout_2d", "move", size, density, len(grid.actions), times,
+                steps_per_sec=ROLLOUT_STEPS / statistics.median(times))]
+
+
+def bench_vec_env(dim, size, density, seed, repeat, layout="random"):
+    grid = random_grid(size, density, seed, layout) if dim == 2 else random_grid_3d(size, density, seed, layout)
+    model = grid.compile()
+    start = model.state_id(grid.start if dim == 2 else grid.start_pos)
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(model.n_actions, size=(VEC_STEPS, VEC_ENVS))
+
+    def run():
+        env = VecEnv(model, VEC_ENVS, start, seed)
+        for a in actions:
+            env.step(a)
+    _, times = timed(run, repeat)
+    return [row("vec_env", f"{dim}d", size, density, model.n_states, times,
+                steps_per_sec=VEC_ENVS * VEC_STEPS / statistics.median(times))]
+
+
+def bench_map_io(dim, size, density, seed, repeat, layout="random"):
+    grid = random_grid(size, density, seed, layout) if dim == 2 else random_grid_3d(size, density, seed, layout)
+    states = grid.compile().n_states
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in (".json", ".npz"):
+            path = os.path.join(tmp, "map" + ext)
+            _, times = timed(lambda: save_map(grid, path), repeat)
+            rows.append(row("map_io", f"save_{dim}d{ext}", size, density, states, times,
+                            bytes=os.path.getsize(path)))
+            _, times = timed(lambda: load_map(path), repeat)
+            rows.append(row("map_io", f"load_{dim}d{ext}", size, density, states, times))
+    return rows
+
+
+def scene_modules():
+    # plot_arrays and box_arrays from the 3D viewers, None when they cannot be imported
+    # (voxel_view needs ursina)
+    scripts = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "3D")
+    if scripts not in sys.path:
+        sys.path.insert(0, scripts)
+    found = {}
+    try:
+        from main_3d import plot_arrays
+        found["plot_arrays"] = plot_arrays
+    except ImportError:
+        pass
+    try:
+        from voxel_view import box_arrays
+        found["box_arrays"] = box_arrays
+    except ImportError:
+        pass
+    return found
+
+
+def bench_scene_3d(size, density, seed, repeat, layout="random"):
+    from .value_iteration_3d import value_iteration
+    env = random_grid_3d(size, density, seed, layout)
+    V, policy = value_iteration(env, GAMMA)
+    modules = scene_modules()
+    rows = []
+    if "plot_arrays" in modules:
+        _, times = timed(lambda: modules["plot_arrays"](env, V, policy), repeat)
+        rows.append(row("scene_3d", "plot_arrays", size, density, len(V), times))
+    if "box_arrays" in modules:
+        cells = np.argwhere(np.ones(env_shape(env), dtype=bool)).astype(float)
+        colors = np.ones((len(cells), 4))
+        _, times = timed(lambda: modules["box_arrays"](cells, np.array([0.95, 0.11, 0.95]), colors), repeat)
+        rows.append(row("scene_3d", "box_arrays", size, density, len(cells), times))
+    return rows
+
+
+def run_benchmarks(benches=BENCHES, sizes_2d=SIZES_2D, sizes_3d=SIZES_3D, densities=DENSITIES,
+                   seed=0, repeat=3, progress=None, layout="random"):
+    results = []
+    for bench in benches:
+        for density in densities:
+            if bench in ("solvers_2d", "rollout_2d"):
+                cases = [(2, s) for s in sizes_2d]
+            elif bench in ("solvers_3d", "scene_3d"):
+                cases = [(3, s) for s in sizes_3d]
+            else:
+                cases = [(2, s) for s in sizes_2d] + [(3, s) for s in sizes_3d]
+            for dim, size in cases:
+                if bench == "solvers_2d" or bench == "solvers_3d":
+                    rows = bench_solvers(dim, size, density, seed, repeat, layout)
+                elif bench == "vi_modes":
+                    rows = bench_vi_modes(dim, size, density, seed, repeat, layout)
+                elif bench == "rollout_2d":
+                    rows = bench_rollout_2d(size, density, seed, repeat, layout)
+                elif bench == "vec_env":
+                    rows = bench_vec_env(dim, size, density, seed, repeat, layout)
+                elif bench == "map_io":
+                    rows = bench_map_io(dim, size, density, seed, repeat, layout)
+                else:
+                    rows = bench_scene_3d(size, density, seed, repeat, layout)
+                for r in rows:
+                    if progress:
+                        progress(r)
+                results.extend(rows)
+    return results
+
+
+def metadata(seed, repeat, layout):
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed, "repeat": repeat, "gamma": GAMMA, "layout": layout}
+
+
+def key(r):
+    return r["bench"], r["case"], r["size"], r["density"]
+
+
+def compare(results, baseline, max_slowdown):
+    # (ratio rows, regressed rows) against the results of an earlier run
+    old = {key(r): r for r in baseline}
+    ratios, regressed = [], []
+    for r in results:
+        if key(r) in old and old[key(r)]["median"] > 0:
+            ratio = r["median"] / old[key(r)]["median"]
+            ratios.append((r, ratio))
+            if ratio > max_slowdown:
+                regressed.append((r, ratio))
+    return ratios, regressed
+
+
+def describe(r):
+    return "%-10s %-26s %4d %4.2f %8d" % (r["bench"], r["case"], r["size"], r["density"], r["states"])
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Time solvers, rollouts, map I/O and scene preparation.")
+    parser.add_argument("--bench", nargs="+", choices=BENCHES, default=list(BENCHES))
+    parser.add_argument("--quick", action="store_true", help="small ladder, for a smoke test")
+    parser.add_argument("--sizes-2d", type=int, nargs="+")
+    parser.add_argument("--sizes-3d", type=int, nargs="+")
+    parser.add_argument("--densities", type=float, nargs="+")
+    parser.add_argument("--layout", choices=LAYOUTS, default="random",
+                        help="map layout of generate.py, --densities only applies to random")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    sizes_2d = args.sizes_2d or (QUICK_SIZES_2D if args.quick else SIZES_2D)
+    sizes_3d = args.sizes_3d or (QUICK_SIZES_3D if args.quick else SIZES_3D)
+    densities = args.densities or (QUICK_DENSITIES if args.quick else DENSITIES)
+
+    def progress(r):
+        gate = "" if "ok" not in r else ("  ok" if r["ok"] else "  FAIL max_error=%.3g" % r["max_error"])
+        if r.get("speedup"):
+            gate = "  %5d it %6.2fx" % (r["iterations"], r["speedup"]) + gate
+        print("%s %10.4f s%s" % (describe(r), r["median"], gate))
+        sys.stdout.flush()
+
+    results = run_benchmarks(args.bench, sizes_2d, sizes_3d, densities, args.seed, args.repeat, progress,
+                             args.layout)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": metadata(args.seed, args.repeat, args.layout), "results": results}, f, indent=1)
+
+    failed = [r for r in results if r.get("ok") is False]
+    regressed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        ratios, regressed = compare(results, baseline, args.max_slowdown)
+        print("\nagainst %s (median / baseline median):" % args.baseline)
+        for r, ratio in ratios:
+            print("%s %6.2fx%s" % (describe(r), ratio, "  REGRESSION" if ratio > args.max_slowdown else ""))
+    if failed:
+        print("\n%d rows failed the correctness gate" % len(failed))
+    if regressed:
+        print("\n%d rows are more than %.2fx slower than the baseline" % (len(regressed), args.max_slowdown))
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
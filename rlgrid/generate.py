@@ -0,0 +1,156 @@
+# generate.py - seeded procedural maps for stress tests, 2D or 3D, up to millions of states
+#
+#   grid = generate((500, 500), "maze", seed=1)                          GridWorld
+#   env = generate((100, 100, 100), "random", density=0.2, goals=3, seed=1)   GridWorld3D
+#   python -m rlgrid generate maze.npz --shape 1001 1001 --layout maze --seed 1
+#
+# layouts (wall_mask):
+#   random   every cell is a wall with probability `density`
+#   maze     a perfect maze: corridors one cell wide, cells on even coordinates
+#   rooms    cell x cell rooms (default 8) behind one-cell walls, joined by doors
+# maze and rooms are the same lattice: blocks of `cell` open cells spaced by walls,
+# joined by a binary-tree spanning tree (every block opens a door towards one random
+# +1 neighbour), so everything is reachable. `loops` opens each other door with that
+# probability. everything is built with array operations, nothing per cell in Python.
+#
+# terminals: `goals` cells with +reward and `pits` cells with penalty, at random open
+# cells (with one goal, the open cell farthest from the start). the start is the first
+# open cell unless given. open cells pay step_cost and moves into a wall or off the
+# grid stay put (the editors let an agent walk into a wall cell instead). slip makes 3D
+# moves stochastic (GridWorld3D.slip / slip_to).
+
+import numpy as np
+
+from .grid import ACTION_SPACE, grid_from_arrays
+from .grid_3d import GridWorld3D
+
+LAYOUTS = ("random", "maze", "rooms")
+ROOM_SIZE = 8
+
+
+def wall_mask(shape, layout="random", rng=None, density=0.2, cell=None, loops=0.0):
+    rng = np.random.default_rng(rng)
+    if layout == "random":
+        return rng.random(shape) < density
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown layout {layout!r}, expected one of {LAYOUTS}")
+    cell = cell or (1 if layout == "maze" else ROOM_SIZE)
+    stride = cell + 1
+    counts = [(n - cell) // stride + 1 for n in shape]  # blocks along each axis
+    if min(counts) < 1:
+        raise ValueError(f"shape {shape} is too small for blocks of {cell}")
+
+    # open the blocks: coordinate c is inside a block when c % stride < cell
+    wall = np.ones(shape, dtype=bool)
+    inside = [(np.arange(n) % stride < cell) & (np.arange(n) // stride < k) for n, k in zip(shape, counts)]
+    open_ = inside[0]
+    for axis_inside in inside[1:]:
+        open_ = open_[..., None] & axis_inside
+    wall[open_] = False
+
+    # doors: block b opens towards b + e_axis through the wall at b * stride + cell,
+    # at a random offset inside the block along the other axes
+    blocks = np.indices(counts).reshape(len(shape), -1).T
+    can = blocks + 1 < np.array(counts)
+    keys = np.where(can, rng.random(can.shape), -1.0)
+    tree = np.zeros(can.shape, dtype=bool)
+    has = can.any(axis=1)
+    tree[np.flatnonzero(has), keys[has].argmax(axis=1)] = True
+    doors = tree | (can & (rng.random(can.shape) < loops))
+    for axis in range(len(shape)):
+        b = blocks[doors[:, axis]]
+        pos = b * stride + rng.integers(cell, size=b.shape)
+        pos[:, axis] = b[:, axis] * stride + cell
+        wall[tuple(pos.T)] = False
+    return wall
+
+
+def place_terminals(wall, rng=None, goals=1, pits=0, start=None):
+    # (start, goal cells, pit cells) on distinct open cells
+    rng = np.random.default_rng(rng)
+    open_ids = np.flatnonzero(~wall)
+    if start is None:
+        start_id = int(open_ids[0])
+    else:
+        start_id = int(np.ravel_multi_index(start, wall.shape))
+    free = open_ids[open_ids != start_id]
+    if goals + pits > len(free):
+        raise ValueError("not enough open cells for %d goals and %d pits" % (goals, pits))
+    if goals == 1:
+        # the open cell farthest from the start (Manhattan), pits anywhere else
+        coords = np.array(np.unravel_index(free, wall.shape)).T
+        far = np.abs(coords - np.unravel_index(start_id, wall.shape)).sum(axis=1).argmax()
+        goal_ids = free[[far]]
+        pit_ids = rng.choice(np.delete(free, far), size=pits, replace=False)
+    else:
+        picked = rng.choice(free, size=goals + pits, replace=False)
+        goal_ids, pit_ids = picked[:goals], picked[goals:]
+    cells = lambda ids: [tuple(c) for c in np.array(np.unravel_index(ids, wall.shape)).T.tolist()]
+    return tuple(int(c) for c in np.unravel_index(start_id, wall.shape)), cells(goal_ids), cells(pit_ids)
+
+
+def grid_from_mask(wall, start, goal_cells, pit_cells, step_cost=-0.04, reward=1.0, penalty=-1.0):
+    # 2D GridWorld with the four ACTION_SPACE moves on every open non-terminal cell,
+    # built straight into the packed arrays of grid_from_arrays. every cell gets the move
+    # transitions, walls and terminals too, like the editor's empty grid, so a cell the
+    # editor clears can move again
+    wall = np.asarray(wall, dtype=bool)
+    rows, cols = wall.shape
+    values = np.full(wall.shape, float(step_cost))
+    terminal = np.zeros(wall.shape, dtype=bool)
+    for cells, value in ((goal_cells, reward), (pit_cells, penalty)):
+        if len(cells):
+            values[tuple(np.array(cells).T)] = value
+            terminal[tuple(np.array(cells).T)] = True
+
+    ids = np.arange(rows * cols).reshape(rows, cols)
+    index_type = np.int32 if rows * cols < 2 ** 31 else np.int64
+    movers = ids[~wall & ~terminal]
+    i, j = np.divmod(ids.reshape(-1), cols)
+    next_cells = []
+    for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1)):  # ACTION_SPACE order
+        ni, nj = np.clip(i + di, 0, rows - 1), np.clip(j + dj, 0, cols - 1)
+        next_cells.append(np.where(wall[ni, nj], i * cols + j, ni * cols + nj))
+    n = len(movers)
+    codes = np.tile(np.arange(4, dtype=np.int8), n)
+    cells = rows * cols
+    return grid_from_arrays({
+        "shape": np.array([rows, cols]), "start": np.array(start), "action_names": np.array(ACTION_SPACE),
+        "reward_cells": ids[~wall].astype(index_type), "reward_values": values[~wall],
+        "action_cells": movers.astype(index_type), "action_indptr": np.arange(0, 4 * n + 1, 4),
+        "action_codes": codes,
+        "prob_cells": np.repeat(ids.reshape(-1), 4).astype(index_type),
+        "prob_actions": np.tile(np.arange(4, dtype=np.int8), cells), "prob_indptr": np.arange(4 * cells + 1),
+        "prob_next": np.stack(next_cells, axis=1).reshape(-1).astype(index_type),
+        "prob_values": np.ones(4 * cells),
+    })
+
+
+def grid_3d_from_mask(wall, start, goal_cells, pit_cells, step_cost=-0.04, reward=1.0, penalty=-1.0,
+                      slip=0.0, slip_to="perpendicular"):
+    env = GridWorld3D(*wall.shape, step_cost=step_cost, reward_val=reward, penalty_val=penalty, slip=slip,
+                      slip_to=slip_to)
+    env.wall[:] = wall
+    for cells, value in ((goal_cells, reward), (pit_cells, penalty)):
+        if len(cells):
+            env.terminal[tuple(np.array(cells).T)] = True
+            env.reward[tuple(np.array(cells).T)] = value
+    env.start_pos = tuple(start)
+    return env
+
+
+def generate(shape, layout="random", density=0.2, cell=None, loops=0.0, goals=1, pits=0, seed=None,
+             start=None, step_cost=-0.04, reward=1.0, penalty=-1.0, slip=0.0, slip_to="perpendicular"):
+    # GridWorld for a 2D shape, GridWorld3D for a 3D one, the same seed gives the same map
+    if len(shape) not in (2, 3):
+        raise ValueError("shape must have 2 or 3 dimensions")
+    if slip and len(shape) == 2:
+        raise ValueError("slip is only supported for 3D maps")
+    rng = np.random.default_rng(seed)
+    wall = wall_mask(tuple(shape), layout, rng, density, cell, loops)
+    if start is not None:
+        wall[tuple(start)] = False
+    start, goal_cells, pit_cells = place_terminals(wall, rng, goals, pits, start)
+    if len(shape) == 2:
+        return grid_from_mask(wall, start, goal_cells, pit_cells, step_cost, reward, penalty)
+    return grid_3d_from_mask(wall, start, goal_cells, pit_cells, step_cost, reward, penalty, slip, slip_to)
@@ -0,0 +1,572 @@
+import hashlib
+from collections.abc import MutableMapping
+from itertools import chain
+
+import numpy as np 
+
+from .state_index import StateIndex, StateView, CellValues, cell_of, cells_of, flat_cell
+
+ACTION_SPACE = ('U', 'D', 'L', 'R')
+
+
+class CompiledGrid:
+    # array form of a GridWorld, built by GridWorld.compile()
+    # state_index: StateIndex of the states, ids in row-major order
+    # cells: flat cell id (r * cols + c) of every state, cell_ids: state id of every cell
+    # states: list of (r,c), position k is the state's index ==> index[(r,c)] = k
+    # indptr/indices/data: one CSR transition matrix per action, stacked action-major,
+    #   so rows a*S .. (a+1)*S-1 hold the (S x S) matrix of ACTION_SPACE[a]
+    # rewards: reward received when arriving in each state
+    # terminal: True for states without actions, their value stays terminal_values (0)
+    def __init__(self, shape, cells, indptr, indices, data, rewards, terminal):
+        self.shape = shape
+        self.state_index = StateIndex(shape, cells)
+        self.cells = self.state_index.cells
+        self.cell_ids = self.state_index.ids
+        self.n_states = len(cells)
+        self.n_actions = len(ACTION_SPACE)
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.rewards = rewards
+        self.terminal = terminal
+        self.terminal_values = np.zeros(self.n_states)
+
+        # row id of every stored entry, so a mat-vec is a single bincount
+        self._rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        # expected immediate reward of (s, a) ==> shape (S, A)
+        self.expected_rewards = self._per_action(data * rewards[indices])
+        self._predecessors = None
+        self._backup_table = None
+
+    @property
+    def states(self):
+        return self.state_index.states
+
+    @property
+    def coords(self):
+        # (S, 2) row and column of every state
+        return self.state_index.coords()
+
+    @property
+    def index(self):
+        # {(r,c): state id}
+        return StateView(self.state_index, np.arange(self.n_states))
+
+    def state_id(self, state):
+        # -1 when the cell is not a state (wall or outside the grid)
+        return self.state_index.id(state)
+
+    def match_states(self, other):
+        # id in `other` (an earlier compile) of each of our states, -1 when it had no such state
+        return self.state_index.match(other.state_index)
+
+    def _per_action(self, weights):
+        n = self.n_actions * self.n_states
+        return np.bincount(self._rows, weights=weights, minlength=n).reshape(self.n_actions, self.n_states).T
+
+    def action_matrix(self, a):
+        # CSR (indptr, indices, data) of a single action
+        k = ACTION_SPACE.index(a) * self.n_states
+        start, stop = self.indptr[k], self.indptr[k + self.n_states]
+        indptr = self.indptr[k:k + self.n_states + 1] - start
+        return indptr, self.indices[start:stop], self.data[start:stop]
+
+    def fingerprint(self):
+        # digest of everything the solvers see, used as a cache key
+        h = hashlib.sha256(repr((self.shape, self.n_states, len(self.data))).encode())
+        for a in (self.cells, self.indptr, self.indices, self.data, self.rewards, self.terminal):
+            h.update(np.ascontiguousarray(a).tobytes())
+        return h.digest()
+
+    def policy_model(self, policy):
+        # expected reward and COO transitions (rows, cols, probs) when following policy[s]
+        n = self.n_states
+        selected = policy * n + np.arange(n)
+        starts = self.indptr[selected]
+        counts = self.indptr[selected + 1] - starts
+        rows = np.repeat(np.arange(n), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pos = np.repeat(starts, counts) + offsets
+        return self.expected_rewards[np.arange(n), policy], rows, self.indices[pos], self.data[pos]
+
+    def successor_table(self):
+        # fixed-width successors of every (s, a) for sampling: next states, probabilities
+        # and rewards, each (S, A, K). probability that leaves the states (moves into a
+        # wall, anything out of a terminal) ends the episode with no reward: next = -1
+        n = self.n_actions * self.n_states
+        counts = np.diff(self.indptr)
+        lost = 1.0 - np.bincount(self._rows, weights=self.data, minlength=n)
+        lost_rows = np.flatnonzero(lost > 1.0e-12)
+        width = max(1, int((counts + (lost > 1.0e-12)).max(initial=0)))
+
+        next_states = np.full((n, width), -1, dtype=np.int64)
+        probs = np.zeros((n, width))
+        rewards = np.zeros((n, width))
+        pos = np.arange(len(self.data)) - np.repeat(self.indptr[:-1], counts)
+        next_states[self._rows, pos] = self.indices
+        probs[self._rows, pos] = self.data
+        rewards[self._rows, pos] = self.rewards[self.indices]
+        probs[lost_rows, counts[lost_rows]] = lost[lost_rows]
+
+        shape = (self.n_actions, self.n_states, width)
+        return tuple(a.reshape(shape).transpose(1, 0, 2) for a in (next_states, probs, rewards))
+
+    def predecessors(self):
+        # CSR (indptr, indices): states with some action that can lead to each state
+        if self._predecessors is None:
+            n = self.n_states
+            pairs = np.sort(self.indices * n + self._rows % n)
+            pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(pairs // n, minlength=n), out=indptr[1:])
+            self._predecessors = (indptr, pairs % n)
+        return self._predecessors
+
+    def q_state(self, V, s, gamma):
+        # Bellman backup of a single state ==> shape (A,)
+        q = self.expected_rewards[s].copy()
+        for a in range(self.n_actions):
+            row = a * self.n_states + s
+            start, stop = self.indptr[row], self.indptr[row + 1]
+            if stop > start:
+                q[a] += gamma * np.dot(self.data[start:stop], V[self.indices[start:stop]])
+        return q
+
+    def q_states(self, V, ids, gamma):
+        # q_state of several states at once ==> shape (len(ids), A)
+        if self._backup_table is None:
+            # successors of every (s, a) padded to a fixed width with state 0 at probability 0
+            counts = np.diff(self.indptr)
+            width = max(1, int(counts.max(initial=0)))
+            pos = np.arange(len(self.data)) - np.repeat(self.indptr[:-1], counts)
+            next_states = np.zeros((len(counts), width), dtype=np.int64)
+            probs = np.zeros((len(counts), width))
+            next_states[self._rows, pos] = self.indices
+            probs[self._rows, pos] = self.data
+            shape = (self.n_actions, self.n_states, width)
+            self._backup_table = (next_states.reshape(shape).transpose(1, 0, 2),
+                                  probs.reshape(shape).transpose(1, 0, 2))
+        next_states, probs = self._backup_table
+        return self.expected_rewards[ids] + gamma * (probs[ids] * V[next_states[ids]]).sum(axis=-1)
+
+    def reweighted(self, rewards):
+        # same transitions with a different arrival reward per state
+        return CompiledGrid(self.shape, self.cells, self.indptr, self.indices, self.data, rewards, self.terminal)
+
+    def q_values(self, V, gamma):
+        # one Bellman backup for every (s, a) ==> shape (S, A)
+        return self.expected_rewards + gamma * self._per_action(self.data * V[self.indices])
+
+
+def _index_type(n_cells):
+    return np.int32 if n_cells < 2 ** 31 else np.int64
+
+
+def _offsets(lengths):
+    indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    return indptr.astype(np.int32) if indptr[-1] < 2 ** 31 else indptr
+
+
+def _positions(cells, cols):
+    r, c = np.divmod(cells, cols)
+    return list(zip(r.tolist(), c.tolist()))
+
+
+class ActionSets(MutableMapping):
+    # GridWorld.actions: {(r,c): tuple of action names} over the grid's active and
+    # action_bits arrays. the tuples are shared between cells with the same actions and
+    # list the actions in action_names order
+    __slots__ = ("grid",)
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __getitem__(self, pos):
+        cell = cell_of(self.grid.active.shape, pos)
+        if cell is None or not self.grid.active[cell]:
+            raise KeyError(pos)
+        return self.grid._action_tuple(int(self.grid.action_bits[cell]))
+
+    def __setitem__(self, pos, actions):
+        cell = cell_of(self.grid.active.shape, pos)
+        if cell is None:
+            raise ValueError(f"{pos} is outside the {self.grid.rows}x{self.grid.cols} grid")
+        self.grid.action_bits[cell] = self.grid._action_bits(actions)
+        self.grid.active[cell] = True
+
+    def __delitem__(self, pos):
+        cell = cell_of(self.grid.active.shape, pos)
+        if cell is None or not self.grid.active[cell]:
+            raise KeyError(pos)
+        self.grid.active[cell] = False
+        self.grid.action_bits[cell] = 0
+
+    def __iter__(self):
+        return iter(cells_of(self.grid.active))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.grid.active))
+
+    def values(self):
+        return [self.grid._action_tuple(b) for b in self.grid.action_bits[self.grid.active].tolist()]
+
+    def items(self):
+        return list(zip(self, self.values()))
+
+
+class Transitions(MutableMapping):
+    # GridWorld.probs: {((r,c), a): {(r',c'): p}} over the packed transition table, in
+    # the order the table was set or loaded. the rows it returns are copies; setting or
+    # deleting a key repacks the whole table, so edit a map's probs in bulk when you can
+    __slots__ = ("grid",)
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __getitem__(self, key):
+        try:
+            s, a = key
+        except (TypeError, ValueError):
+            raise KeyError(key) from None
+        row = self.grid._prob_row(s, a)
+        if row < 0:
+            raise KeyError(key)
+        _, _, indptr, next_cells, values, _ = self.grid._probs
+        lo, hi = indptr[row], indptr[row + 1]
+        return dict(zip(_positions(next_cells[lo:hi], self.grid.cols), values[lo:hi].tolist()))
+
+    def __setitem__(self, key, dests):
+        probs = dict(self.items())
+        probs[key] = dict(dests)
+        self.grid.probs = probs
+
+    def __delitem__(self, key):
+        probs = dict(self.items())
+        del probs[key]
+        self.grid.probs = probs
+
+    def __iter__(self):
+        cells, actions, _, _, _, names = self.grid._probs
+        names = names.tolist()
+        return ((s, names[a]) for s, a in zip(_positions(cells, self.grid.cols), actions.tolist()))
+
+    def __len__(self):
+        return len(self.grid._probs[0])
+
+    def values(self):
+        _, _, indptr, next_cells, p, _ = self.grid._probs
+        dest = _positions(next_cells, self.grid.cols)
+        p = p.tolist()
+        return [dict(zip(dest[lo:hi], p[lo:hi])) for lo, hi in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+
+    def items(self):
+        return list(zip(self, self.values()))
+
+
+class GridWorld:
+    # the map is kept in dense (rows, cols) arrays, a few bytes per cell:
+    #   reward / has_reward      arrival reward of the cells that have one
+    #   active / action_bits     cells with actions, bit k set for action_names[k]
+    #                            (ACTION_SPACE first, at most 8 names)
+    #   _probs                   transitions packed like grid_to_arrays writes them:
+    #                            (cells, actions, indptr, next cells, p, names)
+    # rewards, actions and probs are {(r,c): ...} views of them, so code written for the
+    # dicts keeps working
+    def __init__(self, rows, cols, start):
+        self.rows = rows
+        self.cols = cols
+        self.i = start[0]
+        self.j = start[1]
+        self.start = start
+        self.reward = np.zeros((rows, cols))
+        self.has_reward = np.zeros((rows, cols), dtype=bool)
+        self.active = np.zeros((rows, cols), dtype=bool)
+        self.action_bits = np.zeros((rows, cols), dtype=np.uint8)
+        self.action_names = list(ACTION_SPACE)
+        self._action_tuples = {}
+        self._probs = _pack_probs(self, {})
+        self._table = None
+        self._moves = None
+
+    @property
+    def rewards(self):
+        return CellValues(self.has_reward, self.reward)
+
+    @rewards.setter
+    def rewards(self, rewards):
+        rewards = dict(rewards)
+        cells = self._cell_ids(rewards.keys())
+        self.has_reward[:] = False
+        self.reward[:] = 0.0
+        self.has_reward.flat[cells] = True
+        self.reward.flat[cells] = np.fromiter(rewards.values(), dtype=float, count=len(rewards))
+
+    @property
+    def actions(self):
+        return ActionSets(self)
+
+    @actions.setter
+    def actions(self, actions):
+        actions = dict(actions)
+        cells = self._cell_ids(actions.keys())
+        bits = np.fromiter((self._action_bits(v) for v in actions.values()), dtype=np.uint8, count=len(actions))
+        self.active[:] = False
+        self.action_bits[:] = 0
+        self.active.flat[cells] = True
+        self.action_bits.flat[cells] = bits
+
+    @property
+    def probs(self):
+        return Transitions(self)
+
+    @probs.setter
+    def probs(self, probs):
+        self._probs = _pack_probs(self, probs)
+        self._table = None
+        self._moves = None
+
+    def set(self, rewards, actions, probs):
+        # reward: a dictionary of {(r,c): r} ==> {(0,3): 1, ...}
+        # actions: a dictionary of {(r,c): [actions]} ==> {(0,0): ['R', 'D'], ...}
+        # probs: a dictionary of {((r,c), a): (r', c'): p } ==> {((0,0), 'R'): {(0,1): 0.5, (1,0):0.5} , ...}
+
+        self.rewards = rewards
+        self.actions = actions
+        self.probs = probs
+
+    def _action_bits(self, actions):
+        bits = 0
+        for a in actions:
+            if a not in self.action_names:
+                if len(self.action_names) == 8:
+                    raise ValueError("a grid supports at most 8 action names")
+                self.action_names.append(a)
+            bits |= 1 << self.action_names.index(a)
+        return bits
+
+    def _action_tuple(self, bits):
+        if bits not in self._action_tuples:
+            self._action_tuples[bits] = tuple(a for k, a in enumerate(self.action_names) if bits >> k & 1)
+        return self._action_tuples[bits]
+
+    def _move_table(self):
+        # (probs, {action: code}, rows): row of the packed transitions of every (cell, action),
+        # rows[cell * len(code) + code[a]], -1 for none. built on first use for the current table
+        if self._moves is None or self._moves[0] is not self._probs:
+            cells, actions, _, _, _, names = self._probs
+            code = {a: k for k, a in enumerate(names.tolist())}
+            rows = np.full(self.rows * self.cols * max(len(code), 1), -1, dtype=_index_type(len(cells)))
+            rows[cells.astype(np.int64) * len(code) + actions] = np.arange(len(cells))
+            self._moves = (self._probs, code, rows)
+        return self._moves
+
+    def _prob_row(self, s, a):
+        # row of (s, a) in the packed transitions, -1 when there is none
+        _, code, rows = self._move_table()
+        cell = flat_cell((self.rows, self.cols), s)
+        if cell < 0 or a not in code:
+            return -1
+        return rows.item(cell * len(code) + code[a])
+
+    def set_state(self, s):
+        self.i = s[0]
+        self.j = s[1]
+
+    def current_state(self):
+        return (self.i, self.j)
+
+    def is_terminal(self, s):
+        cell = cell_of(self.active.shape, s)
+        return cell is None or not self.active[cell]
+
+    def move(self, a):
+        i, j = self.i, self.j
+        probs, code, rows = self._move_table()
+        k = code.get(a)
+        row = -1
+        if k is not None and 0 <= i < self.rows and 0 <= j < self.cols:
+            row = rows.item((i * self.cols + j) * len(code) + k)
+        if row < 0:
+            raise KeyError(((i, j), a))
+        _, _, indptr, next_cells, p, _ = probs
+        lo, hi = indptr.item(row), indptr.item(row + 1)
+        if hi - lo == 1:
+            # deterministic move, no sampling needed
+            s2 = next_cells.item(lo)
+        else:
+            idx = np.random.choice(hi - lo, p = p[lo:hi])
+
+            s2 = next_cells.item(lo + idx)
+
+        # update the current state
+        self.i, self.j = divmod(s2, self.cols)
+
+        #return a reward if any
+        return self.reward.item(s2) if self.has_reward.item(s2) else 0
+
+    def game_over(self):
+        i, j = self.i, self.j
+        return not (0 <= i < self.rows and 0 <= j < self.cols and self.active.item(i * self.cols + j))
+
+    def all_states(self):
+        return set(cells_of(self.active | self.has_reward))
+
+    def _transition_table(self):
+        # probs flattened to arrays (cell, action, next cell, p). probs is only ever
+        # replaced as a whole (set / load_map), so the table is kept until that happens
+        packed = self._probs
+        if self._table is not None and self._table[0] is packed:
+            return self._table[1:]
+        cells, actions, indptr, next_cells, p, names = packed
+        counts = np.diff(indptr)
+        a_index = np.array([ACTION_SPACE.index(a) if a in ACTION_SPACE else -1 for a in names.tolist()],
+                           dtype=np.int8)
+        act = np.repeat(a_index[actions], counts)
+        known = act >= 0
+        src = np.repeat(cells, counts)  # cells keep their (int32) type, the table is cached
+        self._table = (packed, src[known], act[known], next_cells[known], p[known])
+        return self._table[1:]
+
+    def _cell_ids(self, positions):
+        # flat cell ids of (r,c) positions, ValueError for one outside the grid
+        pos = np.fromiter(chain.from_iterable(positions), dtype=np.int64).reshape(-1, 2)
+        inside = (pos[:, 0] >= 0) & (pos[:, 0] < self.rows) & (pos[:, 1] >= 0) & (pos[:, 1] < self.cols)
+        if not inside.all():
+            raise ValueError("grid has cells outside its %dx%d bounds" % (self.rows, self.cols))
+        return (pos[:, 0] * self.cols + pos[:, 1]).astype(_index_type(self.rows * self.cols))
+
+    def compile(self):
+        # build the sparse matrices once so solvers can work on arrays instead of dicts
+        is_active = self.active.ravel()
+        is_state = is_active | self.has_reward.ravel()
+        arrival = np.where(self.has_reward, self.reward, 0.0).ravel()
+
+        cells = np.flatnonzero(is_state)
+        n = len(cells)
+        ids = np.full(self.rows * self.cols, -1, dtype=np.int64)
+        ids[cells] = np.arange(n)
+
+        # moves out of terminals are ignored, moves into cells that are not states (walls)
+        # carry no value
+        src, act, dst, p = self._transition_table()
+        keep = is_active[src] & is_state[dst]
+        rows = act[keep].astype(np.int64) * n + ids[src[keep]]
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+
+        indptr = np.zeros(len(ACTION_SPACE) * n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(ACTION_SPACE) * n), out=indptr[1:])
+        indices = ids[dst[keep]][order]
+        data = p[keep][order]
+        return CompiledGrid((self.rows, self.cols), cells, indptr, indices, data, arrival[cells], ~is_active[cells])
+
+    def reset(self):
+        self.i, self.j = self.start
+        return self.start
+
+
+def _pack_probs(grid, probs):
+    # probs dict ==> (cells, actions, indptr, next cells, p, names), CSR rows of
+    # (cell, action) keys in dict order, actions index names (ACTION_SPACE first)
+    names = list(ACTION_SPACE) + sorted({a for _, a in probs} - set(ACTION_SPACE))
+    code = {a: k for k, a in enumerate(names)}
+    cells = grid._cell_ids(s for s, _ in probs)
+    actions = np.array([code[a] for _, a in probs], dtype=np.int8)
+    indptr = _offsets([len(d) for d in probs.values()])
+    next_cells = grid._cell_ids(chain.from_iterable(d.keys() for d in probs.values()))
+    values = np.fromiter(chain.from_iterable(d.values() for d in probs.values()), dtype=float,
+                         count=int(indptr[-1]))
+    return cells, actions, indptr, next_cells, values, np.array(names)
+
+
+def grid_from_json(data):
+    # GridWorld from the dict written by GridEditorGUI.save_map
+    # ("i,j" keys for rewards/actions, "i,j|a" keys for probs)
+    grid = GridWorld(data["rows"], data["cols"], tuple(data["start_pos"]))
+    grid.rewards = {tuple(map(int, k.split(","))): v for k, v in data["rewards"].items()}
+    grid.actions = {tuple(map(int, k.split(","))): v for k, v in data["actions"].items()}
+    grid.probs = {
+        (tuple(map(int, key.split("|")[0].split(","))), key.split("|")[1]):
+            {tuple(map(int, dest_key.split(","))): prob for dest_key, prob in dests.items()}
+        for key, dests in data["probs"].items()
+    }
+    return grid
+
+
+def grid_to_json(grid):
+    # inverse of grid_from_json, the dict GridEditorGUI.save_map writes. the keys are
+    # formatted straight from the arrays, without the tuple-keyed views
+    key = lambda cells: [f"{i},{j}" for i, j in _positions(cells, grid.cols)]
+    cells, actions, indptr, next_cells, p, names = grid._probs
+    names = names.tolist()
+    dest, p = key(next_cells), p.tolist()
+    return {
+        "rows": grid.rows,
+        "cols": grid.cols,
+        "start_pos": list(grid.start),
+        "rewards": dict(zip(key(np.flatnonzero(grid.has_reward)), grid.reward[grid.has_reward].tolist())),
+        "actions": dict(zip(key(np.flatnonzero(grid.active)), map(list, grid.actions.values()))),
+        "probs": {
+            f"{s}|{names[a]}": dict(zip(dest[lo:hi], p[lo:hi]))
+            for s, a, lo, hi in zip(key(cells), actions.tolist(), indptr[:-1].tolist(), indptr[1:].tolist())
+        },
+    }
+
+
+def grid_to_arrays(grid):
+    # the map as flat arrays, cells as r*cols+c ids in row-major order:
+    #   reward_cells, reward_values
+    #   action_cells, action_indptr, action_codes    CSR rows of action lists
+    #   prob_cells, prob_actions, prob_indptr,       CSR rows of (cell, action) keys
+    #   prob_next, prob_values                       with their next cells and p
+    # action codes index action_names (ACTION_SPACE first)
+    index_type = _index_type(grid.rows * grid.cols)
+    prob_cells, prob_actions, prob_indptr, prob_next, prob_values, prob_names = grid._probs
+    extra = set(grid.action_names) | set(prob_names.tolist())
+    names = list(ACTION_SPACE) + sorted(extra - set(ACTION_SPACE))
+    code = {a: k for k, a in enumerate(names)}
+    arrays = {"shape": np.array([grid.rows, grid.cols]), "start": np.array(grid.start),
+              "action_names": np.array(names)}
+
+    cells = np.flatnonzero(grid.has_reward)
+    arrays["reward_cells"] = cells.astype(index_type)
+    arrays["reward_values"] = grid.reward.ravel()[cells]
+
+    # the set bits of every active cell, lowest first
+    cells = np.flatnonzero(grid.active)
+    bits = (grid.action_bits.ravel()[cells, None] >> np.arange(len(grid.action_names), dtype=np.uint8)) & 1
+    held, codes = np.nonzero(bits)
+    remap = np.array([code[a] for a in grid.action_names], dtype=np.int8)
+    arrays.update(action_cells=cells.astype(index_type), action_indptr=_offsets(bits.sum(axis=1)),
+                  action_codes=remap[codes])
+
+    remap = np.array([code[a] for a in prob_names.tolist()], dtype=np.int8)
+    arrays.update(prob_cells=prob_cells, prob_actions=remap[prob_actions], prob_indptr=prob_indptr,
+                  prob_next=prob_next, prob_values=prob_values)
+    return arrays
+
+
+def grid_from_arrays(arrays):
+    # GridWorld from grid_to_arrays output, the arrays are used as they are
+    rows, cols = (int(n) for n in arrays["shape"])
+    grid = GridWorld(rows, cols, tuple(int(c) for c in arrays["start"]))
+    names = arrays["action_names"]
+    if len(names) > 8:
+        raise ValueError("a grid supports at most 8 action names")
+    grid.action_names = names.tolist()
+
+    grid.has_reward.flat[arrays["reward_cells"]] = True
+    grid.reward.flat[arrays["reward_cells"]] = arrays["reward_values"]
+
+    cells, indptr, codes = arrays["action_cells"], arrays["action_indptr"], arrays["action_codes"]
+    grid.active.flat[cells] = True
+    held = np.diff(indptr) > 0  # a cell can be active with no actions
+    if held.any():
+        bits = np.left_shift(np.uint8(1), codes.astype(np.uint8))
+        grid.action_bits.flat[cells[held]] = np.bitwise_or.reduceat(bits, indptr[:-1][held])
+
+    grid._probs = (arrays["prob_cells"], arrays["prob_actions"], arrays["prob_indptr"],
+                   arrays["prob_next"], arrays["prob_values"], names)
+    return grid
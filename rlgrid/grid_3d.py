@@ -0,0 +1,351 @@
+# grid_3d.py
+
+import hashlib
+
+import numpy as np
+
+from .state_index import StateIndex, CellSet, CellValues, cell_of, cells_of, coords_of
+
+EMPTY = 0
+WALL = -1
+REWARD = 1
+PENALTY = -1
+
+ACTIONS_3D = {
+    'U': (-1, 0, 0),   # up (x-)
+    'D': (1, 0, 0),    # down (x+)
+    'L': (0, -1, 0),   # left (y-)
+    'R': (0, 1, 0),    # right (y+)
+    'B': (0, 0, -1),   # back (z-)
+    'F': (0, 0, 1),    # forward (z+)
+}
+
+# where a slipping move goes instead: one of the 4 moves along the other two axes, or
+# any of the 5 other moves
+SLIP_TARGETS = ("perpendicular", "any")
+
+def _shift_slices(d):
+    # slices so that out[dst] = arr[src] reads the neighbour at offset d along one axis
+    if d > 0:
+        return slice(0, -d), slice(d, None)
+    if d < 0:
+        return slice(-d, None), slice(0, d)
+    return slice(None), slice(None)
+
+
+class CompiledGrid3D:
+    # array form of a GridWorld3D, built by GridWorld3D.compile()
+    # state_index: StateIndex of the open voxels, ids in row-major (get_all_states()) order
+    # index: (depth, height, width) array with the state id of each voxel, -1 for walls
+    # coords: (S, 3) voxel of each state id
+    # next_states: (6, S) successor id of every state, one row per action in ACTIONS_3D
+    #   order (action-major so each gather reads one contiguous row)
+    # rewards: (S,) get_reward() of each state, terminal: (S,) is_terminal() of each state
+    # kernel: (6, 6) GridWorld3D.slip_kernel(), None when moves are deterministic. the same
+    #   for every state, so a stochastic backup is one (6, 6) @ (6, S) product on top of
+    #   the deterministic gather
+    def __init__(self, state_index, next_states, rewards, terminal, kernel=None):
+        self.state_index = state_index
+        self.index = state_index.ids.reshape(state_index.shape)
+        self.next_states = next_states
+        self.rewards = rewards
+        self.terminal = terminal
+        self.kernel = kernel
+        self.terminal_values = rewards
+        self.n_states = len(state_index)
+        self.n_actions = len(ACTIONS_3D)
+        self._predecessors = None
+        self._coords = None
+
+    @property
+    def states(self):
+        return self.state_index.states
+
+    @property
+    def coords(self):
+        if self._coords is None:
+            self._coords = self.state_index.coords()
+        return self._coords
+
+    def state_id(self, state):
+        # -1 for walls and cells outside the grid
+        return self.state_index.id(state)
+
+    def match_states(self, other):
+        # id in `other` (an earlier compile) of each of our states, -1 when it had no such state
+        return self.state_index.match(other.state_index)
+
+    def fingerprint(self):
+        # digest of everything the solvers see, used as a cache key
+        h = hashlib.sha256(repr(self.index.shape).encode())
+        for a in (self.index, self.rewards, self.terminal):
+            h.update(np.ascontiguousarray(a).tobytes())
+        if self.kernel is not None:
+            h.update(np.ascontiguousarray(self.kernel).tobytes())
+        return h.digest()
+
+    def policy_model(self, policy):
+        # reward and COO transitions (rows, cols, probs) when following policy[s]
+        rows = np.arange(self.n_states)
+        if self.kernel is None:
+            return self.rewards, rows, self.next_states[policy, rows], np.ones(self.n_states)
+        # one entry per move that intending policy[s] can make
+        probs = self.kernel[policy].T
+        keep = probs > 0
+        rows = np.broadcast_to(rows, probs.shape)
+        return self.rewards, rows[keep], self.next_states[keep], probs[keep]
+
+    def successor_table(self):
+        # fixed-width successors of every (s, a): next states, probabilities and rewards,
+        # each (S, A, K). K = 1 without slip, otherwise the moves each action can make
+        # (the same number for every action). every move pays the reward of the state
+        # it leaves
+        if self.kernel is None:
+            moves, probs = np.arange(self.n_actions)[:, None], np.ones((self.n_actions, 1))
+        else:
+            moves = np.nonzero(self.kernel)[1].reshape(self.n_actions, -1)
+            probs = np.take_along_axis(self.kernel, moves, axis=1)
+        next_states = self.next_states.T[:, moves]
+        probs = np.broadcast_to(probs, next_states.shape).copy()
+        rewards = np.broadcast_to(self.rewards[:, None, None], next_states.shape).copy()
+        return next_states, probs, rewards
+
+    def predecessors(self):
+        # CSR (indptr, indices): states with some action that leads to each state. every
+        # move is some action's intended move, so slip adds no predecessors
+        if self._predecessors is None:
+            n = self.n_states
+            sources = np.broadcast_to(np.arange(n), self.next_states.shape)
+            pairs = np.sort(self.next_states.ravel() * n + sources.ravel())
+            pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+            indptr = np.zeros(n + 1, dtype=np.intp)
+            np.cumsum(np.bincount(pairs // n, minlength=n), out=indptr[1:])
+            self._predecessors = (indptr, pairs % n)
+        return self._predecessors
+
+    def q_state(self, V, s, gamma):
+        # Bellman backup of a single state ==> shape (6,)
+        moved = V[self.next_states[:, s]]
+        if self.kernel is not None:
+            moved = self.kernel @ moved
+        return self.rewards[s] + gamma * moved
+
+    def q_states(self, V, ids, gamma):
+        # q_state of several states at once ==> shape (len(ids), 6)
+        moved = V[self.next_states[:, ids]]
+        if self.kernel is not None:
+            moved = self.kernel @ moved
+        return (self.rewards[ids] + gamma * moved).T
+
+    def reweighted(self, rewards):
+        # same successors with a different reward per state
+        return CompiledGrid3D(self.state_index, self.next_states, rewards, self.terminal, self.kernel)
+
+    def q_values(self, V, gamma):
+        # reward of leaving s plus the discounted value of the successor ==> shape (S, 6)
+        moved = np.take(V, self.next_states)
+        if self.kernel is not None:
+            moved = self.kernel @ moved
+        return (self.rewards + gamma * moved).T
+
+
+class GridWorld3D:
+    # slip: probability that a move goes elsewhere (the intended move is taken with
+    # probability 1 - slip), slip_to: where it goes, one of SLIP_TARGETS with equal odds.
+    # get_next_state() is the intended move, sample_next_state() draws the slip.
+    # the cells are kept in voxel arrays: wall and terminal (bool) and reward (the value of
+    # the terminal cells), about 10 bytes per voxel. walls and rewards are set / dict views
+    # of them for code that edits cells one at a time
+    def __init__(self, depth=4, height=4, width=4, step_cost=-0.04, reward_val=1.0, penalty_val=-1.0,
+                 slip=0.0, slip_to="perpendicular"):
+        self.depth = depth
+        self.height = height
+        self.width = width
+        self.step_cost = step_cost
+        self.reward_val = reward_val
+        self.penalty_val = penalty_val
+        self.slip = slip
+        self.slip_to = slip_to
+        self.wall = np.zeros((depth, height, width), dtype=bool)
+        self.terminal = np.zeros((depth, height, width), dtype=bool)
+        self.reward = np.zeros((depth, height, width))
+        self.start_pos = (0, 0, 0)
+
+    @property
+    def walls(self):
+        return CellSet(self.wall)
+
+    @walls.setter
+    def walls(self, cells):
+        coords = coords_of(self.wall.shape, cells)
+        self.wall[:] = False
+        self.wall[tuple(coords.T)] = True
+
+    @property
+    def rewards(self):
+        # {voxel: reward} of the terminal voxels
+        return CellValues(self.terminal, self.reward)
+
+    @rewards.setter
+    def rewards(self, values):
+        values = dict(values)
+        coords = coords_of(self.wall.shape, values.keys())
+        self.terminal[:] = False
+        self.reward[:] = 0.0
+        self.terminal[tuple(coords.T)] = True
+        self.reward[tuple(coords.T)] = list(values.values())
+
+    def set_cell(self, x, y, z, cell_type):
+        if not (0 <= x < self.depth and 0 <= y < self.height and 0 <= z < self.width):
+            return
+        pos = (x, y, z)
+        if cell_type == WALL:
+            self.walls.add(pos)
+            self.rewards.pop(pos, None)
+        elif cell_type == REWARD:
+            self.rewards[pos] = self.reward_val
+            self.walls.discard(pos)
+        elif cell_type == PENALTY:
+            self.rewards[pos] = self.penalty_val
+            self.walls.discard(pos)
+        else:  # EMPTY or DELETE
+            self.walls.discard(pos)
+            self.rewards.pop(pos, None)
+
+    def set_start(self, x, y, z):
+        if 0 <= x < self.depth and 0 <= y < self.height and 0 <= z < self.width:
+            self.start_pos = (x, y, z)
+
+    def is_terminal(self, state):
+        cell = cell_of(self.wall.shape, state)
+        return cell is not None and bool(self.terminal[cell])
+
+    def is_wall(self, state):
+        cell = cell_of(self.wall.shape, state)
+        return cell is not None and bool(self.wall[cell])
+
+    def get_reward(self, state):
+        cell = cell_of(self.wall.shape, state)
+        if cell is None or not self.terminal[cell]:
+            return self.step_cost
+        return float(self.reward[cell])
+
+    def get_actions(self, state):
+        if self.is_terminal(state) or self.is_wall(state):
+            return []
+        return list(ACTIONS_3D.keys())
+
+    def get_next_state(self, state, action):
+        x, y, z = state
+        dx, dy, dz = ACTIONS_3D[action]
+        nx, ny, nz = x + dx, y + dy, z + dz
+        if not (0 <= nx < self.depth and 0 <= ny < self.height and 0 <= nz < self.width):
+            return state
+        if self.wall[nx, ny, nz]:
+            return state
+        return (nx, ny, nz)
+
+    def slip_kernel(self):
+        # (6, 6) probability that intending action a (row) makes move b (column), in
+        # ACTIONS_3D order, None without slip
+        if not 0.0 <= self.slip <= 1.0:
+            raise ValueError(f"slip must be between 0 and 1, got {self.slip}")
+        if self.slip_to not in SLIP_TARGETS:
+            raise ValueError(f"unknown slip_to {self.slip_to!r}, expected one of {SLIP_TARGETS}")
+        if self.slip == 0.0:
+            return None
+        axes = np.abs(np.array(list(ACTIONS_3D.values())))
+        if self.slip_to == "perpendicular":
+            other = axes @ axes.T == 0
+        else:
+            other = ~np.eye(len(ACTIONS_3D), dtype=bool)
+        kernel = other * (self.slip / other.sum(axis=1, keepdims=True))
+        kernel[np.diag_indices(len(ACTIONS_3D))] = 1.0 - self.slip
+        return kernel
+
+    def sample_next_state(self, state, action, rng=None):
+        # next state of a rollout step: the intended move, or with probability slip one
+        # of the slip_to moves. rng: np.random.Generator (or a seed)
+        kernel = self.slip_kernel()
+        if kernel is not None:
+            names = list(ACTIONS_3D)
+            rng = np.random.default_rng(rng)
+            action = names[rng.choice(len(names), p=kernel[names.index(action)])]
+        return self.get_next_state(state, action)
+
+    def compile(self):
+        shape = self.wall.shape
+        open_cells = ~self.wall
+        states = StateIndex.from_mask(open_cells)
+        n = len(states)
+        index = states.ids.reshape(shape)
+
+        # successor of every voxel for each action: shift the index volume by the
+        # action offset, moves off the grid or into a wall keep the agent in place
+        next_states = np.empty((len(ACTIONS_3D), n), dtype=np.intp)
+        for a, offset in enumerate(ACTIONS_3D.values()):
+            dst, src = zip(*(_shift_slices(d) for d in offset))
+            target = np.full(shape, -1, dtype=np.intp)
+            target[dst] = index[src]
+            target = np.where(target < 0, index, target)
+            next_states[a] = target[open_cells]
+
+        rewards = np.where(self.terminal, self.reward, self.step_cost)
+        return CompiledGrid3D(states, next_states, rewards[open_cells], self.terminal[open_cells],
+                              self.slip_kernel())
+
+    def get_all_states(self):
+        return cells_of(~self.wall)
+
+
+def grid_3d_from_json(data):
+    # GridWorld3D from a dict like saved_maps/custom_3d_map.json
+    # (walls as [x, y, z] lists, rewards with "x,y,z" keys, "slip" / "slip_to" optional)
+    env = GridWorld3D(data["depth"], data["height"], data["width"], slip=data.get("slip", 0.0),
+                      slip_to=data.get("slip_to", "perpendicular"))
+    env.walls = data.get("walls", [])
+    env.rewards = {tuple(map(int, key.split(","))): value for key, value in data.get("rewards", {}).items()}
+    if "start" in data:
+        env.set_start(*data["start"])
+    return env
+
+
+def grid_3d_to_json(env):
+    # inverse of grid_3d_from_json, maps without slip keep the original keys
+    data = {
+        "depth": env.depth,
+        "height": env.height,
+        "width": env.width,
+        "walls": [list(w) for w in env.walls],
+        "rewards": {f"{x},{y},{z}": v for (x, y, z), v in env.rewards.items()},
+        "start": list(env.start_pos),
+    }
+    if env.slip:
+        data.update(slip=env.slip, slip_to=env.slip_to)
+    return data
+
+
+def grid_3d_to_arrays(env):
+    # walls as a bit-packed voxel mask, rewards as flat voxel ids (row-major) and values
+    cells = np.flatnonzero(env.terminal)
+    return {
+        "shape": np.array(env.wall.shape),
+        "start": np.array(env.start_pos),
+        "walls": np.packbits(env.wall.ravel()),
+        "reward_cells": cells.astype(np.int64),
+        "reward_values": env.reward.ravel()[cells],
+        "slip": np.array(float(env.slip)),
+        "slip_to": np.array(env.slip_to),
+    }
+
+
+def grid_3d_from_arrays(arrays):
+    shape = tuple(int(n) for n in arrays["shape"])
+    env = GridWorld3D(*shape)
+    if "slip" in arrays:  # older files have no slip
+        env.slip, env.slip_to = float(arrays["slip"]), str(arrays["slip_to"])
+    env.wall[:] = np.unpackbits(arrays["walls"], count=int(np.prod(shape))).astype(bool).reshape(shape)
+    env.terminal.flat[arrays["reward_cells"]] = True
+    env.reward.flat[arrays["reward_cells"]] = arrays["reward_values"]
+    env.start_pos = tuple(int(c) for c in arrays["start"])
+    return env
@@ -0,0 +1,89 @@
+# maps.py - loading and saving maps without any GUI
+#
+# 2D maps are the JSON files written by GridEditorGUI.save_map (saved_maps/*.json),
+# 3D maps are the JSON files of the 3D editor (3D/saved_maps/*.json) and carry a "depth" key.
+#
+# large maps are better kept in the binary format: a .npz holding the arrays of
+# grid_to_arrays / grid_3d_to_arrays (2D transitions as CSR, 3D walls as a bit mask)
+# plus a format tag, a version and the map kind. it converts to and from the JSON
+# files without loss (numbers come back as floats):
+#   python -m rlgrid convert saved_maps/preset1.json preset1.npz
+
+import json
+
+import numpy as np
+
+from .grid import ACTION_SPACE, grid_from_json, grid_to_json, grid_to_arrays, grid_from_arrays
+from .grid_3d import (ACTIONS_3D, GridWorld3D, grid_3d_from_json, grid_3d_to_json,
+                      grid_3d_to_arrays, grid_3d_from_arrays)
+
+FORMAT = "rlgrid-map"
+VERSION = 1
+BINARY_EXT = ".npz"
+
+
+def is_3d(data):
+    return "depth" in data
+
+
+def map_from_json(data):
+    # GridWorld or GridWorld3D for a parsed map file
+    return grid_3d_from_json(data) if is_3d(data) else grid_from_json(data)
+
+
+def map_to_json(grid):
+    return grid_3d_to_json(grid) if isinstance(grid, GridWorld3D) else grid_to_json(grid)
+
+
+def save_npz(grid, path, compress=True):
+    # compress=False writes a larger file that loads a few times faster
+    if isinstance(grid, GridWorld3D):
+        kind, arrays = "grid_3d", grid_3d_to_arrays(grid)
+    else:
+        kind, arrays = "grid", grid_to_arrays(grid)
+    savez = np.savez_compressed if compress else np.savez
+    with open(path, "wb") as f:  # a file object keeps numpy from appending .npz
+        savez(f, format=np.array(FORMAT), version=np.array(VERSION), kind=np.array(kind), **arrays)
+
+
+def load_npz(path):
+    with np.load(path) as f:
+        if "format" not in f or str(f["format"]) != FORMAT:
+            raise ValueError(f"{path} is not an rlgrid map")
+        version = int(f["version"])
+        if version > VERSION:
+            raise ValueError(f"{path} uses map format version {version}, this version reads up to {VERSION}")
+        arrays = {k: f[k] for k in f.files}
+    if str(arrays["kind"]) == "grid_3d":
+        return grid_3d_from_arrays(arrays)
+    return grid_from_arrays(arrays)
+
+
+def load_map(path):
+    # GridWorld or GridWorld3D from a .json or binary map
+    if path.endswith(BINARY_EXT):
+        return load_npz(path)
+    with open(path, "r") as f:
+        return map_from_json(json.load(f))
+
+
+def save_map(grid, path):
+    if path.endswith(BINARY_EXT):
+        save_npz(grid, path)
+        return
+    with open(path, "w") as f:
+        json.dump(map_to_json(grid), f)
+
+
+# helpers that hide the naming differences between the two grid types
+
+def start_of(grid):
+    return grid.start_pos if isinstance(grid, GridWorld3D) else grid.start
+
+
+def shape_of(grid):
+    return (grid.depth, grid.height, grid.width) if isinstance(grid, GridWorld3D) else (grid.rows, grid.cols)
+
+
+def action_names(grid):
+    return tuple(ACTIONS_3D) if isinstance(grid, GridWorld3D) else ACTION_SPACE
@@ -0,0 +1,105 @@
+# monitor.py - per-iteration instrumentation shared by the solvers in solvers.py
+#
+# pass monitor=SolveMonitor(...) to any solver (or to the value_iteration / policy_iteration
+# / ... wrappers). the solver reports every iteration (a full sweep; for prioritized
+# sweeping every sweep_size backups) and the monitor turns it into a record:
+#   {"event": "iteration", "solver": ..., "iteration": 3, "delta": 0.0123, "backups": 950,
+#    "policy_changes": 12, "wall": 0.004, "cpu": 0.004, "elapsed": 0.012}
+# delta is the Bellman residual of the iteration, wall / cpu its own time, elapsed the
+# wall time since the solve started. policy_changes is None where a solver has no policy
+# to compare. finish() adds a last record with "event": "done", the totals, the
+# converged flag and the peak memory the solve allocated (tracemalloc, memory=True).
+#
+#   monitor = SolveMonitor(callback=print, log="solve.jsonl", profile="solve.prof")
+#   value_iteration(grid, monitor=monitor)
+#   monitor.report ==> the "done" record
+#
+# log: path or open file, one JSON object per line. profile: True to keep the
+# cProfile.Profile in monitor.profiler, or a path to dump its stats to (pstats format).
+
+import cProfile
+import json
+import time
+import tracemalloc
+
+
+class SolveMonitor:
+    def __init__(self, callback=None, log=None, profile=False, memory=True):
+        self.callback = callback
+        self.log = log
+        self.profile = profile
+        self.memory = memory
+        self.records = []
+        self.report = None
+        self.profiler = None
+
+    def start(self, solver, model):
+        self.solver = solver
+        self.n_states = int(model.n_states)
+        self.records = []
+        self.report = None
+        self.backups = 0
+        self._file = open(self.log, "a") if isinstance(self.log, str) else self.log
+        self._tracing = self.memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+        self._wall0 = self._wall = time.perf_counter()
+        self._cpu0 = self._cpu = time.process_time()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def iteration(self, delta, backups, policy_changes=None):
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.backups += int(backups)
+        self._emit({
+            "event": "iteration",
+            "solver": self.solver,
+            "iteration": len(self.records) + 1,
+            "delta": float(delta),
+            "backups": int(backups),
+            "policy_changes": None if policy_changes is None else int(policy_changes),
+            "wall": wall - self._wall,
+            "cpu": cpu - self._cpu,
+            "elapsed": wall - self._wall0,
+        })
+        self._wall, self._cpu = wall, cpu
+
+    def finish(self, converged, delta=None):
+        if self.profiler is not None:
+            self.profiler.disable()
+            if isinstance(self.profile, str):
+                self.profiler.dump_stats(self.profile)
+        peak = None
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._tracing:
+                tracemalloc.stop()
+        iterations = [r for r in self.records if r["event"] == "iteration"]
+        self.report = {
+            "event": "done",
+            "solver": self.solver,
+            "states": self.n_states,
+            "iterations": len(iterations),
+            "backups": self.backups,
+            "converged": bool(converged),
+            "delta": None if delta is None else float(delta),
+            "wall": time.perf_counter() - self._wall0,
+            "cpu": time.process_time() - self._cpu0,
+            "peak_memory": peak,
+        }
+        self._emit(self.report)
+        if isinstance(self.log, str):
+            self._file.close()
+        self._file = None
+        return self.report
+
+    def _emit(self, record):
+        self.records.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        if self.callback:
+            self.callback(record)
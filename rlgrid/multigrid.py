@@ -0,0 +1,168 @@
+# multigrid.py - coarse-to-fine value iteration for the 2D and 3D grids
+#
+# plain value iteration moves value information one cell per sweep, so on a large map
+# the number of sweeps grows with its diameter. solve_multigrid() solves a hierarchy
+# of block MDPs first and hands each solution down as the start of the next level:
+#
+#   level k   blocks of factor**k cells along every axis (k = levels .. 1)
+#   level 0   the compiled grid itself
+#
+# a block MDP averages its cells: from block B, action a leads to block B' with the
+# mean over the cells of B of the probability to land in B'. the probability of staying
+# in B is folded into the block's reward and discount (sweep_table does the same for
+# single cells), so a coarse backup moves the value a whole block. terminal states and
+# states that cannot reach a terminal stay blocks of their own.
+#
+# every level is solved with in-place sweeps in wavefront order (sweep_in_place): a
+# backup reads the values updated earlier in the same sweep, and the 2**d orders let a
+# value cross the map in one sweep. the start of a level is the prolonged coarser
+# solution, never below resting_values(): in-place max-backups recover slowly from
+# values that are too high, so states that cannot reach a terminal start at rest.
+#
+#   V, Q, stats = solve_multigrid(grid.compile(), gamma=0.99, factor=4, levels=2)
+#   stats["levels"] ==> [{"level": 2, "block": 16, "states": 977, "sweeps": 31, "seconds": 0.05}, ...]
+#   stats["sweeps"] ==> work in fine sweeps: every sweep weighted by its share of the states
+#
+# works on any compiled model with coords (S, d), successor_table() and predecessors().
+#
+# it is not one of the editor's SOLVERS: the wavefront sweeps of
+# solve_value_iteration(mode="gauss_seidel") already carry a value across the map in one
+# sweep, and the sweeps left are the bends of the paths around walls, which blocks that
+# straddle walls cannot shortcut. a prolonged start that is too high also decays only by
+# gamma per sweep, so multigrid takes more fine sweeps than gauss_seidel takes in total
+# (500x500 open map: 17 against 4, 60x60 maze: 58 against 5). FAS V-cycles (restricting
+# the residual to the blocks and correcting the cells) diverge on mazes for the same
+# reason. bench --bench vi_modes keeps a multigrid row to measure it against the modes.
+
+import time
+
+import numpy as np
+
+from .solvers import _not_converged, resting_values, sweep_in_place, sweep_table, terminal_ancestors, wavefront_layers
+
+MIN_COARSE_STATES = 64
+
+
+def block_ids(coords, single, block):
+    # (ids, n) block of every state: states in the same block x block cube share an id,
+    # the states in `single` get an id of their own
+    key = coords // block
+    if len(key):
+        key = np.ravel_multi_index(tuple(key.T), tuple(key.max(axis=0) + 1))
+    key = np.where(single, -1 - np.arange(len(coords)), key)
+    uniq, ids = np.unique(key, return_inverse=True)
+    return ids.reshape(-1), len(uniq)
+
+
+class CoarseModel:
+    # block MDP of a compiled model for one gamma, in sweep_table form:
+    #   table      (next_blocks, probs, step, discount), next = -1 for a move that leaves
+    #              the states (value 0)
+    #   coords     (B, d) block coordinates, for wavefront_layers
+    #   terminal, terminal_values   like a compiled model
+    def __init__(self, model, ids, n_blocks, coords, gamma):
+        n_actions = model.n_actions
+        next_states, probs, rewards = model.successor_table()
+        weight = 1.0 / np.bincount(ids, minlength=n_blocks)[ids]
+
+        # mean over the cells of each block of the successor blocks of every action
+        keep = (probs > 0) & ~model.terminal[:, None, None]
+        rows = (ids[:, None, None] * n_actions + np.arange(n_actions)[None, :, None]) + np.zeros_like(next_states)
+        targets = np.where(next_states < 0, n_blocks, np.append(ids, n_blocks)[next_states])
+        mass = probs * weight[:, None, None]
+        n_rows = n_blocks * n_actions
+        step = np.bincount(rows[keep], weights=(mass * rewards)[keep], minlength=n_rows)
+        pairs, inverse = np.unique(rows[keep] * (n_blocks + 1) + targets[keep], return_inverse=True)
+        mass = np.bincount(inverse.reshape(-1), weights=mass[keep])
+        rows, cols = np.divmod(pairs, n_blocks + 1)
+
+        own = cols == rows // n_actions
+        stay = np.bincount(rows[own], weights=mass[own], minlength=n_rows)
+        rows, cols, mass = rows[~own], cols[~own], mass[~own]
+        cols[cols == n_blocks] = -1
+
+        # fixed width successor table, rows are sorted so each row's entries are contiguous
+        counts = np.bincount(rows, minlength=n_rows)
+        width = max(1, int(counts.max(initial=0)))
+        pos = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        next_blocks = np.full((n_rows, width), -1, dtype=np.int64)
+        block_probs = np.zeros((n_rows, width))
+        next_blocks[rows, pos] = cols
+        block_probs[rows, pos] = mass
+
+        scale = 1.0 / (1.0 - gamma * stay)
+        shape = (n_blocks, n_actions)
+        self.table = (next_blocks.reshape(shape + (width,)), block_probs.reshape(shape + (width,)),
+                      (step * scale).reshape(shape), (gamma * scale).reshape(shape))
+        self.coords = np.zeros((n_blocks, coords.shape[1]), dtype=coords.dtype)
+        self.coords[ids] = coords
+        self.n_states = n_blocks
+        self.terminal = np.bincount(ids, weights=model.terminal, minlength=n_blocks) > 0
+        self.terminal_values = np.zeros(n_blocks)
+        self.terminal_values[ids[model.terminal]] = model.terminal_values[model.terminal]
+
+
+def coarse_levels(coords, factor, min_states=MIN_COARSE_STATES):
+    # number of levels before the blocks cover fewer than min_states blocks
+    if len(coords) == 0:
+        return 0
+    extent = coords.max(axis=0) + 1
+    levels = 0
+    while np.prod(-(-extent // factor ** (levels + 1))) >= min_states:
+        levels += 1
+    return levels
+
+
+def solve_multigrid(model, gamma=0.9, threshold=1.0e-3, factor=4, levels=None, max_iterations=None,
+                    monitor=None):
+    # returns (V, Q, stats) like solve_prioritized_sweeping. levels=None coarsens until
+    # fewer than MIN_COARSE_STATES blocks are left, levels=0 only runs the fine sweeps.
+    # max_iterations caps the sweeps of every level, monitor sees the fine level only.
+    # stats["levels"] lists the levels coarsest first with their states, sweeps and
+    # seconds (building the level included)
+    if monitor:
+        monitor.start("multigrid", model)
+    coords = np.asarray(model.coords)
+    if levels is None:
+        levels = coarse_levels(coords, factor)
+    floor = resting_values(model, gamma)
+    reaches = terminal_ancestors(model)
+    single = model.terminal | ~reaches
+
+    report = []
+    estimate = floor  # value of every state from the last level solved
+    for level in range(levels, 0, -1):
+        t0 = time.perf_counter()
+        block = factor ** level
+        ids, n_blocks = block_ids(coords, single, block)
+        coarse = CoarseModel(model, ids, n_blocks, coords // block, gamma)
+        active = np.flatnonzero(~coarse.terminal)
+        V0 = np.bincount(ids, weights=estimate, minlength=n_blocks) / np.bincount(ids, minlength=n_blocks)
+        V0 = np.where(coarse.terminal, coarse.terminal_values, V0)
+        V_coarse, sweeps, _ = sweep_in_place(coarse.table, V0, wavefront_layers(coarse.coords, active),
+                                             threshold, max_iterations)
+        estimate = np.where(reaches, np.maximum(V_coarse[ids], floor), floor)
+        report.append({"level": level, "block": block, "states": n_blocks, "sweeps": sweeps,
+                       "seconds": time.perf_counter() - t0})
+
+    t0 = time.perf_counter()
+    active = np.flatnonzero(~model.terminal)
+    V0 = np.where(model.terminal, model.terminal_values, estimate)
+    V, sweeps, delta = sweep_in_place(sweep_table(model, gamma), V0, wavefront_layers(coords, active),
+                                      threshold, max_iterations, monitor)
+    report.append({"level": 0, "block": 1, "states": model.n_states, "sweeps": sweeps,
+                   "seconds": time.perf_counter() - t0})
+
+    n = max(model.n_states, 1)
+    stats = {
+        "levels": report,
+        "sweeps": sum(r["sweeps"] * r["states"] / n for r in report),
+        "fine_sweeps": sweeps,
+        "seconds": sum(r["seconds"] for r in report),
+        "converged": delta < threshold,
+    }
+    if monitor:
+        monitor.finish(stats["converged"], delta)
+    if not stats["converged"]:
+        _not_converged("multigrid", sweeps, delta, threshold)
+    return V, model.q_values(V, gamma), stats
@@ -0,0 +1,90 @@
+# solve_cache.py - content-addressed cache of solved grids
+#
+# keys hash the compiled grid (model.fingerprint(): dimensions, rewards, walls and
+# actions, transition probabilities) together with the start cell, the solver name
+# and its parameters (gamma, threshold, ...), so the same map solved twice - a preset,
+# a map reloaded from disk - is answered without running the solver again.
+# values are the (V, Q) arrays of the solution, kept in a bounded LRU in memory and,
+# when a directory is given, as <key>.npz files that survive restarts.
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SolveCache:
+    def __init__(self, max_entries=32, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, model, *params):
+        h = hashlib.sha256(model.fingerprint())
+        h.update(repr(params).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    value = (data["V"], data["Q"])
+            except (OSError, ValueError, KeyError):
+                value = None  # unreadable file, solve again and overwrite it
+            if value is not None:
+                self.hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, V, Q):
+        self._remember(key, (V, Q))
+        path = self._path(key)
+        if path:
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, V=V, Q=Q)
+            os.replace(tmp, path)
+
+    def solve(self, model, params, solver):
+        # cached (V, Q) for model/params, solver() ==> (V, Q) is only called on a miss
+        key = self.key(model, *params)
+        value = self.get(key)
+        if value is None:
+            value = solver()
+            self.put(key, *value)
+        return value
+
+    def clear(self):
+        # forget the solutions in memory and start the statistics over (.npz files stay)
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "max_entries": self.max_entries}
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz") if self.directory else None
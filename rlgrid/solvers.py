@@ -0,0 +1,532 @@
+# solvers.py - array solvers shared by the 2D and 3D grids
+#
+# every solver works on a compiled grid (GridWorld.compile() / GridWorld3D.compile())
+# and only relies on:
+#   model.n_states, model.n_actions
+#   model.terminal         (S,) bool, terminal states keep model.terminal_values
+#   model.q_values(V, g)   (S, A) one Bellman backup for every (s, a)
+#   model.policy_model(pi) (r_pi, rows, cols, probs) reward and COO transitions under pi
+#   model.q_state(V, s, g) (A,) backup of a single state
+#   model.q_states(V, ids, g) (len(ids), A) backups of several states
+#   model.predecessors()   CSR (indptr, indices) of the states leading to each state
+# and returns (V, Q, iterations) as arrays indexed by state id.
+#
+# solve_value_iteration(..., mode=...) picks jacobi sweeps, in-place Gauss-Seidel sweeps in
+# wavefront order, over-relaxed (SOR) sweeps or Anderson acceleration (VI_MODES); the
+# in-place modes also need model.coords and model.successor_table().
+#
+# monitor=SolveMonitor(...) (monitor.py) records the residual, backups, timings and policy
+# changes of every iteration. solvers that run out of max_iterations before converging
+# warn with a RuntimeWarning.
+
+import heapq
+import itertools
+import warnings
+
+import numpy as np
+
+VI_MODES = ("jacobi", "gauss_seidel", "sor", "anderson")
+SOR_OMEGA = 1.5
+ANDERSON_HISTORY = 2
+
+
+def _sparse_solver():
+    # scipy is optional and slow to import, so it is only loaded by exact policy evaluation
+    try:
+        from scipy.sparse import csr_matrix, identity
+        from scipy.sparse.linalg import spsolve
+    except ImportError:  # exact evaluation falls back to sweeping until converged
+        return None
+    return csr_matrix, identity, spsolve
+
+
+def initial_values(model):
+    return np.where(model.terminal, model.terminal_values, 0.0)
+
+
+def resting_level(model, gamma):
+    # value of collecting the typical step reward forever
+    step_rewards = model.q_values(np.zeros(model.n_states), gamma).max(axis=1)[~model.terminal]
+    return np.median(step_rewards) / (1 - gamma) if step_rewards.size else 0.0
+
+
+def resting_values(model, gamma, level=None):
+    # start values for in-place solvers: non-terminal states get resting_level(). that is
+    # a fixed point away from terminals, so only the frontier around them has a Bellman
+    # error. level skips computing it again
+    level = resting_level(model, gamma) if level is None else level
+    return np.where(model.terminal, model.terminal_values, level)
+
+
+def bellman_error(model, V, gamma):
+    return np.where(model.terminal, 0.0, np.abs(model.q_values(V, gamma).max(axis=1) - V))
+
+
+def _not_converged(solver, iterations, delta, threshold):
+    warnings.warn(f"{solver} stopped after {iterations} iterations without converging "
+                  f"(residual {delta:.3g}, threshold {threshold:.3g})", RuntimeWarning, stacklevel=3)
+
+
+def solve_value_iteration(model, gamma=0.9, threshold=1.0e-3, max_iterations=None, progress_callback=None,
+                          V=None, monitor=None, mode="jacobi", omega=SOR_OMEGA, history=ANDERSON_HISTORY):
+    # V warm-starts the sweeps from an earlier solution. mode (VI_MODES):
+    #   jacobi        every sweep backs up all states from the values of the last sweep
+    #   gauss_seidel  in-place sweeps in wavefront order (sweep_in_place), starting from
+    #                 resting_values() unless V is given; needs model.coords and
+    #                 model.successor_table()
+    #   sor           the same with every backup over-relaxed by omega
+    #   anderson      jacobi backups mixed over the last `history` iterates
+    # an iteration is one sweep in every mode, the stopping rule is the same
+    if mode not in VI_MODES:
+        raise ValueError(f"unknown mode {mode!r}, expected one of {VI_MODES}")
+    if mode != "jacobi":
+        return _accelerated_value_iteration(model, gamma, threshold, max_iterations, progress_callback, V,
+                                            monitor, mode, omega, history)
+    if monitor:
+        monitor.start("value_iteration", model)
+    V = initial_values(model) if V is None else np.where(model.terminal, model.terminal_values, V)
+    active = ~model.terminal
+    n_active = int(active.sum())
+    policy = None
+
+    iteration = 0
+    delta = np.inf
+    while max_iterations is None or iteration < max_iterations:
+        Q = model.q_values(V, gamma)
+        new_V = np.where(active, Q.max(axis=1), V)
+        delta = np.abs(new_V - V).max(initial=0.0)
+        V = new_V
+
+        iteration += 1
+        if progress_callback:
+            progress_callback(iteration)
+        if monitor:
+            greedy = Q.argmax(axis=1)
+            changes = None if policy is None else np.count_nonzero(active & (greedy != policy))
+            policy = greedy
+            monitor.iteration(delta, n_active, changes)
+
+        if delta < threshold:
+            break
+
+    converged = delta < threshold
+    if monitor:
+        monitor.finish(converged, delta)
+    if not converged:
+        _not_converged("value iteration", iteration, delta, threshold)
+    return V, model.q_values(V, gamma), iteration
+
+
+def _accelerated_value_iteration(model, gamma, threshold, max_iterations, progress_callback, V, monitor, mode,
+                                 omega, history):
+    if monitor:
+        monitor.start(mode, model)
+    if mode == "anderson":
+        V = initial_values(model) if V is None else np.where(model.terminal, model.terminal_values, V)
+        V, iteration, delta = _anderson_iteration(model, gamma, threshold, max_iterations, progress_callback, V,
+                                                  monitor, history)
+    else:
+        V = resting_values(model, gamma) if V is None else np.where(model.terminal, model.terminal_values, V)
+        orders = wavefront_layers(np.asarray(model.coords), np.flatnonzero(~model.terminal))
+        V, iteration, delta = sweep_in_place(sweep_table(model, gamma), V, orders, threshold, max_iterations,
+                                             monitor, omega if mode == "sor" else 1.0, progress_callback)
+
+    converged = delta < threshold
+    if monitor:
+        monitor.finish(converged, delta)
+    if not converged:
+        _not_converged(mode.replace("_", "-"), iteration, delta, threshold)
+    return V, model.q_values(V, gamma), iteration
+
+
+def evaluate_policy(model, policy, gamma=0.9, threshold=1.0e-3, sweeps=None, V=None):
+    # sweeps=None solves V = r_pi + gamma * P_pi V exactly, otherwise runs that many
+    # in-place evaluation sweeps starting from V (modified policy iteration)
+    n = model.n_states
+    r_pi, rows, cols, probs = model.policy_model(policy)
+    keep = ~model.terminal[rows]
+    rows, cols, probs = rows[keep], cols[keep], probs[keep]
+    b = np.where(model.terminal, model.terminal_values, r_pi)
+
+    sparse = _sparse_solver() if sweeps is None else None
+    if sparse is not None:
+        csr_matrix, identity, spsolve = sparse
+        P = csr_matrix((probs, (rows, cols)), shape=(n, n))
+        return np.asarray(spsolve((identity(n, format="csr") - gamma * P).tocsc(), b), dtype=float)
+
+    V = initial_values(model) if V is None else V.copy()
+    k = 0
+    while sweeps is None or k < sweeps:
+        new_V = b + gamma * np.bincount(rows, weights=probs * V[cols], minlength=n)
+        delta = np.abs(new_V - V).max(initial=0.0)
+        V = new_V
+        k += 1
+        if sweeps is None and delta < threshold * (1 - gamma):
+            break
+    return V
+
+
+def solve_policy_iteration(model, gamma=0.9, threshold=1.0e-3, eval_sweeps=None, max_iterations=None,
+                           progress_callback=None, monitor=None):
+    # eval_sweeps=None ==> policy iteration with exact evaluation, stops when the policy is stable
+    # eval_sweeps=k    ==> modified policy iteration, stops when the Bellman residual < threshold
+    # a monitored iteration counts the improvement backups plus the evaluation sweeps
+    # (the exact linear solve counts as none)
+    if monitor:
+        monitor.start("policy_iteration" if eval_sweeps is None else "modified_policy_iteration", model)
+    active = ~model.terminal
+    all_states = np.arange(model.n_states)
+    backups = int(active.sum()) * (1 + (eval_sweeps or 0))
+    converged = False
+    residual = np.inf
+
+    V = initial_values(model)
+    Q = model.q_values(V, gamma)
+    policy = Q.argmax(axis=1)
+
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        V = evaluate_policy(model, policy, gamma, threshold, eval_sweeps, V)
+        Q = model.q_values(V, gamma)
+
+        # only switch action on a strict improvement so ties cannot make the policy cycle
+        greedy = Q.argmax(axis=1)
+        improves = Q[all_states, greedy] > Q[all_states, policy] + 1e-12
+        new_policy = np.where(improves, greedy, policy)
+        changed = np.count_nonzero(active & (new_policy != policy))
+        policy = new_policy
+
+        iteration += 1
+        if progress_callback:
+            progress_callback(iteration)
+        residual = np.abs(Q.max(axis=1) - V)[active].max(initial=0.0)
+        if monitor:
+            monitor.iteration(residual, backups, changed)
+
+        converged = changed == 0 if eval_sweeps is None else residual < threshold
+        if converged:
+            break
+
+    if monitor:
+        monitor.finish(converged, residual)
+    if not converged:
+        _not_converged("policy iteration", iteration, residual, threshold)
+    return V, Q, iteration
+
+
+def solve_prioritized_sweeping(model, gamma=0.9, threshold=1.0e-3, max_backups=None, V=None, monitor=None):
+    # asynchronous (in-place) value iteration: always back up the state with the largest
+    # Bellman error and re-check only its predecessors, stop when every error < threshold
+    # or after max_backups. returns (V, Q, stats). a monitored iteration is sweep_size
+    # backups, its delta the largest error still queued
+    if monitor:
+        monitor.start("prioritized_sweeping", model)
+    active = ~model.terminal
+    sweep_size = int(active.sum())
+    report_every = max(sweep_size, 1)
+    V = resting_values(model, gamma) if V is None else np.array(V, dtype=float)
+
+    pred_ptr, pred = model.predecessors()
+    error = bellman_error(model, V, gamma)
+    queue = [(-e, s) for s, e in enumerate(error.tolist()) if e >= threshold]
+    heapq.heapify(queue)
+
+    backups = 0
+    while queue and (max_backups is None or backups < max_backups):
+        priority, s = heapq.heappop(queue)
+        if -priority != error[s]:
+            continue  # stale entry, s was re-queued or backed up since
+        V[s] = model.q_state(V, s, gamma).max()
+        error[s] = 0.0
+        backups += 1
+
+        for p in pred[pred_ptr[s]:pred_ptr[s + 1]].tolist():
+            if active[p]:
+                e = abs(model.q_state(V, p, gamma).max() - V[p])
+                error[p] = e
+                if e >= threshold:
+                    heapq.heappush(queue, (-e, p))
+        if monitor and backups % report_every == 0:
+            monitor.iteration(-queue[0][0] if queue else 0.0, report_every)
+
+    stats = {
+        "backups": backups,
+        "sweep_size": sweep_size,  # backups done by one full sweep
+        "sweeps": backups / sweep_size if sweep_size else 0.0,
+        "converged": not (error >= threshold).any(),
+    }
+    if monitor:
+        if backups % report_every or not monitor.records:
+            monitor.iteration(-queue[0][0] if queue else 0.0, backups % report_every)
+        monitor.finish(stats["converged"], error.max(initial=0.0))
+    return V, model.q_values(V, gamma), stats
+
+
+def _dedupe(ids, keep, slot):
+    # ids with keep[id] set, each once, in O(len(ids)): `slot` is scratch of size S
+    ids = ids[keep[ids]]
+    order = np.arange(len(ids))
+    slot[ids] = order
+    return ids[slot[ids] == order]
+
+
+def sweep_frontier(model, gamma, threshold, V, seeds):
+    # prioritized sweeping in batches, for a V that only has Bellman errors at `seeds`
+    # (ids): every round backs up the queued states at once, keeps the backups that
+    # change a value by threshold or more and queues the predecessors of those states.
+    # states never queued keep their value, so the work is bounded by the region the
+    # change reaches. stops when a round changes nothing: every error is then < threshold.
+    # returns (V, stats) like solve_prioritized_sweeping
+    # predecessors as a padded (S, width) table, the padding is state S and never active
+    pred = _padded_rows(*model.predecessors(), model.n_states)
+    active = np.append(~model.terminal, False)
+    V = np.array(V, dtype=float)
+    slot = np.zeros(model.n_states + 1, dtype=np.int64)
+    queued = _dedupe(np.asarray(seeds, dtype=np.int64), active, slot)
+    backups = rounds = 0
+    while queued.size:
+        q = model.q_states(V, queued, gamma).max(axis=1)
+        moved = np.abs(q - V[queued]) >= threshold
+        backups += len(queued)
+        rounds += 1
+        changed = queued[moved]
+        V[changed] = q[moved]
+        queued = _dedupe(pred[changed].ravel(), active, slot)
+    sweep_size = int(active.sum())
+    stats = {"backups": backups, "rounds": rounds, "sweep_size": sweep_size,
+             "sweeps": backups / sweep_size if sweep_size else 0.0, "converged": True}
+    return V, stats
+
+
+def wavefront_layers(coords, states):
+    # in-place sweep orders of `states` (ids) at integer coords (S, d): one order per
+    # corner of the grid (2**d sign patterns), each a list of groups of the states at the
+    # same distance sum(sign * coord) from it. a sweep backs up one group at a time, so
+    # a value crosses the whole grid in one sweep along any path going away from the
+    # corner, instead of one cell per sweep
+    states = np.asarray(states)
+    orders = []
+    for signs in itertools.product((1, -1), repeat=coords.shape[1]):
+        key = coords[states] @ np.array(signs)
+        order = np.argsort(key, kind="stable")
+        cuts = np.flatnonzero(np.diff(key[order])) + 1
+        orders.append(np.split(states[order], cuts))
+    return orders
+
+
+def sweep_table(model, gamma):
+    # (next_states, probs, step, discount) with Q(s, a) = step + discount * sum(probs * V[next])
+    # for in-place sweeps, next = -1 reads 0. the probability of staying in s is folded
+    # into step and discount: same fixed point, but a state that bumps into a wall
+    # settles in one backup instead of converging at gamma per sweep
+    # deterministic moves (every probability 0 or 1) get probs = None and skip the product
+    next_states, probs, rewards = model.successor_table()
+    own = next_states == np.arange(model.n_states)[:, None, None]
+    scale = 1.0 / (1.0 - gamma * np.where(own, probs, 0.0).sum(axis=2))
+    step = (probs * rewards).sum(axis=2) * scale
+    probs = np.where(own, 0.0, probs)
+    next_states = np.where(probs > 0, next_states, -1)
+    if np.all((probs == 1.0) | (next_states < 0)):
+        probs = None
+    return next_states, probs, step, gamma * scale
+
+
+def sweep_in_place(table, V, orders, threshold, max_sweeps=None, monitor=None, omega=1.0,
+                   progress_callback=None):
+    # Gauss-Seidel sweeps over `orders` (wavefront_layers), one order per sweep in turn,
+    # until a sweep changes no value by threshold ==> (V, sweeps, delta). states that are
+    # in no group (terminals) keep their value. delta is the largest |backup - V|.
+    # omega != 1 relaxes every backup (SOR): V += omega * (backup - V). an overshoot
+    # shows up as a larger delta in the sweep after it: the values then go back to where
+    # they were before the sweep that made it and the sweeps go on with omega = 1
+    next_states, probs, step, discount = table
+    V = np.append(np.asarray(V, dtype=float), 0.0)
+    backups = sum(len(group) for group in orders[0]) if orders else 0
+    saved = [V.copy()] if omega != 1.0 else None  # V before the last two sweeps
+    last = np.inf
+    sweeps = 0
+    delta = np.inf
+    while orders and (max_sweeps is None or sweeps < max_sweeps):
+        delta = 0.0
+        for group in orders[sweeps % len(orders)]:
+            moved = V[next_states[group]] if probs is None else probs[group] * V[next_states[group]]
+            change = (step[group] + discount[group] * moved.sum(axis=2)).max(axis=1) - V[group]
+            delta = max(delta, float(np.abs(change).max()))
+            V[group] += change if omega == 1.0 else omega * change
+        sweeps += 1
+        if progress_callback:
+            progress_callback(sweeps)
+        if monitor:
+            monitor.iteration(delta, backups)
+        if saved is not None:
+            if delta > last:
+                V, saved, omega, delta = saved[0], None, 1.0, np.inf
+                continue
+            saved = saved[-1:] + [V.copy()]
+        last = delta
+        if delta < threshold:
+            break
+    return V[:-1], sweeps, delta if orders else 0.0
+
+
+def _anderson_iteration(model, gamma, threshold, max_iterations, progress_callback, V, monitor, history):
+    # Anderson-accelerated value iteration: the next V mixes the last `history` backups
+    # with the weights that minimise the combined residual (least squares over their
+    # differences). an accelerated step whose residual (Euclidean norm, the max norm
+    # rejects nearly every step where the greedy action still changes) is larger than
+    # the residual before it is thrown away: the plain backup is used instead and the
+    # history restarts
+    active = ~model.terminal
+    n_active = int(active.sum())
+    dF, dG = [], []
+    x = V
+    g = np.where(active, model.q_values(x, gamma).max(axis=1), x)
+    f = g - x
+    delta = np.abs(f).max(initial=0.0)
+    backups = n_active  # the backup of the start goes into the first iteration
+    iteration = 0
+    while delta >= threshold and (max_iterations is None or iteration < max_iterations):
+        if dF:
+            F = np.array(dF).T
+            weights = np.linalg.lstsq(F, f, rcond=None)[0]
+            new_x = g - np.array(dG).T @ weights
+        else:
+            new_x = g
+        new_g = np.where(active, model.q_values(new_x, gamma).max(axis=1), new_x)
+        new_f = new_g - new_x
+        new_delta = np.abs(new_f).max(initial=0.0)
+        backups += n_active
+        if dF and np.linalg.norm(new_f) > np.linalg.norm(f):
+            # safe fallback: the plain backup g, whose own backup costs one more sweep
+            dF, dG = [], []
+            new_x = g
+            new_g = np.where(active, model.q_values(new_x, gamma).max(axis=1), new_x)
+            new_f = new_g - new_x
+            new_delta = np.abs(new_f).max(initial=0.0)
+            backups += n_active
+        else:
+            dF.append(new_f - f)
+            dG.append(new_g - g)
+            if len(dF) > history:
+                del dF[0], dG[0]
+        x, g, f, delta = new_x, new_g, new_f, new_delta
+
+        iteration += 1
+        if progress_callback:
+            progress_callback(iteration)
+        if monitor:
+            monitor.iteration(delta, backups)
+        backups = 0
+    return g, iteration, delta
+
+
+def _padded_rows(indptr, indices, pad):
+    # CSR rows as a (rows, max row length) table, short rows filled with `pad`
+    counts = np.diff(indptr)
+    table = np.full((len(counts), max(1, int(counts.max(initial=0)))), pad, dtype=np.int64)
+    table[np.repeat(np.arange(len(counts)), counts), np.arange(len(indices)) - np.repeat(indptr[:-1], counts)] = indices
+    return table
+
+
+def _csr_rows(indptr, indices, rows):
+    # entries of the CSR rows `rows`, concatenated
+    starts, stops = indptr[rows], indptr[rows + 1]
+    counts = stops - starts
+    pos = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return indices[pos]
+
+
+def terminal_ancestors(model):
+    # mask of the states with some way (any actions, any number of steps) into a terminal
+    pred_ptr, pred = model.predecessors()
+    reached = model.terminal.copy()
+    frontier = np.flatnonzero(reached)
+    while frontier.size:
+        frontier = np.unique(_csr_rows(pred_ptr, pred, frontier))
+        frontier = frontier[~reached[frontier]]
+        reached[frontier] = True
+    return reached
+
+
+def policy_ancestors(model, policy, seeds):
+    # mask of the states whose policy can lead (in any number of steps) into seeds
+    n = model.n_states
+    _, rows, cols, _ = model.policy_model(policy)
+    order = np.argsort(cols, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=n), out=indptr[1:])
+    sources = rows[order]
+
+    reached = np.zeros(n, dtype=bool)
+    frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+    reached[frontier] = True
+    while frontier.size:
+        frontier = np.unique(_csr_rows(indptr, sources, frontier))
+        frontier = frontier[~reached[frontier]]
+        reached[frontier] = True
+    return reached
+
+
+class IncrementalSolver:
+    # keeps the last solution of an editable grid so a re-solve after a few cell edits
+    # starts from it and only re-propagates from the edited cells outward.
+    #   solve(model, edited) ==> (V, Q, stats), edited = cells changed since the last
+    #   solve, None when everything may have changed (step cost, resize, new map)
+    # states whose old policy could reach an edited cell are reset to resting_values,
+    # the rest keep their old value, then sweep_frontier re-propagates from the edited
+    # cells and the reset states only
+    def __init__(self, gamma=0.9, threshold=1.0e-3):
+        self.gamma = gamma
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.model = None
+        self.V = None
+        self.policy = None
+        self.level = None
+
+    def solve(self, model, edited=None):
+        if self.model is None or edited is None:
+            V, Q, iterations = solve_value_iteration(model, self.gamma, self.threshold)
+            stats = {"warm_start": False, "reset": model.n_states, "iterations": iterations}
+            self.level = resting_level(model, self.gamma)  # kept for the edits that follow
+        else:
+            V, Q, stats = self._resolve(model, list(edited))
+        self.model, self.V, self.policy = model, V, Q.argmax(axis=1)
+        return V, Q, stats
+
+    def _resolve(self, model, edited):
+        old = self.model
+        old_ids = model.match_states(old)
+        kept = old_ids >= 0
+        new_ids = np.full(old.n_states, -1, dtype=np.int64)
+        new_ids[old_ids[kept]] = np.flatnonzero(kept)
+
+        # cells whose dynamics changed: the edited cells and everything that can move into
+        # them, before and after the edit
+        seeds = [model.state_id(c) for c in edited]
+        pred_ptr, pred = model.predecessors()
+        old_ptr, old_pred = old.predecessors()
+        for c in edited:
+            k = model.state_id(c)
+            if k >= 0:
+                seeds.extend(pred[pred_ptr[k]:pred_ptr[k + 1]].tolist())
+            k = old.state_id(c)
+            if k >= 0:
+                seeds.extend(new_ids[old_pred[old_ptr[k]:old_ptr[k + 1]]].tolist())
+        seeds = np.array([k for k in seeds if k >= 0], dtype=np.int64)
+
+        policy = np.zeros(model.n_states, dtype=np.int64)
+        policy[kept] = self.policy[old_ids[kept]]
+        stale = policy_ancestors(model, policy, seeds) | ~kept
+
+        V = resting_values(model, self.gamma, self.level)
+        warm = kept & ~stale & ~model.terminal
+        V[warm] = self.V[old_ids[warm]]
+
+        # the old solution had every error below threshold, so only the seeds and the
+        # reset states can start a change
+        V, stats = sweep_frontier(model, self.gamma, self.threshold, V, np.append(seeds, np.flatnonzero(stale)))
+        stats.update(warm_start=True, reset=int(stale.sum()))
+        return V, model.q_values(V, self.gamma), stats
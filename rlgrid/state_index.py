@@ -0,0 +1,271 @@
+# state_index.py - dense int ids for the cells of a 2D or 3D grid, and the tuple-keyed
+# views kept for code written against dicts and sets
+#
+# StateIndex numbers the cells that are states 0..S-1 in row-major order. a coordinate
+# becomes an id by arithmetic (r * cols + c) and one array lookup, no hashing:
+#   index = StateIndex.from_mask(~wall)   the open cells are the states
+#   index.id((2, 3)) ==> 7, -1 for walls and cells outside the grid
+#   index.ids_of(coords) ==> ids of an (N, d) coordinate array, -1 the same way
+#   index.coords() ==> (S, d), index.state(7) ==> (2, 3)
+# it costs 8 bytes per cell of the grid plus 8 per state.
+#
+# views over arrays, they read and write the arrays and hold nothing per cell:
+#   StateView(index, V)         {state: V[id]}, the V / policy dicts of the solvers. the
+#                               first write copies the arrays, the solve cache shares them
+#   CellSet(mask)               set of the cells where mask is True (GridWorld3D.walls)
+#   CellValues(mask, data)      {cell: data[cell]} for the cells where mask is True
+#                               (GridWorld.rewards, GridWorld3D.rewards)
+#   as_state_view(V, shape)     V itself when it is a StateView, a plain {state: value}
+#                               dict copied into one, for code that reads .index / .data
+# they iterate in row-major order.
+
+from collections.abc import MutableMapping, MutableSet
+
+import numpy as np
+
+
+def flat_cell(shape, pos):
+    # row-major cell id of pos (r * cols + c in 2D), -1 when it is outside the grid
+    try:
+        if len(pos) != len(shape):
+            return -1
+        flat = 0
+        for c, n in zip(pos, shape):
+            if not 0 <= c < n:
+                return -1
+            flat = flat * n + int(c)
+    except TypeError:
+        return -1
+    return flat
+
+
+def cell_of(shape, pos):
+    # pos as a tuple of ints that indexes an array of `shape`, None when it is outside
+    if flat_cell(shape, pos) < 0:
+        return None
+    return tuple(int(c) for c in pos)
+
+
+def coords_of(shape, positions):
+    # (N, d) array of an iterable of positions, ValueError when one is outside the grid
+    coords = np.array(list(positions), dtype=np.int64).reshape(-1, len(shape))
+    if ((coords < 0) | (coords >= shape)).any():
+        raise ValueError("positions outside the %s grid" % "x".join(map(str, shape)))
+    return coords
+
+
+def cells_of(mask):
+    # the cells where mask is True, as tuples in row-major order
+    return list(map(tuple, np.argwhere(mask).tolist()))
+
+
+class StateIndex:
+    __slots__ = ("shape", "cells", "ids", "_states")
+
+    def __init__(self, shape, cells):
+        # cells: flat row-major cell id of every state, ascending
+        self.shape = tuple(int(n) for n in shape)
+        self.cells = np.asarray(cells, dtype=np.intp)
+        self.ids = np.full(int(np.prod(self.shape)), -1, dtype=np.intp)
+        self.ids[self.cells] = np.arange(len(self.cells))
+        self._states = None
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(mask.shape, np.flatnonzero(mask))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, state):
+        return self.id(state) >= 0
+
+    def id(self, state):
+        cell = flat_cell(self.shape, state)
+        return int(self.ids[cell]) if cell >= 0 else -1
+
+    def ids_of(self, coords):
+        coords = np.asarray(coords, dtype=np.intp).reshape(-1, len(self.shape))
+        inside = ((coords >= 0) & (coords < self.shape)).all(axis=1)
+        flat = np.ravel_multi_index(tuple(np.where(inside[:, None], coords, 0).T), self.shape)
+        return np.where(inside, self.ids[flat], -1)
+
+    def state(self, k):
+        return tuple(int(c) for c in np.unravel_index(self.cells[k], self.shape))
+
+    def coords(self):
+        return np.stack(np.unravel_index(self.cells, self.shape), axis=1)
+
+    @property
+    def states(self):
+        # list of state tuples, position k is state k (built on first use)
+        if self._states is None:
+            self._states = list(zip(*(axis.tolist() for axis in np.unravel_index(self.cells, self.shape))))
+        return self._states
+
+    def match(self, other):
+        # id in `other` of each of our states, -1 when it has no such state
+        if other.shape == self.shape:
+            return other.ids[self.cells]
+        return other.ids_of(self.coords())
+
+
+class StateView(MutableMapping):
+    # {state: data[id]}. keep: (S,) bool, the states that are keys (all by default).
+    # convert(item) gives the value, a plain Python number otherwise, and revert(value) is
+    # its inverse for writes. writes and deletes go to copies of data / keep made on the
+    # first one, so arrays shared with the solve cache or the caller are never changed
+    __slots__ = ("index", "data", "keep", "convert", "revert", "_owned")
+
+    def __init__(self, index, data, keep=None, convert=None, revert=None):
+        self.index = index
+        self.data = data
+        self.keep = keep
+        self.convert = convert
+        self.revert = revert
+        self._owned = False
+
+    def ids(self):
+        # state ids of the keys, in iteration order
+        return np.arange(len(self.index)) if self.keep is None else np.flatnonzero(self.keep)
+
+    def mask(self):
+        # (S,) bool, True for the states that are keys
+        return np.ones(len(self.index), dtype=bool) if self.keep is None else self.keep
+
+    def __getitem__(self, state):
+        k = self.index.id(state)
+        if k < 0 or (self.keep is not None and not self.keep[k]):
+            raise KeyError(state)
+        item = self.data[k]
+        return self.convert(item) if self.convert else item.item()
+
+    def __setitem__(self, state, value):
+        k = self.index.id(state)
+        if k < 0:
+            raise ValueError(f"{state} is not a state of the grid")
+        self._own()
+        self.data[k] = self.revert(value) if self.revert else value
+        if self.keep is not None:
+            self.keep[k] = True
+
+    def __delitem__(self, state):
+        k = self.index.id(state)
+        if k < 0 or (self.keep is not None and not self.keep[k]):
+            raise KeyError(state)
+        self._own()
+        if self.keep is None:
+            self.keep = np.ones(len(self.index), dtype=bool)
+        self.keep[k] = False
+
+    def _own(self):
+        if not self._owned:
+            self.data = self.data.copy()
+            self.keep = None if self.keep is None else self.keep.copy()
+            self._owned = True
+
+    def __iter__(self):
+        states = self.index.states
+        return (states[k] for k in self.ids().tolist())
+
+    def __len__(self):
+        return len(self.index) if self.keep is None else int(np.count_nonzero(self.keep))
+
+    # values() / items() convert the whole array at once instead of a lookup per key
+    def values(self):
+        data = self.data if self.keep is None else self.data[self.keep]
+        return list(map(self.convert, data)) if self.convert else data.tolist()
+
+    def items(self):
+        return list(zip(self, self.values()))
+
+    def __repr__(self):
+        return "StateView(%d states)" % len(self)
+
+
+def as_state_view(mapping, shape, revert=None):
+    # mapping as a StateView of a grid of `shape`: StateViews are returned as they are,
+    # anything else is read through .items() into a StateIndex of its keys. revert(value)
+    # gives the stored item, like StateView's (the policy's action index)
+    if isinstance(mapping, StateView):
+        return mapping
+    items = list(mapping.items())
+    coords = coords_of(shape, [state for state, _ in items])
+    cells = np.ravel_multi_index(tuple(coords.T), shape)
+    order = np.argsort(cells)
+    data = np.array([revert(value) if revert else value for _, value in items])
+    return StateView(StateIndex(shape, cells[order]), data[order])
+
+
+class CellSet(MutableSet):
+    __slots__ = ("mask",)
+
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __contains__(self, pos):
+        cell = cell_of(self.mask.shape, pos)
+        return cell is not None and bool(self.mask[cell])
+
+    def __iter__(self):
+        return iter(cells_of(self.mask))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    def add(self, pos):
+        cell = cell_of(self.mask.shape, pos)
+        if cell is None:
+            raise ValueError(f"{pos} is outside the {self.mask.shape} grid")
+        self.mask[cell] = True
+
+    def discard(self, pos):
+        cell = cell_of(self.mask.shape, pos)
+        if cell is not None:
+            self.mask[cell] = False
+
+    def __repr__(self):
+        return "CellSet(%r)" % set(self)
+
+
+class CellValues(MutableMapping):
+    __slots__ = ("mask", "data")
+
+    def __init__(self, mask, data):
+        self.mask = mask
+        self.data = data
+
+    def __getitem__(self, pos):
+        cell = cell_of(self.mask.shape, pos)
+        if cell is None or not self.mask[cell]:
+            raise KeyError(pos)
+        return self.data[cell].item()
+
+    def __setitem__(self, pos, value):
+        cell = cell_of(self.mask.shape, pos)
+        if cell is None:
+            raise ValueError(f"{pos} is outside the {self.mask.shape} grid")
+        self.mask[cell] = True
+        self.data[cell] = value
+
+    def __delitem__(self, pos):
+        cell = cell_of(self.mask.shape, pos)
+        if cell is None or not self.mask[cell]:
+            raise KeyError(pos)
+        self.mask[cell] = False
+        self.data[cell] = 0
+
+    def __iter__(self):
+        return iter(cells_of(self.mask))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    def values(self):
+        return self.data[self.mask].tolist()
+
+    def items(self):
+        return list(zip(self, self.values()))
+
+    def __repr__(self):
+        return "CellValues(%r)" % dict(self)
@@ -0,0 +1,115 @@
+# sweep.py - headless parameter sweep over a saved map
+#
+#   python -m rlgrid sweep saved_maps/preset1.json --gamma 0.9 0.95 0.99 --step-cost -0.1 -0.04 \
+#       --reward 1 5 --penalty -1 -5 --workers 4 --out sweep.tsv
+#
+# works with 2D maps written by GridEditorGUI.save_map and with 3D maps like
+# 3D/saved_maps/custom_3d_map.json. the map is compiled once and handed to every
+# worker process when it starts, each task only carries its parameters. step cost,
+# reward and penalty only change the reward attached to states, so a task re-weights
+# the shared model instead of recompiling it. rows are written as soon as they finish:
+#   gamma threshold step_cost reward penalty start_value policy_diff iterations seconds
+# policy_diff counts the non-terminal states whose action differs from the baseline
+# (the map's own rewards solved with the first gamma and threshold).
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .maps import load_map, start_of
+from .solvers import solve_value_iteration
+
+COLUMNS = ["gamma", "threshold", "step_cost", "reward", "penalty",
+           "start_value", "policy_diff", "iterations", "seconds"]
+
+_worker = {}
+
+
+def load_model(path):
+    # compiled model and start state id of a 2D or 3D map file
+    grid = load_map(path)
+    model = grid.compile()
+    return model, model.state_id(start_of(grid))
+
+
+def param_rewards(model, step_cost=None, reward=None, penalty=None):
+    # per-state rewards with the step cost on non-terminal states and the reward /
+    # penalty values on positive / negative terminals, None keeps the map's value
+    rewards = model.rewards.copy()
+    if step_cost is not None:
+        rewards[~model.terminal] = step_cost
+    if reward is not None:
+        rewards[model.terminal & (model.rewards > 0)] = reward
+    if penalty is not None:
+        rewards[model.terminal & (model.rewards < 0)] = penalty
+    return rewards
+
+
+def _init_worker(model, start_id, baseline, max_iterations):
+    _worker.update(model=model, start_id=start_id, baseline=baseline, max_iterations=max_iterations)
+
+
+def run_task(params):
+    gamma, threshold, step_cost, reward, penalty = params
+    model = _worker["model"].reweighted(param_rewards(_worker["model"], step_cost, reward, penalty))
+
+    t0 = time.perf_counter()
+    V, Q, iterations = solve_value_iteration(model, gamma, threshold, _worker["max_iterations"])
+    seconds = time.perf_counter() - t0
+
+    start_id = _worker["start_id"]
+    start_value = float(V[start_id]) if start_id >= 0 else float("nan")
+    changed = (Q.argmax(axis=1) != _worker["baseline"]) & ~model.terminal
+    return params + (start_value, int(changed.sum()), iterations, seconds)
+
+
+def run_sweep(path, gammas, thresholds, step_costs=(None,), rewards=(None,), penalties=(None,),
+              workers=None, max_iterations=None, out=None):
+    out = sys.stdout if out is None else out
+    model, start_id = load_model(path)
+    _, Q, _ = solve_value_iteration(model, gammas[0], thresholds[0], max_iterations)
+    baseline = Q.argmax(axis=1)
+
+    tasks = list(itertools.product(gammas, thresholds, step_costs, rewards, penalties))
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+
+    writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+    writer.writerow(COLUMNS)
+    out.flush()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(model, start_id, baseline, max_iterations)) as pool:
+        for row in pool.map(run_task, tasks, chunksize=chunksize):
+            writer.writerow(["" if v is None else v for v in row])
+            out.flush()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Solve a saved map over a grid of parameters.")
+    parser.add_argument("map", help="2D or 3D map JSON")
+    parser.add_argument("--gamma", type=float, nargs="+", default=[0.9])
+    parser.add_argument("--threshold", type=float, nargs="+", default=[1.0e-3])
+    parser.add_argument("--step-cost", type=float, nargs="+", default=[None])
+    parser.add_argument("--reward", type=float, nargs="+", default=[None])
+    parser.add_argument("--penalty", type=float, nargs="+", default=[None])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-iterations", type=int, default=None)
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sweep = dict(gammas=args.gamma, thresholds=args.threshold, step_costs=args.step_cost,
+                 rewards=args.reward, penalties=args.penalty, workers=args.workers,
+                 max_iterations=args.max_iterations)
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            run_sweep(args.map, out=f, **sweep)
+    else:
+        run_sweep(args.map, **sweep)
+
+
+if __name__ == "__main__":
+    main()
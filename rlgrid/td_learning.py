@@ -0,0 +1,118 @@
+# td_learning.py - model-free Q-learning / SARSA on the same maps the solvers use
+#
+# Q is a (S, A) array indexed by the state ids of grid.compile(). every step moves all
+# n_envs agents of a VecEnv at once (epsilon-greedy on Q) and applies their TD updates
+# with array scatters. agents that hit the same (s, a) in one step share the averaged
+# update, so many agents starting together do not overshoot.
+#
+#   Q, history = q_learning(grid, n_envs=2000, n_steps=5000, seed=0)
+#   history[-1] ==> {"steps": ..., "seconds": ..., "steps_per_sec": ..., "max_error": ...}
+# max_error / mean_error compare max_a Q with V* from value iteration over the
+# non-terminal states. SARSA learns the value of the epsilon-greedy policy it follows,
+# so it only reaches V* when epsilon_final anneals exploration towards 0; a constant
+# alpha leaves sampling noise on stochastic maps unless alpha_final lowers it.
+
+import time
+
+import numpy as np
+
+from .solvers import solve_value_iteration
+from .vec_env import VecEnv, horizon
+
+METHODS = ("q_learning", "sarsa")
+
+
+def _epsilon_greedy(Q, states, epsilon, rng):
+    actions = Q[states].argmax(axis=1)
+    explore = rng.random(len(states)) < epsilon
+    actions[explore] = rng.integers(Q.shape[1], size=int(explore.sum()))
+    return actions
+
+
+def greedy_values(model, Q):
+    # V of the learned Q, terminal states keep their value
+    return np.where(model.terminal, model.terminal_values, Q.max(axis=1))
+
+
+def train(model, method="q_learning", gamma=0.9, alpha=0.1, epsilon=0.1, n_envs=1000, n_steps=10000,
+          starts=None, seed=None, V_star=None, report_every=1000, Q=None, epsilon_final=None, alpha_final=None):
+    # returns (Q, history). starts: state ids agents restart from (default: every
+    # non-terminal state, spread evenly over the agents). epsilon / alpha move linearly
+    # to epsilon_final / alpha_final over the run when those are given. V_star adds the
+    # error columns to history, one entry every report_every steps and one at the end
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    if starts is None:
+        starts = np.flatnonzero(~model.terminal)
+    starts = np.asarray(starts, dtype=np.int64)
+    env = VecEnv(model, n_envs, starts[np.arange(n_envs) % len(starts)], seed, horizon(gamma))
+    rng = env.rng
+
+    n_actions = model.n_actions
+    Q = np.zeros((model.n_states, n_actions)) if Q is None else Q
+    flat = Q.reshape(-1)
+    # scratch space for averaging duplicate (s, a) updates, cleared after each step
+    total = np.zeros(flat.size)
+    count = np.zeros(flat.size)
+
+    history = []
+    t0 = time.perf_counter()
+
+    def report(step):
+        seconds = time.perf_counter() - t0
+        entry = {"steps": step * n_envs, "seconds": seconds,
+                 "steps_per_sec": step * n_envs / seconds if seconds > 0 else float("inf")}
+        if V_star is not None:
+            err = np.abs(greedy_values(model, Q) - V_star)[~model.terminal]
+            entry["max_error"] = float(err.max(initial=0.0))
+            entry["mean_error"] = float(err.mean()) if len(err) else 0.0
+        history.append(entry)
+
+    epsilons = np.linspace(epsilon, epsilon if epsilon_final is None else epsilon_final, n_steps)
+    alphas = np.linspace(alpha, alpha if alpha_final is None else alpha_final, n_steps)
+
+    actions = _epsilon_greedy(Q, env.state, epsilons[0], rng)
+    for step in range(1, n_steps + 1):
+        epsilon, alpha = epsilons[step - 1], alphas[step - 1]
+        idx = env.state * n_actions + actions
+        next_states, rewards, dones = env.step(actions)
+
+        # episodes ending on a terminal (or leaving the states, next = -1) collect the
+        # terminal value, episodes cut by max_steps still bootstrap from the next state
+        ended = env.terminal[next_states]
+        safe_next = np.where(ended, 0, next_states)
+        if method == "q_learning":
+            bootstrap = Q[safe_next].max(axis=1)
+            actions = _epsilon_greedy(Q, env.state, epsilon, rng)
+        else:
+            next_actions = _epsilon_greedy(Q, safe_next, epsilon, rng)
+            bootstrap = Q[safe_next, next_actions]
+            actions = np.where(dones, _epsilon_greedy(Q, env.state, epsilon, rng), next_actions)
+        target = rewards + gamma * np.where(ended, env.terminal_values[next_states], bootstrap)
+
+        np.add.at(total, idx, target - flat[idx])
+        np.add.at(count, idx, 1.0)
+        flat[idx] += alpha * total[idx] / count[idx]
+        total[idx] = 0.0
+        count[idx] = 0.0
+
+        if report_every and step % report_every == 0:
+            report(step)
+    if not history or history[-1]["steps"] != n_steps * n_envs:
+        report(n_steps)
+    return Q, history
+
+
+def learn(grid, method="q_learning", gamma=0.9, **kwargs):
+    # train on a GridWorld / GridWorld3D and track the error against value iteration
+    model = grid.compile()
+    V_star, _, _ = solve_value_iteration(model, gamma, 1.0e-8)
+    return train(model, method, gamma, V_star=V_star, **kwargs)
+
+
+def q_learning(grid, gamma=0.9, **kwargs):
+    return learn(grid, "q_learning", gamma, **kwargs)
+
+
+def sarsa(grid, gamma=0.9, **kwargs):
+    return learn(grid, "sarsa", gamma, **kwargs)
@@ -0,0 +1,95 @@
+from .grid import ACTION_SPACE
+from .solvers import solve_value_iteration, solve_policy_iteration, solve_prioritized_sweeping
+from .multigrid import solve_multigrid
+from ._wrappers import results, cached_solve
+
+def _action_dict(a):
+    # policy entry of action index a, the {action: probability} form the editor reads
+    return {ACTION_SPACE[a]: 1.0}
+
+def _action_index(action_probs):
+    # inverse of _action_dict for writes to the policy view, the most likely action
+    return ACTION_SPACE.index(max(action_probs, key=action_probs.get))
+
+def value_iteration(grid, gamma=0.9, threshold=1.0e-3, progress_callback=None, return_arrays=False,
+                    cache=None, cache_only=False, monitor=None, mode="jacobi"):
+    # monitor: a SolveMonitor (monitor.py), it sees nothing when the cache answers.
+    # mode: "jacobi", "gauss_seidel", "sor" or "anderson" (solvers.VI_MODES)
+    mdp = grid.compile()
+    result = cached_solve(mdp, cache, ("value_iteration", grid.start, gamma, threshold, mode),
+                          lambda: solve_value_iteration(mdp, gamma, threshold,
+                                                        progress_callback=progress_callback,
+                                                        monitor=monitor, mode=mode)[:2],
+                          cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_dict, _action_index)
+
+def policy_iteration(grid, gamma=0.9, threshold=1.0e-3, eval_sweeps=None, progress_callback=None,
+                     return_arrays=False, cache=None, cache_only=False, monitor=None):
+    # eval_sweeps=None evaluates each policy exactly (sparse linear solve)
+    mdp = grid.compile()
+    result = cached_solve(mdp, cache, ("policy_iteration", grid.start, gamma, threshold, eval_sweeps),
+                          lambda: solve_policy_iteration(mdp, gamma, threshold, eval_sweeps,
+                                                         progress_callback=progress_callback,
+                                                         monitor=monitor)[:2],
+                          cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_dict, _action_index)
+
+def modified_policy_iteration(grid, gamma=0.9, threshold=1.0e-3, eval_sweeps=5, progress_callback=None,
+                              return_arrays=False, cache=None, cache_only=False, monitor=None):
+    return policy_iteration(grid, gamma, threshold, eval_sweeps, progress_callback, return_arrays,
+                            cache, cache_only, monitor)
+
+def prioritized_sweeping(grid, gamma=0.9, threshold=1.0e-3, max_backups=None, return_arrays=False,
+                         cache=None, cache_only=False, monitor=None):
+    # in-place backups ordered by Bellman error, arrays["stats"] compares the number of
+    # backups with a full sweep (not available when the result came from the cache)
+    mdp = grid.compile()
+    stats = {}
+    def solve():
+        V_arr, Q, solve_stats = solve_prioritized_sweeping(mdp, gamma, threshold, max_backups, monitor=monitor)
+        stats.update(solve_stats)
+        return V_arr, Q
+    result = cached_solve(mdp, cache, ("prioritized_sweeping", grid.start, gamma, threshold, max_backups),
+                          solve, cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_dict, _action_index, stats or None)
+
+def multigrid(grid, gamma=0.9, threshold=1.0e-3, factor=4, levels=None, return_arrays=False,
+              cache=None, cache_only=False, monitor=None):
+    # coarse-to-fine sweeps (multigrid.py), arrays["stats"] has the states, sweeps and
+    # seconds of every level (not available when the result came from the cache).
+    # not in SOLVERS: value_iteration(mode="gauss_seidel") needs fewer sweeps
+    mdp = grid.compile()
+    stats = {}
+    def solve():
+        V_arr, Q, solve_stats = solve_multigrid(mdp, gamma, threshold, factor, levels, monitor=monitor)
+        stats.update(solve_stats)
+        return V_arr, Q
+    result = cached_solve(mdp, cache, ("multigrid", grid.start, gamma, threshold, factor, levels),
+                          solve, cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_dict, _action_index, stats or None)
+
+def resolve(grid, incremental, edited=None, return_arrays=False):
+    # re-solve after the cells in `edited` changed, warm-started from the last solution
+    # kept by `incremental` (an IncrementalSolver). edited=None solves from scratch
+    mdp = grid.compile()
+    V_arr, Q, stats = incremental.solve(mdp, edited)
+    return results(mdp, V_arr, Q, return_arrays, _action_dict, _action_index, stats)
+
+# solvers selectable from the editor, all return (V, policy) and take cache=SolveCache
+SOLVERS = {
+    "Value Iteration": value_iteration,
+    "Policy Iteration": policy_iteration,
+    "Modified Policy Iteration": modified_policy_iteration,
+    "Prioritized Sweeping": prioritized_sweeping,
+}
+
+# editor mode that re-solves through resolve() instead of a SOLVERS entry
+INCREMENTAL = "Incremental (warm start)"
@@ -0,0 +1,120 @@
+# value_iteration_3d.py
+
+from .grid_3d import GridWorld3D, ACTIONS_3D
+from .solvers import (solve_value_iteration, solve_policy_iteration, solve_prioritized_sweeping,
+                      IncrementalSolver)
+from .multigrid import solve_multigrid
+from ._wrappers import results, cached_solve
+from typing import Mapping, Tuple
+
+GAMMA = 0.9
+THETA = 1e-4  # کمی کاهش داده شده برای سرعت بیشتر
+
+ACTION_NAMES = tuple(ACTIONS_3D.keys())
+
+# خروجی همه حل‌کننده‌ها: (V، policy)
+Solution = Tuple[Mapping[Tuple, float], Mapping[Tuple, str]]
+
+def _action_name(a):
+    # مقدار policy در StateView: نام عمل از اندیس آن
+    return ACTION_NAMES[a]
+
+def _action_index(name):
+    # عکس _action_name برای نوشتن در policy
+    return ACTION_NAMES.index(name)
+
+def value_iteration(env: GridWorld3D, gamma=GAMMA, theta=THETA, max_iterations=1000,
+                    return_arrays=False, cache=None, cache_only=False, monitor=None,
+                    mode="jacobi") -> Solution:
+    # هر دور: gather روی جدول حالت‌های بعدی و max روی عمل‌ها
+    # mode: "jacobi" (پیش‌فرض)، "gauss_seidel"، "sor" یا "anderson" (solvers.VI_MODES)
+    mdp = env.compile()
+    result = cached_solve(mdp, cache,
+                          ("value_iteration", env.start_pos, gamma, theta, max_iterations, mode),
+                          lambda: solve_value_iteration(mdp, gamma, theta, max_iterations,
+                                                        monitor=monitor, mode=mode)[:2],
+                          cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_name, _action_index)
+
+def policy_iteration(env: GridWorld3D, gamma=GAMMA, theta=THETA, eval_sweeps=None,
+                     max_iterations=1000, return_arrays=False, cache=None, cache_only=False,
+                     monitor=None) -> Solution:
+    # eval_sweeps=None: ارزیابی دقیق سیاست با حل دستگاه خطی اسپارس
+    mdp = env.compile()
+    result = cached_solve(mdp, cache,
+                          ("policy_iteration", env.start_pos, gamma, theta, eval_sweeps,
+                           max_iterations),
+                          lambda: solve_policy_iteration(mdp, gamma, theta, eval_sweeps,
+                                                         max_iterations, monitor=monitor)[:2],
+                          cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_name, _action_index)
+
+def modified_policy_iteration(env: GridWorld3D, gamma=GAMMA, theta=THETA, eval_sweeps=5,
+                              max_iterations=1000, return_arrays=False, cache=None,
+                              cache_only=False, monitor=None) -> Solution:
+    return policy_iteration(env, gamma, theta, eval_sweeps, max_iterations, return_arrays, cache,
+                            cache_only, monitor)
+
+def prioritized_sweeping(env: GridWorld3D, gamma=GAMMA, theta=THETA, max_backups=None,
+                         return_arrays=False, cache=None, cache_only=False,
+                         monitor=None) -> Solution:
+    # به‌روزرسانی درجا به ترتیب خطای بلمن؛ arrays["stats"] تعداد backupها را با یک
+    # sweep کامل مقایسه می‌کند (برای جواب‌های خوانده‌شده از cache موجود نیست)
+    mdp = env.compile()
+    stats = {}
+    def solve():
+        V_arr, Q, solve_stats = solve_prioritized_sweeping(mdp, gamma, theta, max_backups,
+                                                           monitor=monitor)
+        stats.update(solve_stats)
+        return V_arr, Q
+    result = cached_solve(mdp, cache,
+                          ("prioritized_sweeping", env.start_pos, gamma, theta, max_backups),
+                          solve, cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_name, _action_index, stats or None)
+
+def multigrid(env: GridWorld3D, gamma=GAMMA, theta=THETA, factor=4, levels=None,
+              max_iterations=1000, return_arrays=False, cache=None, cache_only=False,
+              monitor=None) -> Solution:
+    # اول نسخه‌های درشت نقشه (بلوک‌های factor**k خانه‌ای) حل می‌شوند و هر سطح از
+    # جواب سطح درشت‌تر شروع می‌کند. arrays["stats"] تعداد sweep و زمان هر سطح را
+    # دارد (برای جواب‌های خوانده‌شده از cache موجود نیست)
+    # در SOLVERS نیست: value_iteration(mode="gauss_seidel") با sweepهای کمتری همگرا می‌شود
+    mdp = env.compile()
+    stats = {}
+    def solve():
+        V_arr, Q, solve_stats = solve_multigrid(mdp, gamma, theta, factor, levels, max_iterations,
+                                                monitor)
+        stats.update(solve_stats)
+        return V_arr, Q
+    result = cached_solve(mdp, cache,
+                          ("multigrid", env.start_pos, gamma, theta, factor, levels,
+                           max_iterations),
+                          solve, cache_only)
+    if result is None:
+        return None
+    return results(mdp, *result, return_arrays, _action_name, _action_index, stats or None)
+
+def resolve(env: GridWorld3D, incremental: IncrementalSolver, edited=None,
+            return_arrays=False) -> Solution:
+    # حل دوباره بعد از تغییر خانه‌های edited، با شروع از آخرین جواب incremental
+    # edited=None یعنی حل از صفر
+    mdp = env.compile()
+    V_arr, Q, stats = incremental.solve(mdp, edited)
+    return results(mdp, V_arr, Q, return_arrays, _action_name, _action_index, stats)
+
+# حل‌کننده‌های قابل انتخاب در ویرایشگر، همه (V, policy) برمی‌گردانند و cache=SolveCache می‌گیرند
+SOLVERS = {
+    "Value Iteration": value_iteration,
+    "Policy Iteration": policy_iteration,
+    "Modified Policy Iteration": modified_policy_iteration,
+    "Prioritized Sweeping": prioritized_sweeping,
+}
+
+# حالت ویرایشگر که به جای SOLVERS از resolve() استفاده می‌کند
+INCREMENTAL = "Incremental (warm start)"
@@ -0,0 +1,113 @@
+# vec_env.py - many independent agents stepping through a compiled grid at once
+#
+# works on GridWorld.compile() / GridWorld3D.compile() through
+#   model.successor_table()  next states, probabilities, rewards, each (S, A, K)
+#   model.terminal, model.terminal_values
+# every (s, a) gets a row of cumulative probabilities, so sampling a step for all
+# agents is one uniform draw and one comparison against K columns (nothing at all on
+# deterministic grids). agents that finish an episode start over from their start
+# state on the same call.
+#
+#   env = VecEnv(model, 10000, start=model.state_id(grid.start), seed=0)
+#   next_states, rewards, dones = env.step(policy[env.state])
+
+import math
+
+import numpy as np
+
+
+class VecEnv:
+    def __init__(self, model, n_envs, start, seed=None, max_steps=None):
+        # start: state id, or one per agent. max_steps cuts episodes that never reach
+        # a terminal (they come back with done=True like the others)
+        next_states, probs, rewards = model.successor_table()
+        n, n_actions, width = next_states.shape
+        self.model = model
+        self.n_envs = n_envs
+        self.n_actions = n_actions
+        self.next_states = next_states.reshape(n * n_actions, width)
+        self.rewards = rewards.reshape(n * n_actions, width)
+        self.deterministic = width == 1
+        self.cumulative = np.cumsum(probs.reshape(n * n_actions, width), axis=1)
+        self.cumulative[:, -1] = 1.0  # rounding never picks past the last successor
+
+        # one extra slot so next state -1 (left the states) reads as terminal with value 0
+        self.terminal = np.append(model.terminal, True)
+        self.terminal_values = np.append(model.terminal_values, 0.0)
+
+        self.rng = np.random.default_rng(seed)
+        self.max_steps = max_steps
+        self.start = np.broadcast_to(np.asarray(start, dtype=np.int64), (n_envs,)).copy()
+        if (self.start < 0).any():
+            raise ValueError("start is not a state of the model")
+        self.state = self.start.copy()
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+
+    def reset(self):
+        self.state[:] = self.start
+        self.steps[:] = 0
+        return self.state.copy()
+
+    def step(self, actions):
+        # actions: (n_envs,) action ids ==> (next_states, rewards, dones)
+        # next_states are the states reached (-1 when the move left the states); agents
+        # with done=True are already back at their start in self.state
+        rows = self.state * self.n_actions + actions
+        if self.deterministic:
+            next_states = self.next_states[rows, 0]
+            rewards = self.rewards[rows, 0]
+        else:
+            u = self.rng.random(self.n_envs)
+            k = (u[:, None] >= self.cumulative[rows]).sum(axis=1)
+            next_states = self.next_states[rows, k]
+            rewards = self.rewards[rows, k]
+
+        # agents standing on a terminal (a terminal start) are done without moving
+        stuck = self.terminal[self.state]
+        if stuck.any():
+            next_states = np.where(stuck, self.state, next_states)
+            rewards = np.where(stuck, 0.0, rewards)
+
+        dones = self.terminal[next_states] | stuck
+        self.steps += 1
+        if self.max_steps is not None:
+            dones |= self.steps >= self.max_steps
+
+        self.state = np.where(dones, self.start, next_states)
+        self.steps[dones] = 0
+        return next_states, rewards, dones
+
+
+def horizon(gamma, tol=1.0e-6):
+    # steps after which gamma**t drops below tol, a safe max_steps for discounted returns
+    return max(1, math.ceil(math.log(tol) / math.log(gamma))) if gamma < 1 else None
+
+
+def monte_carlo_values(model, policy, gamma=0.9, n_envs=10000, n_steps=1000, starts=None, seed=None):
+    # Monte Carlo estimate of V under policy (action id per state) from n_envs agents
+    # running n_steps each. agents are spread evenly over `starts` (default: every
+    # non-terminal state). returns (V, episodes), V is nan where no episode finished.
+    # episodes that end on a terminal collect its terminal value, like the solvers
+    if starts is None:
+        starts = np.flatnonzero(~model.terminal)
+    starts = np.asarray(starts, dtype=np.int64)
+    env = VecEnv(model, n_envs, starts[np.arange(n_envs) % len(starts)], seed, horizon(gamma))
+
+    totals = np.zeros(model.n_states)
+    episodes = np.zeros(model.n_states, dtype=np.int64)
+    returns = np.zeros(n_envs)
+    discount = np.ones(n_envs)
+    for _ in range(n_steps):
+        next_states, rewards, dones = env.step(policy[env.state])
+        returns += discount * rewards
+        discount *= gamma
+        if dones.any():
+            done = np.flatnonzero(dones)
+            g = returns[done] + discount[done] * env.terminal_values[next_states[done]]
+            np.add.at(totals, env.start[done], g)
+            np.add.at(episodes, env.start[done], 1)
+            returns[done] = 0.0
+            discount[done] = 1.0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / episodes, episodes
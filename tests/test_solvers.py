@@ -0,0 +1,106 @@
+# test_solvers.py - every solver against value iteration run to 1e-10, incremental
+# re-solves against a fresh solve, and the saved map formats
+#
+#   python -m pytest -q tests
+#
+# one small seeded map per dimension (generate.py). a solver stopped at `threshold` is
+# within threshold / (1 - gamma) of V*, the bound the bench gates use as well.
+
+import numpy as np
+import pytest
+
+from rlgrid import value_iteration as vi2, value_iteration_3d as vi3
+from rlgrid.generate import generate
+from rlgrid.grid import ACTION_SPACE
+from rlgrid.grid_3d import EMPTY, WALL, GridWorld3D
+from rlgrid.maps import load_map, save_map
+from rlgrid.solvers import VI_MODES, IncrementalSolver, solve_value_iteration
+
+GAMMA = 0.9
+THRESHOLD = 1.0e-4
+TOLERANCE = THRESHOLD / (1 - GAMMA)
+WRAPPERS = {2: vi2, 3: vi3}
+SHAPES = {2: (12, 12), 3: (6, 6, 6)}
+
+
+def make_grid(dim, seed=0):
+    return generate(SHAPES[dim], "random", 0.2, goals=1, pits=1, seed=seed, start=(0,) * dim)
+
+
+def exact_values(grid):
+    return solve_value_iteration(grid.compile(), GAMMA, 1.0e-10)[0]
+
+
+def open_cells(grid):
+    # cells that are neither walls nor terminals, in row-major order
+    if isinstance(grid, GridWorld3D):
+        return [tuple(c) for c in np.argwhere(~grid.wall & ~grid.terminal).tolist()]
+    return [tuple(c) for c in np.argwhere(grid.active).tolist()]
+
+
+def wall_off(grid, cell):
+    # the editor's wall tool on one open cell, returns what open_up() needs to undo it
+    if isinstance(grid, GridWorld3D):
+        grid.set_cell(*cell, WALL)
+        return None
+    del grid.actions[cell]
+    return grid.rewards.pop(cell, None)
+
+
+def open_up(grid, cell, reward):
+    if isinstance(grid, GridWorld3D):
+        grid.set_cell(*cell, EMPTY)
+        return
+    grid.actions[cell] = ACTION_SPACE
+    if reward is not None:
+        grid.rewards[cell] = reward
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+@pytest.mark.parametrize("name", list(vi2.SOLVERS))
+def test_solvers_match_value_iteration(dim, name):
+    grid = make_grid(dim)
+    _, _, arrays = WRAPPERS[dim].SOLVERS[name](grid, GAMMA, THRESHOLD, return_arrays=True)
+    assert np.abs(arrays["V"] - exact_values(grid)).max() <= TOLERANCE
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+@pytest.mark.parametrize("mode", VI_MODES)
+def test_vi_modes_match_value_iteration(dim, mode):
+    grid = make_grid(dim)
+    V = solve_value_iteration(grid.compile(), GAMMA, THRESHOLD, mode=mode)[0]
+    assert np.abs(V - exact_values(grid)).max() <= TOLERANCE
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_incremental_matches_fresh_solve(dim):
+    grid = make_grid(dim)
+    resolve = WRAPPERS[dim].resolve
+    incremental = IncrementalSolver(GAMMA, THRESHOLD)
+    resolve(grid, incremental)
+    rng = np.random.default_rng(1)
+    cells = open_cells(grid)
+    for cell in [cells[k] for k in rng.choice(len(cells), 3, replace=False)]:
+        reward = wall_off(grid, cell)
+        _, _, arrays = resolve(grid, incremental, [cell], return_arrays=True)
+        assert arrays["stats"]["warm_start"]
+        assert np.abs(arrays["V"] - exact_values(grid)).max() <= TOLERANCE
+        open_up(grid, cell, reward)
+        _, _, arrays = resolve(grid, incremental, [cell], return_arrays=True)
+        assert np.abs(arrays["V"] - exact_values(grid)).max() <= TOLERANCE
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+@pytest.mark.parametrize("ext", [".json", ".npz"])
+def test_save_load_round_trip(dim, ext, tmp_path):
+    grid = make_grid(dim)
+    path = str(tmp_path / ("map" + ext))
+    save_map(grid, path)
+    loaded = load_map(path)
+    assert type(loaded) is type(grid)
+    assert loaded.compile().fingerprint() == grid.compile().fingerprint()
+    if dim == 2:
+        assert loaded.start == grid.start
+    else:
+        assert loaded.start_pos == grid.start_pos
+    assert np.array_equal(exact_values(loaded), exact_values(grid))